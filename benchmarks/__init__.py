@@ -0,0 +1,14 @@
+"""
+Benchmarks of the stages of maze generation, solving and drawing.
+
+Run them with
+
+    python -m benchmarks --output results.json
+
+and compare a later run against stored results with
+
+    python -m benchmarks --baseline results.json
+
+See benchmarks.stages for the benchmarked stages and benchmarks.runner
+for what is measured.
+"""
@@ -0,0 +1,96 @@
+"""
+Command line interface of the benchmarks, see python -m benchmarks --help
+"""
+import argparse
+import sys
+
+from .runner import (SEED,
+                     SIZES,
+                     Result,
+                     compare,
+                     fit_exponents,
+                     load_results,
+                     run_benchmarks,
+                     save_results)
+from .stages import STAGES, get_stages
+from .startup import startup_times
+
+
+def _print_result(result: Result) -> None:
+    memory = ""
+    if 'peak_bytes' in result:
+        memory = f"{int(result['peak_bytes']) / 2**20:10.2f} MiB"
+    print(f"{result['stage']:24}{result['size']:6}"
+          f"{float(result['seconds']):12.4f} s{memory}", flush=True)
+
+
+def _print_startup(repeat: int) -> None:
+    print(f"{'module':24}{'import time':>14}  loads")
+    for result in startup_times(repeat=repeat):
+        print(f"{result['module']:24}{float(result['seconds']):12.4f} s"
+              f"  {result['loads'] or '-'}", flush=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description="Benchmark the stages of maze generation")
+    parser.add_argument('--stages', nargs='+',
+                        choices=[stage.name for stage in STAGES],
+                        help="stages to run, by default all")
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES,
+                        help="sizes N of the N x N mazes")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="timed runs per stage and size")
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--budget', type=float, default=30,
+                        help="skip the larger sizes of a stage once a run "
+                             "takes longer than this many seconds")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="do not measure the peak memory")
+    parser.add_argument('--output', help="JSON file to save the results to")
+    parser.add_argument('--startup', action='store_true',
+                        help="measure the import time of the limnos "
+                             "modules instead, with python -X importtime")
+    parser.add_argument('--baseline',
+                        help="JSON file of earlier results to compare with")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="slowdown, as a fraction, that counts as a "
+                             "regression")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        _print_startup(args.repeat)
+        return 0
+
+    print(f"{'stage':24}{'size':>6}{'time':>14}"
+          f"{'' if args.no_memory else 'peak memory':>14}")
+    results = run_benchmarks(get_stages(args.stages), args.sizes,
+                             repeat=args.repeat, seed=args.seed,
+                             memory=not(args.no_memory), budget=args.budget,
+                             report=_print_result)
+
+    print("\nscaling exponents (time ~ cells ** exponent)")
+    for stage, exponent in fit_exponents(results).items():
+        print(f"{stage:24}{exponent:8.2f}")
+
+    if args.output is not None:
+        save_results(args.output, results)
+
+    if args.baseline is None:
+        return 0
+
+    comparisons = compare(results, load_results(args.baseline),
+                          args.threshold)
+    print(f"\ncompared with {args.baseline}")
+    for comparison in comparisons:
+        flag = "  REGRESSION" if comparison['regression'] else ""
+        print(f"{comparison['stage']:24}{comparison['size']:6}"
+              f"{float(comparison['ratio']):10.2f}x{flag}")
+
+    return 1 if any(comparison['regression']
+                    for comparison in comparisons) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Running the benchmarks, and storing and comparing their results.
+
+Every stage is timed a number of times per size, keeping the fastest and
+the median time, and run once more under tracemalloc for the peak memory
+it allocates. The times of a stage are fitted to a power of the number
+of cells, whose exponent tells how the stage scales.
+"""
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+from .stages import Stage
+
+SIZES = [10, 20, 50, 100, 200, 500]
+SEED = 2022
+
+Result = dict[str, Union[str, int, float]]
+
+
+def measure(stage: Stage, size: int, repeat: int = 3, seed: int = SEED,
+            memory: bool = True) -> Result:
+    """
+    Time a stage on an N x N maze, and measure its peak memory
+    """
+    args = stage.setup(size, seed)
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage.run(*args)
+        times.append(time.perf_counter() - start)
+
+    result: Result = {'stage': stage.name,
+                      'size': size,
+                      'cells': size * size,
+                      'seconds': min(times),
+                      'median_seconds': float(np.median(times))}
+
+    if memory:
+        tracemalloc.start()
+        try:
+            stage.run(*args)
+            result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return result
+
+
+def run_benchmarks(stages: list[Stage],
+                   sizes: list[int] = SIZES,
+                   repeat: int = 3,
+                   seed: int = SEED,
+                   memory: bool = True,
+                   budget: Optional[float] = 30,
+                   report: Optional[Callable[[Result], None]] = None
+                   ) -> list[Result]:
+    """
+    Measure stages at several sizes. A stage is not run at sizes above its
+    max_size, nor at the sizes after one where it took longer than the
+    budget (in seconds, None for no budget)
+
+    Args:
+        stages: the stages to run
+        sizes: the sizes N of the N x N mazes
+        repeat: number of timed runs per stage and size
+        seed: seed of the inputs of every stage
+        memory: whether to measure the peak memory
+        budget: time budget of a single run
+        report: called with every result as soon as it is measured
+    """
+    results = []
+    for stage in stages:
+        # a first, untimed, run to get imports and caches out of the way
+        stage.run(*stage.setup(min(sizes), seed))
+        for size in sorted(sizes):
+            if stage.max_size is not None and size > stage.max_size:
+                break
+            result = measure(stage, size, repeat, seed, memory)
+            results.append(result)
+            if report is not None:
+                report(result)
+            if budget is not None and float(result['seconds']) > budget:
+                break
+
+    return results
+
+
+def fit_exponents(results: list[Result],
+                  min_seconds: float = 1e-3) -> dict[str, float]:
+    """
+    Fit the time of every stage to a power of the number of cells and get
+    the exponents. Times below min_seconds are left out as too noisy
+    """
+    points: dict[str, list[tuple[float, float]]] = {}
+    for result in results:
+        if float(result['seconds']) >= min_seconds:
+            points.setdefault(str(result['stage']), []).append(
+                (np.log(float(result['cells'])),
+                 np.log(float(result['seconds']))))
+
+    exponents = {}
+    for stage, stage_points in points.items():
+        if len(stage_points) > 1:
+            log_cells, log_seconds = np.array(stage_points).T
+            exponents[stage] = float(np.polyfit(log_cells, log_seconds, 1)[0])
+
+    return exponents
+
+
+def _metadata() -> dict[str, str]:
+    return {'date': datetime.now(timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine()}
+
+
+def save_results(path: Union[str, os.PathLike],
+                 results: list[Result]) -> None:
+    """
+    Save results as JSON, along with the scaling exponents and a
+    description of the machine
+    """
+    document = {'metadata': _metadata(),
+                'results': results,
+                'exponents': fit_exponents(results)}
+    with open(path, 'w') as file:
+        json.dump(document, file, indent=2)
+
+
+def load_results(path: Union[str, os.PathLike]) -> list[Result]:
+    with open(path) as file:
+        return json.load(file)['results']
+
+
+def compare(results: list[Result], baseline: list[Result],
+            threshold: float = 0.25,
+            min_seconds: float = 1e-3) -> list[Result]:
+    """
+    Compare the times of results with those of a baseline, for every stage
+    and size found in both. A stage that got slower by more than the
+    threshold (a fraction of the baseline time) is a regression, unless
+    its baseline time is below min_seconds, which is too noisy to tell
+    """
+    baseline_seconds = {(result['stage'], result['size']): result['seconds']
+                        for result in baseline}
+
+    comparisons: list[Result] = []
+    for result in results:
+        key = (result['stage'], result['size'])
+        if key not in baseline_seconds:
+            continue
+        old, new = float(baseline_seconds[key]), float(result['seconds'])
+        ratio = new / old if old > 0 else float('inf')
+        comparisons.append({'stage': result['stage'],
+                            'size': result['size'],
+                            'baseline_seconds': old,
+                            'seconds': new,
+                            'ratio': ratio,
+                            'regression': int(ratio > 1 + threshold and
+                                              old >= min_seconds)})
+
+    return comparisons
@@ -0,0 +1,145 @@
+"""
+The benchmarked stages. Every stage prepares its input for an N x N maze
+in setup, which is not timed, and then does the work in run.
+"""
+import os
+from typing import Any, Callable, NamedTuple, Optional
+
+import numpy as np
+
+from limnos.algorithms import loop_erased_route
+from limnos.generation import (add_outer_walls_to_maze,
+                               add_random_wall_to_maze,
+                               fill_maze_with_walls,
+                               grid_maze_from_trails,
+                               trails_generator,
+                               walls_from_trails)
+from limnos.regions import generate_large_maze
+from limnos.render import render_image
+from limnos.solve import solve
+from limnos.transforms import randomly_transform_N_times
+from limnos.types import Route, Trails
+
+
+class Stage(NamedTuple):
+    """
+    A benchmarked stage
+
+    Args:
+        name: the name of the stage
+        setup: gets the arguments of run from the size N and a seed
+        run: the work to time
+        max_size: the largest N to run at, None for no limit
+    """
+    name: str
+    setup: Callable[[int, int], tuple]
+    run: Callable[..., Any]
+    max_size: Optional[int] = None
+
+
+def _straight_route(N: int) -> Route:
+    return ([(1, 2*m + 1) for m in range(N)] +
+            [(2*(n + 1) + 1, 2*(N - 1) + 1) for n in range(N - 1)])
+
+
+def _trails(N: int, seed: int) -> Trails:
+    # the fast algorithm, so that large sizes can be set up in no time
+    return trails_generator(N, N, rng=np.random.default_rng(seed),
+                            algorithm='backtracker')
+
+
+def _transform(route: Route, count: int, seed: int) -> Route:
+    return randomly_transform_N_times(route, count,
+                                      rng=np.random.default_rng(seed))
+
+
+def _loop_erased_route(N: int, seed: int) -> Route:
+    return loop_erased_route(N, N, rng=np.random.default_rng(seed))
+
+
+def _generate_trails(N: int, seed: int, algorithm: str) -> Trails:
+    return trails_generator(N, N, rng=np.random.default_rng(seed),
+                            algorithm=algorithm)
+
+
+def _large_maze(N: int, seed: int):
+    # on all CPUs, in about square regions
+    return generate_large_maze(N, N, seed=seed)
+
+
+def _add_random_wall(maze, seed: int):
+    return add_random_wall_to_maze(maze, rng=np.random.default_rng(seed))
+
+
+def _fill_maze_with_walls(maze, seed: int):
+    return fill_maze_with_walls(maze, rng=np.random.default_rng(seed))
+
+
+def _plot_maze(maze) -> None:
+    # imported here, so that the other stages run without matplotlib
+    from limnos.visualisation import save_maze
+    save_maze(os.devnull, maze)
+
+
+def _outer_walled_maze(N: int, seed: int) -> tuple:
+    return (add_outer_walls_to_maze((_trails(N, seed).main, [])), seed)
+
+
+STAGES: list[Stage] = [
+    Stage('transform',
+          # as many transformations as trails_generator does
+          lambda N, seed: (_straight_route(N), N * N, seed),
+          _transform, max_size=200),
+    Stage('loop_erased_route',
+          lambda N, seed: (N, seed),
+          _loop_erased_route),
+    Stage('trails_sprout',
+          lambda N, seed: (N, seed, 'sprout'),
+          _generate_trails, max_size=200),
+    Stage('trails_backtracker',
+          lambda N, seed: (N, seed, 'backtracker'),
+          _generate_trails),
+    Stage('trails_kruskal',
+          lambda N, seed: (N, seed, 'kruskal'),
+          _generate_trails),
+    Stage('trails_wilson',
+          lambda N, seed: (N, seed, 'wilson'),
+          _generate_trails),
+    Stage('large_maze',
+          lambda N, seed: (N, seed),
+          _large_maze),
+    Stage('walls_from_trails',
+          lambda N, seed: (_trails(N, seed),),
+          walls_from_trails),
+    Stage('grid_maze_from_trails',
+          lambda N, seed: (_trails(N, seed),),
+          grid_maze_from_trails),
+    Stage('add_random_wall',
+          _outer_walled_maze,
+          _add_random_wall),
+    Stage('fill_maze_with_walls',
+          _outer_walled_maze,
+          _fill_maze_with_walls),
+    Stage('solve',
+          lambda N, seed: (grid_maze_from_trails(_trails(N, seed)),),
+          solve),
+    Stage('render_image',
+          lambda N, seed: (grid_maze_from_trails(_trails(N, seed)),),
+          render_image),
+    Stage('plot_maze',
+          lambda N, seed: (grid_maze_from_trails(_trails(N, seed)),),
+          _plot_maze, max_size=200)]
+
+
+def get_stages(names: Optional[list[str]] = None) -> list[Stage]:
+    """
+    Get the stages of the given names, by default all of them
+    """
+    if names is None:
+        return STAGES
+    by_name = {stage.name: stage for stage in STAGES}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown stages {', '.join(unknown)}, use any "
+                         f"of {', '.join(by_name)}")
+    return [by_name[name] for name in names]
@@ -0,0 +1,77 @@
+"""
+Start-up time of the limnos modules.
+
+Every module is imported in a fresh interpreter under python -X importtime,
+whose report gives the time the import took, including everything it
+imported, and tells whether it pulled in the heavy dependencies.
+"""
+import os
+import subprocess
+import sys
+from typing import Optional
+
+from .runner import Result
+
+MODULES = ['limnos.types',
+           'limnos.rng',
+           'limnos.generation',
+           'limnos.validation',
+           'limnos.visualisation',
+           'limnos.solve',
+           'limnos.io',
+           'limnos.metrics',
+           'limnos.cli']
+
+# the dependencies that limnos only loads when it needs them
+HEAVY = ('numpy', 'matplotlib')
+
+
+def parse_importtime(report: str) -> dict[str, int]:
+    """
+    Get the cumulative import time, in microseconds, of every module in the
+    report that python -X importtime writes to stderr
+    """
+    times = {}
+    for line in report.splitlines():
+        if not(line.startswith('import time:')):
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            times[module.strip()] = int(cumulative)
+
+    return times
+
+
+def import_time(module: str, repeat: int = 3) -> Result:
+    """
+    Import a module in fresh interpreters, and get the fastest import time
+    and the heavy dependencies it loaded
+    """
+    if repeat < 1:
+        raise ValueError("Imports must be repeated at least once")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [root] + [path for path in [env.get('PYTHONPATH')] if path])
+
+    best: Optional[dict[str, int]] = None
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            env=env, stderr=subprocess.PIPE, text=True, check=True)
+        times = parse_importtime(process.stderr)
+        if best is None or times[module] < best[module]:
+            best = times
+    assert best is not None
+
+    return {'module': module,
+            'seconds': best[module] / 1e6,
+            'loads': ','.join(name for name in HEAVY if name in best)}
+
+
+def startup_times(modules: list[str] = MODULES,
+                  repeat: int = 3) -> list[Result]:
+    """
+    Measure the import times of modules, see import_time
+    """
+    return [import_time(module, repeat) for module in modules]
@@ -0,0 +1,104 @@
+"""
+Test the benchmark runner
+"""
+import json
+
+import pytest
+
+from benchmarks.__main__ import main
+from benchmarks.runner import (compare, fit_exponents, load_results,
+                               run_benchmarks, save_results)
+from benchmarks.stages import Stage, get_stages
+from benchmarks.startup import import_time, parse_importtime
+
+
+def _result(stage, size, seconds):
+    return {'stage': stage, 'size': size, 'cells': size * size,
+            'seconds': seconds, 'median_seconds': seconds}
+
+
+def test_run_benchmarks_respects_max_size_and_budget():
+    calls = []
+    stage = Stage('count', lambda N, seed: (N,), calls.append, max_size=20)
+    results = run_benchmarks([stage], sizes=[50, 10, 20], repeat=2)
+
+    assert [result['size'] for result in results] == [10, 20]
+    assert all(result['peak_bytes'] >= 0 for result in results)
+    # a warm-up run, then two timed runs and one traced run per size
+    assert calls == [10] + [10] * 3 + [20] * 3
+
+    slow = Stage('slow', lambda N, seed: (), lambda: sum(range(10**5)))
+    results = run_benchmarks([slow], sizes=[1, 2, 3], repeat=1,
+                             memory=False, budget=0)
+    assert len(results) == 1
+    assert 'peak_bytes' not in results[0]
+
+
+def test_real_stages_run():
+    results = run_benchmarks(get_stages(['trails_kruskal', 'solve']),
+                             sizes=[4, 6], repeat=1)
+    assert [(result['stage'], result['size']) for result in results] == [
+        ('trails_kruskal', 4), ('trails_kruskal', 6),
+        ('solve', 4), ('solve', 6)]
+
+    with pytest.raises(ValueError):
+        get_stages(['no_such_stage'])
+
+
+def test_fit_exponents():
+    results = ([_result('square', size, 1e-4 * size**4)
+                for size in (10, 20, 40)] +
+               [_result('noise', size, 1e-5) for size in (10, 20)])
+
+    exponents = fit_exponents(results)
+    assert exponents['square'] == pytest.approx(2)
+    assert 'noise' not in exponents
+
+
+def test_compare_flags_regressions():
+    baseline = [_result('a', 10, 0.1), _result('a', 20, 0.4),
+                _result('b', 10, 1e-4)]
+    results = [_result('a', 10, 0.11), _result('a', 20, 0.6),
+               _result('b', 10, 1e-3), _result('c', 10, 1.0)]
+
+    comparisons = compare(results, baseline, threshold=0.25)
+    assert [(comparison['stage'], comparison['size'],
+             comparison['regression']) for comparison in comparisons] == [
+        ('a', 10, 0), ('a', 20, 1), ('b', 10, 0)]
+    assert comparisons[1]['ratio'] == pytest.approx(1.5)
+
+
+def test_save_and_compare_from_the_command_line(tmp_path, capsys):
+    path = tmp_path / "results.json"
+    argv = ['--stages', 'walls_from_trails', '--sizes', '4', '8',
+            '--repeat', '1']
+    assert main(argv + ['--output', str(path)]) == 0
+
+    document = json.loads(path.read_text())
+    assert set(document) == {'metadata', 'results', 'exponents'}
+    assert len(load_results(path)) == 2
+
+    save_results(path, [dict(result, seconds=1e3)
+                        for result in load_results(path)])
+    assert main(argv + ['--baseline', str(path)]) == 0
+    save_results(path, [dict(result, seconds=1e-9)
+                        for result in load_results(path)])
+    assert main(argv + ['--baseline', str(path),
+                        '--threshold', '0.1']) == 0
+    assert "REGRESSION" not in capsys.readouterr().out
+
+
+def test_parse_importtime():
+    report = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       120 |        120 |   limnos.lazy\n"
+              "import time:       310 |        430 | limnos.rng\n")
+    assert parse_importtime(report) == {'limnos.lazy': 120,
+                                        'limnos.rng': 430}
+
+
+def test_import_time():
+    result = import_time('limnos.types', repeat=1)
+    assert result['module'] == 'limnos.types'
+    assert float(result['seconds']) > 0
+    assert result['loads'] == ''
+    assert 'numpy' in str(import_time('limnos.solve', repeat=1)['loads'])
@@ -0,0 +1,8 @@
+"""
+Run the limnos command with python -m limnos, see limnos.cli
+"""
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,322 @@
+"""
+Linear-time maze generation algorithms.
+
+Each algorithm carves a spanning tree of passages between the cells of
+an N x M maze, which is then cut up into Trails: the route from the SW
+cell (1, 1) to the NE cell as main and every other corridor as a branch
+sprouting off the trail it leads away from.
+
+Cells are numbered x-major, the cell at the point (2i + 1, 2j + 1) being
+number i*M + j, and passages are pairs of cell numbers.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, Optional
+
+from .lazy import lazy_module
+from .rng import RNG, as_random_stream
+from .stats import GenerationStats, timed
+from .templates import size_template
+from .types import Route, Trails
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    np = lazy_module('numpy')
+
+Passage = tuple[int, int]
+
+
+class DisjointSets():
+    """
+    Disjoint-set forest over the numbers 0 to size - 1, with union by
+    size and path halving
+    """
+
+    def __init__(self, size: int):
+
+        self.parents = list(range(size))
+        self.sizes = [1] * size
+
+    def find(self, node: int) -> int:
+        """
+        Get the representative of the set holding a node
+        """
+        parents = self.parents
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    def union(self, node_a: int, node_b: int) -> bool:
+        """
+        Merge the sets of two nodes. Returns False if they were one set
+        already
+        """
+        root_a, root_b = self.find(node_a), self.find(node_b)
+        if root_a == root_b:
+            return False
+        if self.sizes[root_a] < self.sizes[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parents[root_b] = root_a
+        self.sizes[root_a] += self.sizes[root_b]
+        return True
+
+
+def trails_from_passages(N: int, M: int, passages: list[Passage]) -> Trails:
+    """
+    Cut a spanning tree of the cells of an N x M maze up into Trails. The
+    main runs from the SW to the NE cell, and every branch starts at its
+    sprout point on the trail it hangs off. Branches follow the largest
+    subtree at every fork, so that they are long and nest only
+    logarithmically deep
+    """
+    n_cells = N * M
+    neighbours: list[list[int]] = [[] for _ in range(n_cells)]
+    for cell_a, cell_b in passages:
+        neighbours[cell_a].append(cell_b)
+        neighbours[cell_b].append(cell_a)
+
+    # root the tree at the SW cell
+    parents = [-1] * n_cells
+    parents[0] = 0
+    order = [0]
+    for cell in order:
+        for neighbour in neighbours[cell]:
+            if parents[neighbour] == -1:
+                parents[neighbour] = cell
+                order.append(neighbour)
+    if len(order) != n_cells or len(passages) != n_cells - 1:
+        raise ValueError("The passages do not form a spanning tree")
+
+    sizes = [1] * n_cells
+    for cell in reversed(order[1:]):
+        sizes[parents[cell]] += sizes[cell]
+
+    points = size_template(N, M).cell_points
+    on_trail = bytearray(n_cells)
+
+    main_cells = [n_cells - 1]
+    while main_cells[-1] != 0:
+        main_cells.append(parents[main_cells[-1]])
+    main_cells.reverse()
+    for cell in main_cells:
+        on_trail[cell] = 1
+
+    trails = Trails(main=[points[cell] for cell in main_cells], branches=[])
+
+    stack = [(trails, main_cells)]
+    while stack:
+        subtrail, cells = stack.pop()
+        for cell in cells:
+            for child in neighbours[cell]:
+                if on_trail[child]:
+                    continue
+                branch_cells = [cell]
+                head = child
+                while head != -1:
+                    branch_cells.append(head)
+                    on_trail[head] = 1
+                    children = [neighbour for neighbour in neighbours[head]
+                                if not(on_trail[neighbour])]
+                    head = max(children, key=sizes.__getitem__,
+                               default=-1)
+                branch = subtrail.sprout([points[cell]
+                                          for cell in branch_cells])
+                stack.append((branch, branch_cells[1:]))
+
+    return trails
+
+
+def wall_grids_from_passages(N: int, M: int, passages: list[Passage]
+                             ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the horizontal (N, M + 1) and vertical (N + 1, M) wall grids, see
+    GridMaze, of an N x M maze with walls everywhere but the passages
+    """
+    horizontal = np.ones((N, M + 1), dtype=bool)
+    vertical = np.ones((N + 1, M), dtype=bool)
+
+    cells = np.array(passages, dtype=np.int64).reshape(-1, 2)
+    lower = cells.min(axis=1)
+    i, j = np.divmod(lower, M)
+    along_y = np.abs(cells[:, 1] - cells[:, 0]) != M
+    # a passage to the next cell along y crosses a horizontal wall, one to
+    # the next cell along x a vertical wall
+    horizontal[i[along_y], j[along_y] + 1] = False
+    vertical[i[~along_y] + 1, j[~along_y]] = False
+
+    return horizontal, vertical
+
+
+def backtracker_passages(N: int, M: int, rng: RNG = None) -> list[Passage]:
+    """
+    Carve passages with a randomized depth-first search from the SW cell,
+    backtracking from dead ends. Gives long, winding corridors
+    """
+    stream = as_random_stream(rng)
+    neighbours = size_template(N, M).cell_neighbours
+
+    visited = bytearray(N * M)
+    visited[0] = 1
+    stack = [0]
+    passages: list[Passage] = []
+    while stack:
+        cell = stack[-1]
+        options = [neighbour for neighbour in neighbours[cell]
+                   if not(visited[neighbour])]
+        if len(options) == 0:
+            stack.pop()
+            continue
+        neighbour = stream.choice(options)
+        visited[neighbour] = 1
+        passages.append((cell, neighbour))
+        stack.append(neighbour)
+
+    return passages
+
+
+def kruskal_passages(N: int, M: int, rng: RNG = None) -> list[Passage]:
+    """
+    Carve passages with randomized Kruskal: open the passages between
+    neighbouring cells in random order, unless the cells are connected
+    already. Gives many short dead ends
+    """
+    stream = as_random_stream(rng)
+
+    cells = np.arange(N * M).reshape(N, M)
+    firsts = np.concatenate([cells[:-1, :].ravel(), cells[:, :-1].ravel()])
+    seconds = np.concatenate([cells[1:, :].ravel(), cells[:, 1:].ravel()])
+    order = stream.permutation(len(firsts))
+    firsts_list = firsts[order].tolist()
+    seconds_list = seconds[order].tolist()
+
+    sets = DisjointSets(N * M)
+    passages: list[Passage] = []
+    for cell_a, cell_b in zip(firsts_list, seconds_list):
+        if sets.union(cell_a, cell_b):
+            passages.append((cell_a, cell_b))
+
+    return passages
+
+
+def wilson_passages(N: int, M: int, rng: RNG = None) -> list[Passage]:
+    """
+    Carve passages with Wilson's algorithm: grow a tree from the SW cell by
+    random walks from the cells not yet in it, erasing the loops of each
+    walk. Gives a uniformly random spanning tree
+    """
+    stream = as_random_stream(rng)
+    neighbours = size_template(N, M).cell_neighbours
+
+    in_tree = bytearray(N * M)
+    in_tree[0] = 1
+    # the last way out of every cell on the current walk; overwriting it
+    # on revisits erases the loops
+    ways_out = [-1] * (N * M)
+    passages: list[Passage] = []
+    for start in range(N * M):
+        cell = start
+        while not(in_tree[cell]):
+            ways_out[cell] = stream.choice(neighbours[cell])
+            cell = ways_out[cell]
+        cell = start
+        while not(in_tree[cell]):
+            in_tree[cell] = 1
+            passages.append((cell, ways_out[cell]))
+            cell = ways_out[cell]
+
+    return passages
+
+
+def loop_erased_route(N: int, M: int, rng: RNG = None,
+                      bias: float = 0.05) -> Route:
+    """
+    Sample a random self-avoiding route from the SW cell (1, 1) to the NE
+    cell with a loop-erased random walk: walk randomly from the SW cell
+    and, whenever the walk comes back to a cell on the route, cut off the
+    loop it just made.
+
+    Args:
+        N: number of cells along x
+        M: number of cells along y
+        rng: source of randomness, see limnos.rng
+        bias: how much the walk is drawn to the NE corner, from 0 (no pull,
+          the most winding routes) to 1 (every step goes north or east,
+          so no loops at all). Without any pull, the walk takes of the
+          order of N*M*log(N*M) steps to get to the NE corner; the default
+          small pull brings that down to O(N*M) and keeps the routes
+          winding
+    """
+    if not(0 <= bias <= 1):
+        raise ValueError("The bias must be between 0 and 1")
+
+    stream = as_random_stream(rng)
+    neighbours = size_template(N, M).cell_neighbours
+    target = N * M - 1
+
+    route_cells = [0]
+    positions = [-1] * (N * M)
+    positions[0] = 0
+    cell = 0
+    while cell != target:
+        if bias > 0 and stream.random() < bias:
+            i, j = divmod(cell, M)
+            forward = [neighbour for neighbour, free
+                       in ((cell + M, i < N - 1), (cell + 1, j < M - 1))
+                       if free]
+            cell = stream.choice(forward)
+        else:
+            cell = stream.choice(neighbours[cell])
+
+        position = positions[cell]
+        if position == -1:
+            positions[cell] = len(route_cells)
+            route_cells.append(cell)
+        else:
+            for erased in route_cells[position + 1:]:
+                positions[erased] = -1
+            del route_cells[position + 1:]
+
+    points = size_template(N, M).cell_points
+    return [points[cell] for cell in route_cells]
+
+
+def _trails(N: int, M: int, rng: RNG,
+            stats: Optional[GenerationStats],
+            passages: Callable[[int, int, RNG], list[Passage]]) -> Trails:
+    with timed(stats, 'passages'):
+        cell_passages = passages(N, M, rng)
+    with timed(stats, 'trails'):
+        return trails_from_passages(N, M, cell_passages)
+
+
+def backtracker_trails(N: int, M: int, rng: RNG = None,
+                       stats: Optional[GenerationStats] = None) -> Trails:
+    """
+    Generate N x M trails with a randomized depth-first backtracker
+    """
+    return _trails(N, M, rng, stats, backtracker_passages)
+
+
+def kruskal_trails(N: int, M: int, rng: RNG = None,
+                   stats: Optional[GenerationStats] = None) -> Trails:
+    """
+    Generate N x M trails with randomized Kruskal
+    """
+    return _trails(N, M, rng, stats, kruskal_passages)
+
+
+def wilson_trails(N: int, M: int, rng: RNG = None,
+                  stats: Optional[GenerationStats] = None) -> Trails:
+    """
+    Generate N x M trails with Wilson's algorithm
+    """
+    return _trails(N, M, rng, stats, wilson_passages)
+
+
+# the passage carving algorithms by name, see trails_generator
+PASSAGES: dict[str, Callable[[int, int, RNG], list[Passage]]] = {
+    'backtracker': backtracker_passages,
+    'kruskal': kruskal_passages,
+    'wilson': wilson_passages}
@@ -0,0 +1,176 @@
+"""
+The limnos command: generate mazes as a stream.
+
+    limnos --size 20x30 --count 1000 --seed 1 > mazes.ndjson
+
+Mazes are generated on a pool of processes and written one by one as soon
+as they come in, in the order of their seeds. Only a bounded number of
+mazes is in flight at any time (see limnos.parallel.imap_bounded), so the
+memory used does not grow with the count, and the workers wait when the
+output is read slowly.
+
+Formats:
+    ndjson: one JSON object per line with the index of the maze, its
+      size [N, M], its solution route and its walls
+    binary: a corpus file, see limnos.io
+    png: one image per maze in the output directory, see limnos.render.
+      The images are rendered by the same workers that generate the mazes
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Optional, TextIO, cast
+
+from .generation import (ALGORITHMS, _chunk_tasks, _generate_grid_mazes,
+                         generate_mazes)
+from .io import CorpusWriter
+from .parallel import imap_bounded
+from .render import _render_to_file
+from .types import GridMaze
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def _size(text: str) -> tuple[int, int]:
+    try:
+        N, M = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid size {text}, use NxM")
+    if N < 1 or M < 1:
+        raise argparse.ArgumentTypeError("Sizes must be positive")
+    return N, M
+
+
+def _positive(text: str) -> int:
+    try:
+        number = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid number {text}")
+    if number < 1:
+        raise argparse.ArgumentTypeError("The number must be positive")
+    return number
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='limnos',
+        description="Generate random mazes and stream them out")
+    parser.add_argument('--size', type=_size, default=(10, 10),
+                        help="number of cells, NxM (default 10x10)")
+    parser.add_argument('--count', type=int, default=1,
+                        help="number of mazes (default 1)")
+    parser.add_argument('--jobs', type=_positive, default=None,
+                        help="number of worker processes (default: one "
+                             "per CPU)")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="seed for reproducible mazes")
+    parser.add_argument('--format', choices=['ndjson', 'binary', 'png'],
+                        default='ndjson', help="output format")
+    parser.add_argument('--algorithm', choices=list(ALGORITHMS),
+                        default='sprout', help="generation algorithm")
+    parser.add_argument('--output', default=None,
+                        help="output file for ndjson and binary (default: "
+                             "standard output), directory for png "
+                             "(default: the current directory)")
+    parser.add_argument('--chunksize', type=_positive, default=None,
+                        help="mazes per task sent to a worker (default: 8 "
+                             "for small mazes, 1 for large ones)")
+    return parser
+
+
+def maze_record(index: int, maze: GridMaze) -> dict:
+    """
+    Get the NDJSON record of a maze
+    """
+    route, walls = maze.to_maze()
+    return {'index': index,
+            'size': list(maze.shape),
+            'route': [list(point) for point in route],
+            'walls': [[list(wall[0]), list(wall[1])] for wall in walls]}
+
+
+def _write_ndjson(mazes: Iterable[GridMaze], stream: TextIO) -> None:
+    for index, maze in enumerate(mazes):
+        stream.write(json.dumps(maze_record(index, maze),
+                                separators=(',', ':')) + "\n")
+        stream.flush()
+
+
+def _write_binary(mazes: Iterable[GridMaze], writer: CorpusWriter) -> None:
+    with writer:
+        for maze in mazes:
+            writer.write(maze)
+
+
+def _render_chunk(N: int, M: int, seeds: list[np.random.SeedSequence],
+                  algorithm: str, directory: str, start: int) -> int:
+    """
+    Worker function of the png format: generate a chunk of mazes and
+    render them right away, numbering the images from start
+    """
+    grid_mazes = _generate_grid_mazes(N, M, seeds, algorithm)
+    for ind, maze in enumerate(grid_mazes, start):
+        _render_to_file(os.path.join(directory, f"maze_{ind:06d}.png"),
+                        maze, 'png', {})
+    return len(grid_mazes)
+
+
+def _write_png(tasks: Iterable[tuple], directory: str, chunksize: int,
+               workers: Optional[int]) -> None:
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    numbered = (task + (directory, n * chunksize)
+                for n, task in enumerate(tasks))
+    for _ in imap_bounded(_render_chunk, numbered, workers=workers):
+        pass
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = _parser().parse_args(argv)
+    N, M = args.size
+
+    if args.count < 0:
+        _parser().error("The count must not be negative")
+
+    chunksize = args.chunksize
+    if chunksize is None:
+        chunksize = 8 if N * M <= 10_000 else 1
+
+    # as_grid makes them GridMazes
+    grid_mazes = cast(Iterable[GridMaze], generate_mazes(
+        N, M, args.count, workers=args.jobs, seed=args.seed,
+        chunksize=chunksize, ordered=True, as_grid=True,
+        algorithm=args.algorithm))
+
+    try:
+        if args.format == 'png':
+            tasks = _chunk_tasks(N, M, args.count, args.seed, chunksize,
+                                 args.algorithm)
+            _write_png(tasks, args.output or os.curdir, chunksize,
+                       args.jobs)
+        elif args.format == 'binary':
+            if args.output is None:
+                _write_binary(grid_mazes, CorpusWriter(sys.stdout.buffer))
+            else:
+                _write_binary(grid_mazes, CorpusWriter(args.output))
+        elif args.output is None:
+            _write_ndjson(grid_mazes, sys.stdout)
+        else:
+            with open(args.output, 'w') as file:
+                _write_ndjson(grid_mazes, file)
+    except BrokenPipeError:
+        # the reader went away, as in limnos ... | head. Point stdout to
+        # devnull, so that Python does not fail flushing it on exit
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
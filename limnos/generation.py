@@ -1,14 +1,27 @@
 """
 Module to generate mazes
 """
-from random import randint, choice
-from typing import Optional, cast
-
-import numpy as np
-
-from .types import (Maze,
+from __future__ import annotations
+
+from typing import (TYPE_CHECKING, Callable, Iterable, Iterator, Optional,
+                    Union, cast)
+
+from .algorithms import (DisjointSets,
+                         backtracker_trails,
+                         kruskal_trails,
+                         loop_erased_route,
+                         wilson_trails)
+from .lazy import is_loaded, lazy_module
+from .parallel import imap_bounded
+from .rng import RNG, RandomStream, as_random_stream
+from .stats import GenerationStats, timed
+from .templates import size_template
+from .types import (AnyMaze,
+                    GridMaze,
+                    Maze,
                     Point,
                     Route,
+                    Routes,
                     Trails,
                     Wall,
                     Walls,
@@ -16,17 +29,32 @@ from .types import (Maze,
                     subtract_points)
 from .transforms import Direction, randomly_transform_N_times
 
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    np = lazy_module('numpy')
+
+
+# the largest mazes walled in pure Python while NumPy is not loaded, see
+# walls_from_trails. Up to about this size loading NumPy takes longer than
+# the pure Python walls
+PURE_PYTHON_CELLS = 40_000
+
+# the offsets from the first corner of a wall to the two points of a route
+# step crossing it, by the direction of the wall
+CROSSING_STEPS: dict[Point, tuple[Point, Point]] = {
+    (-2, 0): ((1, 1), (1, -1)),
+    (0, -2): ((1, 1), (-1, 1)),
+    (2, 0): ((-1, 1), (-1, -1)),
+    (0, 2): ((1, -1), (-1, -1))}
+
 
 def _wall_intersects_route(route: Route, wall: Wall) -> bool:
     """
     Check whether a wall intersects a route. If it does intersect, return
     True.
     """
-    wall_delta_coords = subtract_points(*wall)
-    route_delta_coords = {(-2, 0): ((1, 1), (1, -1)),
-                          (0, -2): ((1, 1), (-1, 1)),
-                          (2, 0): ((-1, 1), (-1, -1)),
-                          (0, 2): ((1, -1), (-1, -1))}[wall_delta_coords]
+    route_delta_coords = CROSSING_STEPS[subtract_points(*wall)]
 
     route_p0 = add_points(wall[0], route_delta_coords[0])
     route_p1 = add_points(wall[0], route_delta_coords[1])
@@ -35,9 +63,11 @@ def _wall_intersects_route(route: Route, wall: Wall) -> bool:
     if points_in_route:
         p0_ind = route.index(route_p0)
 
-        # special case: the end of the route
+        # special cases: the ends of the route
         if p0_ind == len(route) - 1:
             points_neighbours = route[p0_ind - 1] == route_p1
+        elif p0_ind == 0:
+            points_neighbours = route[1] == route_p1
         else:
             points_neighbours = (route[p0_ind + 1] == route_p1 or
                                  route[p0_ind - 1] == route_p1)
@@ -74,73 +104,260 @@ def _wall_forms_loop(new_wall: Wall, old_walls: Walls) -> bool:
     return found_p1 and found_p2
 
 
-def add_outer_walls_to_maze(maze: Maze) -> Maze:
+class _IndexPool():
     """
-    Add the outer walls to a maze
+    Set of integers from 0 up to size - 1 with O(1) insertion, removal and
+    uniformly random draws. The members are kept in a list, where the last
+    member takes the place of a removed one
     """
 
-    route: Route = maze[0]
-    walls: Walls = maze[1]
+    def __init__(self, size: int, members: Iterable[int] = ()):
+
+        self._members: list[int] = list(members)
+        self._positions = [-1] * size
+        for position, member in enumerate(self._members):
+            self._positions[member] = position
+
+    def __len__(self) -> int:
+        return len(self._members)
 
-    x0 = route[0][0] - 1
-    y0 = route[0][1] - 1
-    x1 = route[-1][0] + 1
-    y1 = route[-1][1] + 1
+    def __contains__(self, member: int) -> bool:
+        return self._positions[member] != -1
 
-    bottom: Walls = [((2 * n, 0), (2 * n + 2, 0)) for n in range((x1 - x0)//2)]
-    left: Walls = [((0, 2 * n), (0, 2 * n + 2)) for n in range((y1 - y0)//2)]
-    right: Walls = [((x1, 2*n), (x1, 2 * n + 2)) for n in range((y1 - y0)//2)]
-    top: Walls = [((2 * n, y1), (2 * n + 2, y1)) for n in range((x1 - x0)//2)]
+    def add(self, member: int) -> None:
+        if self._positions[member] == -1:
+            self._positions[member] = len(self._members)
+            self._members.append(member)
 
-    # remove wall to indicate start and finish
-    bottom.pop(0)
-    left.pop(0)
-    right.pop(-1)
-    top.pop(-1)
+    def remove(self, member: int) -> None:
+        position = self._positions[member]
+        last = self._members.pop()
+        if last != member:
+            self._members[position] = last
+            self._positions[last] = position
+        self._positions[member] = -1
 
-    return (route, walls + bottom + left + right + top)
+    def draw(self, stream: RandomStream) -> int:
+        """
+        Get a random member, without removing it
+        """
+        return self._members[stream.randint(0, len(self._members) - 1)]
 
 
-def add_random_wall_to_maze(maze: Maze) -> Maze:
+class WallInserter():
     """
-    Add a random (inner) wall to a maze
+    Engine to insert random inner walls into an N x M maze without
+    blocking the solution route and without closing a loop of walls,
+    which would cut off the cells inside it.
+
+    The wall corners are tracked in DisjointSets, with all the
+    corners on the boundary merged into a single node, the outside. A new
+    wall closes a loop exactly when its two corners are already connected,
+    which takes O(alpha(n)) to check. The walls that may still be inserted
+    are held in a pool; a wall that became illegal when others were
+    inserted is only dropped from the pool when it gets drawn, so that
+    every wall is drawn and dropped at most once.
+
+    Args:
+        route: the solution route, whose passages are kept open
+        horizontal: the (N, M + 1) grid of horizontal walls, see GridMaze
+        vertical: the (N + 1, M) grid of vertical walls
     """
 
-    route: Route = maze[0]
-    walls: Walls = maze[1]
+    def __init__(self,
+                 route: Route,
+                 horizontal: np.ndarray,
+                 vertical: np.ndarray):
+
+        N, M = vertical.shape[0] - 1, vertical.shape[1]
+        if horizontal.shape != (N, M + 1):
+            raise ValueError("Wall grids of incompatible shapes")
+        self.shape = (N, M)
+        self._n_horizontal = N * (M + 1)
+
+        # the corner (2i, 2j) is node i*(M + 1) + j, and all the corners on
+        # the boundary are merged into the outside
+        template = size_template(N, M)
+        self._sets = DisjointSets((N + 1) * (M + 1))
+        for corner in template.boundary_corners:
+            self._sets.union(0, corner)
+
+        # the corners at either end of every wall, horizontal walls first
+        self._starts, self._ends = template.wall_corners
+
+        present = np.concatenate([horizontal.ravel(), vertical.ravel()])
+        self._present = bytearray(present.astype(np.uint8).tobytes())
+        for wall_id in np.nonzero(present)[0].tolist():
+            self._sets.union(self._starts[wall_id], self._ends[wall_id])
+
+        horiz_open, vert_open = _passage_masks([route], 0, 0, 2 * N, 2 * M)
+        crossed = np.concatenate([horiz_open.ravel(), vert_open.ravel()])
+
+        self._pool = _IndexPool(len(present),
+                                np.nonzero(~present & ~crossed)[0].tolist())
+
+    @classmethod
+    def from_maze(cls, maze: Union[Maze, GridMaze]) -> 'WallInserter':
+        """
+        Make an inserter for the inner walls still missing from a maze
+        """
+        if isinstance(maze, GridMaze):
+            grid_maze = maze
+        else:
+            grid_maze = GridMaze.from_maze(maze)
+        route: Route = [(x, y) for x, y in grid_maze.route.tolist()]
+
+        return cls(route, grid_maze.horizontal, grid_maze.vertical)
+
+    def _wall_id(self, wall: Wall) -> int:
+        grid, i, j = GridMaze._locate_wall(wall)
+        N, M = self.shape
+        if grid == 'h' and 0 <= i < N and 0 <= j <= M:
+            return i * (M + 1) + j
+        if grid == 'v' and 0 <= i <= N and 0 <= j < M:
+            return self._n_horizontal + i * M + j
+        raise ValueError(f"Wall {wall} not in the maze")
+
+    def _wall(self, wall_id: int) -> Wall:
+        M = self.shape[1]
+        if wall_id < self._n_horizontal:
+            i, j = divmod(wall_id, M + 1)
+            return ((2 * i, 2 * j), (2 * i + 2, 2 * j))
+        i, j = divmod(wall_id - self._n_horizontal, M)
+        return ((2 * i, 2 * j), (2 * i, 2 * j + 2))
+
+    def _forms_loop(self, wall_id: int) -> bool:
+        return (self._sets.find(self._starts[wall_id]) ==
+                self._sets.find(self._ends[wall_id]))
+
+    def _insert(self, wall_id: int) -> None:
+        self._pool.remove(wall_id)
+        self._present[wall_id] = 1
+        self._sets.union(self._starts[wall_id], self._ends[wall_id])
+
+    def is_legal(self, wall: Wall) -> bool:
+        """
+        Check whether a wall may be inserted
+        """
+        wall_id = self._wall_id(wall)
+        return wall_id in self._pool and not(self._forms_loop(wall_id))
+
+    def insert(self, wall: Wall) -> None:
+        """
+        Insert a given wall. Raises a ValueError if it is not legal
+        """
+        if not(self.is_legal(wall)):
+            raise ValueError(f"Wall {wall} can not be inserted")
+        self._insert(self._wall_id(wall))
+
+    def insert_random(self, rng: RNG = None,
+                      stats: Optional[GenerationStats] = None
+                      ) -> Optional[Wall]:
+        """
+        Insert a random legal wall. Returns the wall or None if no wall
+        can be inserted any more
+        """
+        stream = as_random_stream(rng)
+
+        while len(self._pool) > 0:
+            wall_id = self._pool.draw(stream)
+            if self._forms_loop(wall_id):
+                self._pool.remove(wall_id)
+                if stats is not None:
+                    stats.wall_retries += 1
+            else:
+                self._insert(wall_id)
+                if stats is not None:
+                    stats.walls_inserted += 1
+                return self._wall(wall_id)
+
+        return None
+
+    def fill(self, rng: RNG = None,
+             stats: Optional[GenerationStats] = None) -> Walls:
+        """
+        Insert random legal walls until no more can be inserted. Returns
+        the inserted walls in the order of insertion
+        """
+        stream = as_random_stream(rng)
+
+        walls: Walls = []
+        wall = self.insert_random(stream, stats)
+        while wall is not None:
+            walls.append(wall)
+            wall = self.insert_random(stream, stats)
+
+        return walls
+
+    @property
+    def horizontal(self) -> np.ndarray:
+        N, M = self.shape
+        present = np.frombuffer(self._present, dtype=np.uint8)
+        return present[:self._n_horizontal].reshape(N, M + 1).astype(bool)
+
+    @property
+    def vertical(self) -> np.ndarray:
+        N, M = self.shape
+        present = np.frombuffer(self._present, dtype=np.uint8)
+        return present[self._n_horizontal:].reshape(N + 1, M).astype(bool)
+
+
+def add_outer_walls_to_maze(maze: AnyMaze) -> AnyMaze:
+    """
+    Add the outer walls to a maze
+    """
+    if isinstance(maze, GridMaze):
+        return maze.with_walls(list(size_template(*maze.shape).outer_walls))
 
-    x0 = route[0][0] + 1
-    y0 = route[0][1] + 1
-    x1 = route[-1][0] - 1
-    y1 = route[-1][1] - 1
+    route, walls = maze
+    N, M = (route[-1][0] + 1) // 2, (route[-1][1] + 1) // 2
 
-    found_good_wall = False
+    return (route, walls + list(size_template(N, M).outer_walls))
 
-    while not(found_good_wall):
 
-        x = 2 * randint(x0 // 2, x1 // 2)
-        y = 2 * randint(y0 // 2, y1 // 2)
+def add_random_wall_to_maze(maze: AnyMaze, rng: RNG = None,
+                            stats: Optional[GenerationStats] = None
+                            ) -> AnyMaze:
+    """
+    Add a random (inner) wall to a maze. The wall neither blocks the
+    solution route nor closes a loop of walls, see WallInserter. Raises
+    a ValueError if no such wall is left.
+
+    Every call sets up a new WallInserter for the whole maze, which takes
+    O(N*M) time, so adding walls one by one costs O(N*M) per wall. To add
+    many walls, use fill_maze_with_walls, or insert_random on a single
+    WallInserter.from_maze, which set it up once
+    """
+    with timed(stats, 'wall_pool'):
+        inserter = WallInserter.from_maze(maze)
+    with timed(stats, 'walls'):
+        wall = inserter.insert_random(rng, stats)
+    if wall is None:
+        raise ValueError("No wall can be added to the maze")
 
-        step = {1: (0, 2),
-                2: (2, 0),
-                3: (0, -2),
-                4: (-2, 0)}[randint(1, 4)]
+    if isinstance(maze, GridMaze):
+        return maze.with_walls([wall])
 
-        wall: Wall = ((x, y), add_points((x, y), step))
+    return (maze[0], maze[1] + [wall])
 
-        reasons_to_retry = [wall in walls,
-                            _wall_forms_loop(wall, walls),
-                            _wall_intersects_route(route, wall)]
 
-        if any(reasons_to_retry):
-            pass
-        else:
-            found_good_wall = True
+def fill_maze_with_walls(maze: AnyMaze, rng: RNG = None,
+                         stats: Optional[GenerationStats] = None) -> AnyMaze:
+    """
+    Add random inner walls to a maze until no more can be added without
+    blocking the solution route or closing a loop of walls. For a maze
+    with its outer walls, this leaves a single way between any two cells
+    """
+    with timed(stats, 'wall_pool'):
+        inserter = WallInserter.from_maze(maze)
+    with timed(stats, 'walls'):
+        walls = inserter.fill(rng, stats)
 
-    new_walls = walls.copy()
-    new_walls.append(wall)
+    if isinstance(maze, GridMaze):
+        return GridMaze.from_wall_grids(maze.route, inserter.horizontal,
+                                        inserter.vertical)
 
-    return (route, new_walls)
+    return (maze[0], maze[1] + walls)
 
 
 def _legal_sprout_point(route: Route, route_branch: Route, point: Point):
@@ -154,7 +371,8 @@ def _legal_sprout_point(route: Route, route_branch: Route, point: Point):
 
 def sprout_new_random_branch(mother_trails: Trails,
                              sub_trails: Trails,
-                             start: int) -> Optional[Trails]:
+                             start: int,
+                             rng: RNG = None) -> Optional[Trails]:
     """
     Sprout a new random branch onto a sub trail
 
@@ -164,40 +382,43 @@ def sprout_new_random_branch(mother_trails: Trails,
         sub_trails: The trails where the branch should go
         start: the sprout point of the branch on the main of the
           sub_trails
+        rng: source of randomness, see limnos.rng
 
     Returns:
         A new trails with the sprouted branch as main OR None if
           no legal sprouting was possible
     """
 
+    stream = as_random_stream(rng)
     more_steps_possible = True
-    head = sub_trails.main[start]
+    head = sub_trails.point(start)
 
     branch_route: Route = [head]
+    branch_points = {head}
+
+    x_max, y_max = mother_trails.point(-1)
 
     north_step = (0, 2)
     west_step = (-2, 0)
     east_step = (2, 0)
     south_step = (0, -2)
 
-    steps = np.array([north_step, east_step, south_step, west_step])
+    steps = (north_step, east_step, south_step, west_step)
 
     while more_steps_possible:
-        points = [add_points(head, step) for step in steps]
         possible_steps = []
-        for point, step in zip(points, steps):
-            cond_1 = not(mother_trails.point_in_trails(point))
-            cond_2 = _legal_sprout_point(mother_trails.main, branch_route, point)
-            if cond_1 and cond_2:
+        for step in steps:
+            x, y = point = add_points(head, step)
+            in_range = 1 <= x <= x_max and 1 <= y <= y_max
+            if (in_range and point not in branch_points and
+                    not(mother_trails.point_in_trails(point))):
                 possible_steps.append(step)
 
         if len(possible_steps) > 0:
-            step = possible_steps[randint(0, len(possible_steps) - 1)]
-            # now cast numpy ints to standard ints since some modules
-            # (notably json) care about the int type
-            step = (int(step[0]), int(step[1]))
+            step = stream.choice(possible_steps)
             head = add_points(head, step)
             branch_route.append(head)
+            branch_points.add(head)
         else:
             more_steps_possible = False
 
@@ -210,11 +431,14 @@ def sprout_new_random_branch(mother_trails: Trails,
     return new_trails
 
 
-def sprout_new_random_route(route: Route, start: int) -> Route:
+def sprout_new_random_route(route: Route,
+                            start: int,
+                            rng: RNG = None) -> Route:
     """
     Sprout a new route that fits onto an existing route, i.e. only touches it
     in one place, namely the starting point
     """
+    stream = as_random_stream(rng)
 
     more_steps_possible = True
     head = route[start]
@@ -226,17 +450,17 @@ def sprout_new_random_route(route: Route, start: int) -> Route:
     east_step = (2, 0)
     south_step = (0, -2)
 
-    steps = np.array([north_step, east_step, south_step, west_step])
+    steps = (north_step, east_step, south_step, west_step)
 
     while more_steps_possible:
 
-        possible_steps = steps[[_legal_sprout_point(route, route_branch, add_points(head, step))
-                                for step in steps]]
+        possible_steps = [step for step in steps
+                          if _legal_sprout_point(route, route_branch,
+                                                 add_points(head, step))]
         if len(possible_steps) > 0:
-            step = possible_steps[randint(0, len(possible_steps) - 1)]
+            step = possible_steps[stream.randint(0, len(possible_steps) - 1)]
             head = add_points(head, step)
             route_branch.append(head)
-            print(route_branch)
         else:
             more_steps_possible = False
 
@@ -246,61 +470,160 @@ def sprout_new_random_route(route: Route, start: int) -> Route:
     return route_branch
 
 
-def _close_trail_point(trails: Trails, free_point: Point) -> Point:
+def transformed_route(N: int, M: int, rng: RNG = None,
+                      stats: Optional[GenerationStats] = None) -> Route:
     """
-    helper function to get a point in trails close to a free point
-    no guarentees that it's the nearest point
-
-    NB: a hit is guarenteed since the solution route goes from the
-    SW corner to the NE corner
+    Sample a solution route by randomly transforming the route along the
+    west and north edges N*M times
     """
-    if trails.point_in_trails(free_point):
-        return free_point
+    route = list(size_template(N, M).initial_route)
 
-    found_point = False
-    dist = 0
-    while not(found_point):
-        dist += 2
-        new_points = [add_points(free_point, (dist, 0)),
-                      add_points(free_point, (0, dist)),
-                      add_points(free_point, (-dist, 0)),
-                      add_points(free_point, (0, -dist))]
-        for new_point in new_points:
-            if trails.point_in_trails(new_point):
-                found_point = True
-                break
+    # TODO: What's an appropriate number of transformations?
+    return randomly_transform_N_times(route, N * M, rng=rng, stats=stats)
 
-    return new_point
 
+# the samplers of solution routes by name, see sprout_trails
+SOLUTIONS = ('transform', 'loop_erased')
 
-def trails_generator(N: int, M: int) -> Trails:
+
+def solution_route(N: int, M: int, rng: RNG = None,
+                   stats: Optional[GenerationStats] = None,
+                   solution: str = 'transform',
+                   bias: float = 0.05) -> Route:
+    """
+    Sample a solution route from (1, 1) to the NE cell of an N x M maze by
+        'transform': random transformations of an L-shaped route, see
+          transformed_route, taking O((N*M)**2) time at worst
+        'loop_erased': a loop-erased random walk, see
+          limnos.algorithms.loop_erased_route, with the given bias
     """
-    Full trail generation, generates N x M system
+    with timed(stats, 'solution_route'):
+        if solution == 'transform':
+            return transformed_route(N, M, rng, stats)
+        if solution == 'loop_erased':
+            return loop_erased_route(N, M, rng, bias)
+    raise ValueError(f"Unknown solution route sampler {solution}, "
+                     f"use one of {', '.join(SOLUTIONS)}")
+
+
+def sprout_trails(N: int, M: int, rng: RNG = None,
+                  stats: Optional[GenerationStats] = None,
+                  solution: str = 'transform',
+                  bias: float = 0.05) -> Trails:
     """
+    Generate N x M trails by sampling a solution route, see solution_route
+    for the choices of solution and bias, and then sprouting random
+    branches off it, see sprout_branches
+    """
+    stream = as_random_stream(rng)
 
-    all_free_points: set[Point] = set(
-        [(2*n + 1, 2*m + 1) for n in range(N) for m in range(M)])
+    return sprout_branches(solution_route(N, M, stream, stats, solution,
+                                          bias),
+                           stream, stats)
 
-    solution_route: Route = ([(1, 2*m + 1) for m in range(M)] +
-                             [(2*(n + 1) + 1, 2*(M - 1) + 1)
-                              for n in range(N - 1)])
 
-    # TODO: What's an appropriate number of transformations?
-    solution_route = randomly_transform_N_times(solution_route, N * M)
+def sprout_branches(route: Route, rng: RNG = None,
+                    stats: Optional[GenerationStats] = None) -> Trails:
+    """
+    Grow the trails of a maze from its solution route, from (1, 1) to the
+    NE cell, by sprouting random branches off the frontier of the trails
+    until every cell is covered
+    """
+    stream = as_random_stream(rng)
+    N, M = (route[-1][0] + 1) // 2, (route[-1][1] + 1) // 2
+
+    trails = Trails(main=route, branches=[])
+
+    # the cells not yet in the trails, and the frontier: cells of the
+    # trails that may still have free neighbours. Frontier cells are only
+    # checked when drawn, and dropped once all their neighbours are taken
+    template = size_template(N, M)
+    points = template.cell_points
+    neighbours = template.cell_neighbours
+    free_cells = _IndexPool(N * M, range(N * M))
+    frontier = _IndexPool(N * M)
+
+    def claim(route: Route) -> None:
+        cells = [(x - 1) // 2 * M + (y - 1) // 2 for x, y in route]
+        for cell in cells:
+            if cell in free_cells:
+                free_cells.remove(cell)
+        for cell in cells:
+            frontier.add(cell)
+
+    with timed(stats, 'branches'):
+        claim(route)
+
+        while len(free_cells) > 0:
+            cell = frontier.draw(stream)
+            if stats is not None:
+                stats.sprout_draws += 1
+            if not(any(neighbour in free_cells
+                       for neighbour in neighbours[cell])):
+                frontier.remove(cell)
+                if stats is not None:
+                    stats.stale_sprout_draws += 1
+                continue
+            subtrail, start = trails.locate(points[cell])
+            new_trail = sprout_new_random_branch(trails, subtrail, start,
+                                                 rng=stream)
+            new_trail = cast(Trails, new_trail)
+            subtrail.add_branch(new_trail)
+            claim(new_trail.main)
+
+    return trails
+
 
-    all_free_points.difference_update(set(solution_route))
+# the trails generation algorithms by name, see trails_generator
+ALGORITHMS: dict[str, Callable[[int, int, RandomStream,
+                                 Optional[GenerationStats]], Trails]] = {
+    'sprout': sprout_trails,
+    'backtracker': backtracker_trails,
+    'kruskal': kruskal_trails,
+    'wilson': wilson_trails}
 
-    trails = Trails(main=solution_route, branches=[])
 
-    while all_free_points != set():
-        free_point = choice(tuple(all_free_points))
-        trail_point = _close_trail_point(trails, free_point)
-        subtrail = trails.get_subtrail_by_point(trail_point)
-        start = subtrail.main.index(trail_point)
-        new_trail = sprout_new_random_branch(trails, subtrail, start)
-        new_trail = cast(Trails, new_trail)
-        subtrail.branches.append(new_trail)
-        all_free_points.difference_update(set(new_trail.main))
+def _check_algorithm(algorithm: str) -> None:
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm {algorithm}, use one of "
+                         f"{', '.join(ALGORITHMS)}")
+
+
+def trails_generator(N: int, M: int, rng: RNG = None,
+                     algorithm: str = 'sprout',
+                     stats: Optional[GenerationStats] = None,
+                     solution: str = 'transform',
+                     bias: float = 0.05) -> Trails:
+    """
+    Full trail generation, generates N x M system. Pass a seeded NumPy
+    Generator, or a seeded random.Random, as rng for reproducible trails,
+    and a GenerationStats as stats to collect statistics of the
+    generation. Only 'kruskal' loads NumPy when given a random.Random.
+
+    The algorithm is one of ALGORITHMS:
+        'sprout': the original, slow, algorithm of limnos
+        'backtracker': randomized depth-first search, long corridors
+        'kruskal': randomized Kruskal, many short dead ends
+        'wilson': Wilson's algorithm, uniformly random mazes
+    The last three take O(N*M) time, see limnos.algorithms
+
+    The 'sprout' algorithm samples its solution route first, see
+    sprout_trails for the choices of solution and bias. The other
+    algorithms carve the whole maze at once and only take the default
+    solution.
+    """
+    _check_algorithm(algorithm)
+
+    stream = as_random_stream(rng)
+    if algorithm == 'sprout':
+        trails = sprout_trails(N, M, stream, stats, solution, bias)
+    elif solution != 'transform':
+        raise ValueError(f"The {algorithm} algorithm does not sample its "
+                         "solution route separately")
+    else:
+        trails = ALGORITHMS[algorithm](N, M, stream, stats)
+    if stats is not None:
+        stats.record_branches(trails.all_routes()[1:])
 
     return trails
 
@@ -310,41 +633,202 @@ def _all_potential_walls(trails: Trails) -> Walls:
     Helper function to generate all possible walls in the rectangle
     defined by the extremal points of the highest route in the trails
     """
-    x0 = trails.main[0][0] - 1
-    x1 = trails.main[-1][0] + 1
-    y0 = trails.main[0][1] - 1
-    y1 = trails.main[-1][1] + 1
+    (x0, y0), (x1, y1) = trails.point(0), trails.point(-1)
+    N, M = (x1 - x0) // 2 + 1, (y1 - y0) // 2 + 1
+    walls = size_template(N, M).potential_walls
+    if (x0, y0) == (1, 1):
+        return list(walls)
+
+    dx, dy = x0 - 1, y0 - 1
+    return [((xa + dx, ya + dy), (xb + dx, yb + dy))
+            for (xa, ya), (xb, yb) in walls]
+
+
+def _passage_masks(routes: Routes,
+                   x0: int, y0: int,
+                   x1: int, y1: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Helper function to mark the walls crossed by the routes in the
+    rectangle spanned by the wall corners (x0, y0) and (x1, y1).
+
+    Returns the boolean masks of the crossed horizontal walls, indexed
+    [(x - x0)//2, (y - y0)//2] for the wall ((x, y), (x + 2, y)), and of
+    the crossed vertical walls, indexed likewise for ((x, y), (x, y + 2))
+    """
+    nx = (x1 - x0) // 2
+    ny = (y1 - y0) // 2
+
+    horiz_open = np.zeros((nx, ny + 1), dtype=bool)
+    vert_open = np.zeros((nx + 1, ny), dtype=bool)
+
+    routes = [route for route in routes if len(route) > 1]
+    if len(routes) == 0:
+        return horiz_open, vert_open
+
+    points = np.array([point for route in routes for point in route],
+                      dtype=np.int64).reshape(-1, 2)
+    # pairs of points straddling two routes are not steps
+    is_step = np.ones(len(points) - 1, dtype=bool)
+    is_step[np.cumsum([len(route) for route in routes])[:-1] - 1] = False
+
+    first = points[:-1][is_step]
+    second = points[1:][is_step]
+    delta = second - first
+    lower = np.minimum(first, second)
+
+    # a step north or south crosses a horizontal wall
+    vertical = (delta[:, 0] == 0) & (np.abs(delta[:, 1]) == 2)
+    xs = (lower[vertical, 0] - 1 - x0) // 2
+    ys = (lower[vertical, 1] + 1 - y0) // 2
+    inside = (xs >= 0) & (xs < nx) & (ys >= 0) & (ys <= ny)
+    horiz_open[xs[inside], ys[inside]] = True
+
+    # and a step east or west crosses a vertical wall
+    horizontal = (delta[:, 1] == 0) & (np.abs(delta[:, 0]) == 2)
+    xs = (lower[horizontal, 0] + 1 - x0) // 2
+    ys = (lower[horizontal, 1] - 1 - y0) // 2
+    inside = (xs >= 0) & (xs <= nx) & (ys >= 0) & (ys < ny)
+    vert_open[xs[inside], ys[inside]] = True
+
+    return horiz_open, vert_open
+
+
+def _walls_from_mask(mask: np.ndarray,
+                     x0: int, y0: int,
+                     step: Point) -> Walls:
+    """
+    Helper function to turn a wall mask from _passage_masks into Walls
+    """
+    inds_x, inds_y = np.nonzero(mask)
+    xs: list[int] = (x0 + 2 * inds_x).tolist()
+    ys: list[int] = (y0 + 2 * inds_y).tolist()
+    dx, dy = step
 
-    horiz_walls: Walls = [((x, y), (x + 2, y))
-                          for x in range(x0, x1, 2)
-                          for y in range(y0, y1 + 2, 2)]
-    vert_walls: Walls = [((x, y), (x, y + 2))
-                         for x in range(x0, x1 + 2, 2)
-                         for y in range(y0, y1, 2)]
+    return [((x, y), (x + dx, y + dy)) for x, y in zip(xs, ys)]
 
-    return horiz_walls + vert_walls
+
+def _crossed_walls(routes: Routes) -> set[Wall]:
+    """
+    Helper function to get the walls crossed by the steps of the routes,
+    the pure Python counterpart of _passage_masks
+    """
+    crossed = set()
+    for route in routes:
+        for (xa, ya), (xb, yb) in zip(route, route[1:]):
+            x, y = min(xa, xb), min(ya, yb)
+            if xa == xb:
+                crossed.add(((x - 1, y + 1), (x + 1, y + 1)))
+            else:
+                crossed.add(((x + 1, y - 1), (x + 1, y + 1)))
+
+    return crossed
 
 
 def walls_from_trails(trails: Trails) -> Walls:
     """
     Generate the walls that complement all the routes in a Trails collection.
     All possible allowed walls are generated.
+
+    Trails of up to PURE_PYTHON_CELLS cells are walled in pure Python,
+    unless NumPy is loaded already, so small mazes do not pay for loading
+    it. Both ways give the same walls in the same order.
     """
+    (x0, y0), (x1, y1) = trails.point(0), trails.point(-1)
+    if (not(is_loaded('numpy')) and
+            (x1 - x0 + 2) * (y1 - y0 + 2) <= 4 * PURE_PYTHON_CELLS):
+        crossed = _crossed_walls(trails.all_routes())
+        return [wall for wall in _all_potential_walls(trails)
+                if wall not in crossed]
 
-    walls = _all_potential_walls(trails)
-    forbidden_walls = []
+    x0, y0, x1, y1 = x0 - 1, y0 - 1, x1 + 1, y1 + 1
 
-    routes = trails.all_routes()
+    horiz_open, vert_open = _passage_masks(trails.all_routes(),
+                                           x0, y0, x1, y1)
+
+    return (_walls_from_mask(~horiz_open, x0, y0, (2, 0)) +
+            _walls_from_mask(~vert_open, x0, y0, (0, 2)))
+
+
+def grid_maze_from_trails(trails: Trails) -> GridMaze:
+    """
+    Generate the GridMaze of all allowed walls that complement the routes
+    in a Trails collection, with the main of the trails as solution. This
+    is walls_from_trails without going through lists of Walls
+    """
+    x1, y1 = add_points(trails.point(-1), (1, 1))
+
+    horiz_open, vert_open = _passage_masks(trails.all_routes(), 0, 0, x1, y1)
+
+    return GridMaze.from_wall_grids(trails.main, ~horiz_open, ~vert_open)
+
+
+def _generate_grid_mazes(N: int, M: int,
+                         seeds: list[np.random.SeedSequence],
+                         algorithm: str = 'sprout') -> list[GridMaze]:
+    """
+    Worker function of generate_mazes: generate one maze per seed
+    """
+    grid_mazes = []
+    for seed in seeds:
+        trails = trails_generator(N, M, rng=np.random.default_rng(seed),
+                                  algorithm=algorithm)
+        grid_mazes.append(grid_maze_from_trails(trails))
+
+    return grid_mazes
+
+
+def _chunk_tasks(N: int, M: int, count: int, seed: Optional[int],
+                 chunksize: int, algorithm: str
+                 ) -> Iterator[tuple[int, int, list[np.random.SeedSequence],
+                                     str]]:
+    """
+    The tasks of generate_mazes, the arguments of _generate_grid_mazes for
+    every chunk of mazes
+    """
+    seeds = np.random.SeedSequence(seed).spawn(count)
+    return ((N, M, seeds[n: n + chunksize], algorithm)
+            for n in range(0, count, chunksize))
+
+
+def generate_mazes(N: int, M: int, count: int,
+                   workers: Optional[int] = None,
+                   seed: Optional[int] = None,
+                   chunksize: int = 8,
+                   ordered: bool = False,
+                   as_grid: bool = False,
+                   algorithm: str = 'sprout'
+                   ) -> Iterator[Union[Maze, GridMaze]]:
+    """
+    Generate many N x M mazes (solution routes and walls) in parallel.
+
+    The mazes are generated in chunks on a pool of processes (see
+    limnos.parallel.imap_bounded) and sent back as GridMazes, which are
+    yielded as soon as their chunk is done. Only a bounded number of
+    chunks is in flight at any time, so consuming the mazes slowly does
+    not pile up finished mazes in memory.
+
+    Args:
+        N: number of cells along x
+        M: number of cells along y
+        count: number of mazes to generate
+        workers: number of processes. Defaults to the number of CPUs. If 1,
+          the mazes are generated in the calling process
+        seed: seed for the full batch. Each maze gets its own seed derived
+          from it, so the k'th maze only depends on seed and k
+        chunksize: number of mazes per task sent to a worker
+        ordered: if True, yield the mazes in the order of their seeds
+          instead of in the order they finish
+        as_grid: if True, yield GridMazes instead of (route, walls) tuples
+        algorithm: the generation algorithm, see trails_generator
+    """
+    def convert(grid_maze: GridMaze) -> Union[Maze, GridMaze]:
+        return grid_maze if as_grid else grid_maze.to_maze()
 
-    for wall in walls:
-        w1 = wall
-        w2 = (wall[1], wall[0])
-        for route in routes:
-            intersect1 = _wall_intersects_route(route, w1)
-            intersect2 = _wall_intersects_route(route, w2)
-            if intersect1 or intersect2:
-                forbidden_walls.append(wall)
+    _check_algorithm(algorithm)
 
-    legal_walls = [wall for wall in walls if wall not in forbidden_walls]
+    tasks = _chunk_tasks(N, M, count, seed, chunksize, algorithm)
 
-    return legal_walls
+    for grid_mazes in imap_bounded(_generate_grid_mazes, tasks,
+                                   workers=workers, ordered=ordered):
+        for grid_maze in grid_mazes:
+            yield convert(grid_maze)
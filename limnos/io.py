@@ -0,0 +1,394 @@
+"""
+Binary corpus files of mazes.
+
+A corpus file holds any number of mazes, each with its wall grid and,
+optionally, the full Trails it was generated from. All numbers are little
+endian. The layout is
+
+    header   magic b'LIMNOSMZ', version (u2), header size (u2),
+             flags (u4), maze count (u8), index offset (u8)
+    records  one per maze, see below
+    index    the file offset of every record (u8 each)
+
+and each record is
+
+    record size (u4, including this field), N (u4), M (u4),
+    route count R (u4), start point of the main route (i4, i4),
+    parent route of every route (R x i4, -1 for the main route),
+    index of the sprout point in the parent's main (R x u4),
+    number of points of every route (R x u4),
+    horizontal and vertical walls (np.packbits of the GridMaze grids),
+    steps of all routes, 2 bits per step (np.packbits of N/E/S/W = 0..3)
+
+The routes come in the pre-order of Trails.all_routes and every branch
+starts at its sprout point, so only its steps need storing.
+
+The index is (re)written when a writer is closed. Readers map the file
+into memory and only touch the bytes of the records they are asked for.
+A file whose writer never got to write the index is read by walking the
+records from the start.
+"""
+import mmap
+import os
+import struct
+from typing import BinaryIO, Iterator, Optional, Union
+
+import numpy as np
+
+from .types import GridMaze, Route, Trails
+
+MAGIC = b'LIMNOSMZ'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<8sHHIQQ')
+_RECORD = struct.Struct('<IIIIii')
+
+# steps in the order of their codes: north, east, south, west
+STEPS = np.array([(0, 2), (2, 0), (0, -2), (-2, 0)], dtype=np.int64)
+
+PathLike = Union[str, os.PathLike]
+
+
+def _flatten_trails(trails: Trails) -> tuple[list[Route],
+                                             list[int],
+                                             list[int]]:
+    """
+    Get the routes of a trails in pre-order along with the position of
+    the parent of every route and of the sprout point in that parent
+    """
+    routes: list[Route] = []
+    parents: list[int] = []
+    sprouts: list[int] = []
+
+    stack: list[tuple[Trails, int, dict]] = [(trails, -1, {})]
+    while stack:
+        subtrail, parent, parent_positions = stack.pop()
+        position = len(routes)
+        routes.append(subtrail.main)
+        parents.append(parent)
+        if parent == -1:
+            sprouts.append(0)
+        else:
+            if not(parent_positions):
+                parent_main = routes[parent]
+                parent_positions.update((point, ind) for ind, point
+                                        in enumerate(parent_main))
+            sprouts.append(parent_positions[subtrail.main[0]])
+        positions: dict = {}
+        for branch in reversed(subtrail.branches):
+            stack.append((branch, position, positions))
+
+    return routes, parents, sprouts
+
+
+def _encode_steps(routes: list[Route]) -> np.ndarray:
+    """
+    Direction codes of all steps of all routes, concatenated
+    """
+    codes = []
+    for route in routes:
+        points = np.array(route, dtype=np.int64).reshape(-1, 2)
+        deltas = points[1:] - points[:-1]
+        # among the deltas of L1 length 2, dx + 5*dy tells the steps apart
+        keys = deltas[:, 0] + 5 * deltas[:, 1]
+        route_codes = np.select([keys == 10, keys == 2, keys == -10,
+                                 keys == -2], [0, 1, 2, 3], -1)
+        single = np.abs(deltas).sum(axis=1) == 2
+        if not(single.all()) or (route_codes < 0).any():
+            raise ValueError("Routes must consist of single steps")
+        codes.append(route_codes)
+
+    if len(codes) == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.concatenate(codes).astype(np.uint8)
+
+
+def _pack_codes(codes: np.ndarray) -> np.ndarray:
+    bits = np.zeros((len(codes), 2), dtype=np.uint8)
+    bits[:, 0] = codes >> 1
+    bits[:, 1] = codes & 1
+    return np.packbits(bits, axis=None)
+
+
+def _unpack_codes(packed: np.ndarray, count: int) -> np.ndarray:
+    bits = np.unpackbits(packed, count=2 * count).reshape(-1, 2)
+    return 2 * bits[:, 0] + bits[:, 1]
+
+
+def encode_record(maze: GridMaze, trails: Optional[Trails] = None) -> bytes:
+    """
+    Encode a maze, and optionally the trails it was made from, as a record
+    of a corpus file. Without trails, only the solution route is stored
+    """
+    if trails is None:
+        routes: list[Route] = [[(x, y) for x, y in maze.route.tolist()]]
+        parents, sprouts = [-1], [0]
+    else:
+        routes, parents, sprouts = _flatten_trails(trails)
+
+    start = routes[0][0] if len(routes[0]) > 0 else (0, 0)
+    lengths = [len(route) for route in routes]
+    packed_steps = _pack_codes(_encode_steps(routes))
+
+    N, M = maze.shape
+    body = b''.join([np.array(parents, dtype='<i4').tobytes(),
+                     np.array(sprouts, dtype='<u4').tobytes(),
+                     np.array(lengths, dtype='<u4').tobytes(),
+                     maze.packed_horizontal.tobytes(),
+                     maze.packed_vertical.tobytes(),
+                     packed_steps.tobytes()])
+    size = _RECORD.size + len(body)
+
+    return _RECORD.pack(size, N, M, len(routes), *start) + body
+
+
+class _Record():
+    """
+    The parsed layout of a record in a buffer, without copying anything
+    """
+
+    def __init__(self, buffer, offset: int):
+
+        (self.size, N, M, n_routes,
+         x, y) = _RECORD.unpack_from(buffer, offset)
+        self.shape = (N, M)
+        self.start = (x, y)
+
+        pos = offset + _RECORD.size
+        self.parents = np.frombuffer(buffer, dtype='<i4', count=n_routes,
+                                     offset=pos)
+        pos += 4 * n_routes
+        self.sprouts = np.frombuffer(buffer, dtype='<u4', count=n_routes,
+                                     offset=pos)
+        pos += 4 * n_routes
+        self.lengths = np.frombuffer(buffer, dtype='<u4', count=n_routes,
+                                     offset=pos)
+        pos += 4 * n_routes
+
+        n_horizontal = (N * (M + 1) + 7) // 8
+        n_vertical = ((N + 1) * M + 7) // 8
+        self.packed_horizontal = np.frombuffer(buffer, dtype=np.uint8,
+                                               count=n_horizontal, offset=pos)
+        pos += n_horizontal
+        self.packed_vertical = np.frombuffer(buffer, dtype=np.uint8,
+                                             count=n_vertical, offset=pos)
+        pos += n_vertical
+
+        self.n_steps = int(np.maximum(self.lengths.astype(np.int64) - 1,
+                                      0).sum())
+        self.packed_steps = np.frombuffer(buffer, dtype=np.uint8,
+                                          count=(2 * self.n_steps + 7) // 8,
+                                          offset=pos)
+
+    def routes(self, count: Optional[int] = None) -> list[Route]:
+        """
+        Decode the first count routes (by default all), in pre-order
+        """
+        lengths = self.lengths[:count].tolist()
+        n_steps = sum(max(length - 1, 0) for length in lengths)
+        deltas = STEPS[_unpack_codes(self.packed_steps, n_steps)]
+
+        routes: list[Route] = []
+        step_pos = 0
+        for ind, length in enumerate(lengths):
+            if length == 0:
+                routes.append([])
+                continue
+            if ind == 0:
+                start = self.start
+            else:
+                parent_route = routes[self.parents[ind]]
+                start = parent_route[self.sprouts[ind]]
+            points = np.empty((length, 2), dtype=np.int64)
+            points[0] = start
+            np.cumsum(deltas[step_pos: step_pos + length - 1], axis=0,
+                      out=points[1:])
+            points[1:] += start
+            step_pos += length - 1
+            routes.append([(x, y) for x, y in points.tolist()])
+
+        return routes
+
+
+class CorpusWriter():
+    """
+    Writer of corpus files, appending one maze at a time. Use as a context
+    manager, or call close, for the index to be written.
+
+    The corpus can also go to a binary file object positioned at its
+    start, such as sys.stdout.buffer. If that stream can not seek (a pipe,
+    say), no index is written and readers find the records by walking
+    through them. A stream given by the caller is flushed, not closed.
+
+    Args:
+        target: the corpus file, or a binary file object
+        append: if True, add to an existing corpus file instead of
+          overwriting it
+    """
+
+    def __init__(self, target: Union[PathLike, BinaryIO],
+                 append: bool = False):
+
+        self.offsets: list[int] = []
+        self._owns_file = isinstance(target, (str, os.PathLike))
+        self._closed = False
+
+        if not(isinstance(target, (str, os.PathLike))):
+            if append:
+                raise ValueError("Only corpus files given by path can be "
+                                 "appended to")
+            self._file: BinaryIO = target
+            self._position = 0
+            self._write(self._header(0, 0))
+        elif append and os.path.exists(target):
+            with CorpusReader(target) as reader:
+                self.offsets = reader.offsets.tolist()
+                end = reader.end_of_records
+            self._file = open(target, 'r+b')
+            self._file.seek(end)
+            self._file.truncate()
+            # drop the old index from the header too, so that readers walk
+            # the records until close writes the new index
+            self._file.seek(0)
+            self._file.write(self._header(0, 0))
+            self._file.seek(end)
+            self._position = end
+        else:
+            self._file = open(target, 'wb')
+            self._position = 0
+            self._write(self._header(0, 0))
+
+    @staticmethod
+    def _header(count: int, index_offset: int) -> bytes:
+        return _HEADER.pack(MAGIC, FORMAT_VERSION, _HEADER.size, 0, count,
+                            index_offset)
+
+    def _write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._position += len(data)
+
+    def write(self, maze: GridMaze, trails: Optional[Trails] = None) -> None:
+        """
+        Append a maze, and optionally the trails it was made from
+        """
+        self.offsets.append(self._position)
+        self._write(encode_record(maze, trails))
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._file.seekable():
+            index_offset = self._position
+            self._write(np.array(self.offsets, dtype='<u8').tobytes())
+            self._file.seek(0)
+            self._file.write(self._header(len(self.offsets), index_offset))
+            self._file.seek(self._position)
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self) -> 'CorpusWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class CorpusReader():
+    """
+    Random access reader of corpus files. The file is memory mapped, so
+    opening is immediate and only the records that are read get loaded.
+    """
+
+    def __init__(self, path: PathLike):
+
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < _HEADER.size:
+                raise ValueError(f"{path} is not a limnos corpus file")
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, header_size,
+         _, count, index_offset) = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a limnos corpus file")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Unsupported corpus format version {version}")
+
+        if index_offset > 0:
+            self.offsets = np.frombuffer(self._mmap, dtype='<u8',
+                                         count=count, offset=index_offset)
+            self.end_of_records = index_offset
+        else:
+            self.offsets, self.end_of_records = self._scan(header_size)
+
+    def _scan(self, start: int) -> tuple[np.ndarray, int]:
+        """
+        Find the records of a file without index
+        """
+        offsets = []
+        pos = start
+        while pos + _RECORD.size <= len(self._mmap):
+            size, = struct.unpack_from('<I', self._mmap, pos)
+            if size < _RECORD.size or pos + size > len(self._mmap):
+                break
+            offsets.append(pos)
+            pos += size
+        return np.array(offsets, dtype='<u8'), pos
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def _record(self, k: int) -> _Record:
+        if not(-len(self) <= k < len(self)):
+            raise IndexError("Maze index out of range")
+        return _Record(self._mmap, int(self.offsets[k]))
+
+    def __getitem__(self, k: int) -> GridMaze:
+        """
+        The k'th maze of the corpus
+        """
+        record = self._record(k)
+        routes = record.routes(1)
+
+        return GridMaze(record.shape,
+                        record.packed_horizontal.copy(),
+                        record.packed_vertical.copy(),
+                        np.array(routes[0], dtype=np.int32).reshape(-1, 2))
+
+    def trails(self, k: int) -> Trails:
+        """
+        The trails of the k'th maze of the corpus. For mazes stored
+        without trails, this is just the solution route
+        """
+        record = self._record(k)
+        routes = record.routes()
+        parents = record.parents.tolist()
+
+        subtrails: list[Trails] = []
+        for route, parent in zip(routes, parents):
+            subtrail = Trails(main=route, branches=[])
+            if parent >= 0:
+                subtrails[parent].add_branch(subtrail)
+            subtrails.append(subtrail)
+
+        return subtrails[0]
+
+    def __iter__(self) -> Iterator[GridMaze]:
+        for k in range(len(self)):
+            yield self[k]
+
+    def close(self) -> None:
+        # drop the views into the map before closing it
+        self.offsets = np.array(self.offsets)
+        self._mmap.close()
+
+    def __enter__(self) -> 'CorpusReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,53 @@
+"""
+Lazy loading of the heavy dependencies.
+
+NumPy and matplotlib take a large share of the start-up time of a fresh
+interpreter, while the pure-Python generation pipeline needs neither.
+Modules bind them with lazy_module, so that they are only imported on
+the first access to one of their attributes, i.e. once a NumPy-backed
+engine runs or a plot is drawn:
+
+    if TYPE_CHECKING:
+        import numpy as np
+    else:
+        np = lazy_module('numpy')
+
+Such modules use `from __future__ import annotations`, so that their
+annotations do not touch the lazy modules.
+"""
+import importlib
+import sys
+from types import ModuleType
+from typing import Any
+
+
+class _LazyModule(ModuleType):
+    """
+    Stand-in for a module that imports it on first attribute access, and
+    then keeps every attribute it looked up
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(importlib.import_module(self.__name__), name)
+        setattr(self, name, value)
+        return value
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self.__name__!r}>"
+
+
+def lazy_module(name: str) -> ModuleType:
+    """
+    Get a module, or a stand-in that imports it when first used if it was
+    not imported yet
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return _LazyModule(name)
+
+
+def is_loaded(name: str) -> bool:
+    """
+    Check whether a module was imported already
+    """
+    return name in sys.modules
@@ -0,0 +1,179 @@
+"""
+Difficulty metrics of mazes, read off their Trails without solving them.
+
+The solution is the main of the trails, and every step along a route of
+the trails is a passage, so the metrics take a few NumPy passes over the
+points of the trails.
+
+generate_with_target generates mazes until one meets targets on the
+metrics. With the 'sprout' algorithm the solution route is sampled first,
+and candidates whose solution already misses the targets are dropped
+before any branch is grown.
+"""
+from typing import Mapping, NamedTuple, Optional
+
+import numpy as np
+
+from .generation import (_check_algorithm,
+                         solution_route,
+                         sprout_branches,
+                         trails_generator)
+from .rng import RNG, as_random_stream
+from .stats import GenerationStats
+from .types import Route, Trails
+
+# a range of values, either end left open with None
+Target = tuple[Optional[float], Optional[float]]
+
+
+class MazeMetrics(NamedTuple):
+    """
+    Difficulty metrics of a maze
+
+    Attributes:
+        solution_length: number of cells on the solution route
+        turns: number of turns along the solution route
+        branches: number of branches of the trails
+        dead_ends: number of cells with a single way in or out
+        mean_branch_depth: mean nesting depth of the branches, those
+          sprouting off the solution being at depth 1
+        max_branch_depth: largest nesting depth of the branches
+    """
+    solution_length: int
+    turns: int
+    branches: int
+    dead_ends: int
+    mean_branch_depth: float
+    max_branch_depth: int
+
+
+# the metrics known from the solution route alone
+ROUTE_METRICS = ('solution_length', 'turns')
+
+
+def count_turns(route: Route) -> int:
+    """
+    Count the turns along a route
+    """
+    steps = np.diff(np.array(route, dtype=np.int64).reshape(-1, 2), axis=0)
+    return int(np.any(steps[1:] != steps[:-1], axis=1).sum())
+
+
+def route_metrics(route: Route) -> dict[str, int]:
+    """
+    Get the ROUTE_METRICS of a solution route
+    """
+    return {'solution_length': len(route), 'turns': count_turns(route)}
+
+
+def trails_metrics(trails: Trails) -> MazeMetrics:
+    """
+    Get the metrics of the maze of some trails
+    """
+    store = trails._store
+    numbers = store.preorder(trails._route)
+
+    depths = {trails._route: 0}
+    for number in numbers[1:]:
+        depths[number] = depths[store.parents[number]] + 1
+    branch_depths = np.array(list(depths.values())[1:], dtype=np.int64)
+
+    # the cells at either end of every step of every route
+    coords = np.frombuffer(store.coords, dtype=np.intc).reshape(-1, 2)
+    offsets = store.offsets
+    N, M = store.shape
+    ends = []
+    for number in numbers:
+        points = coords[offsets[number]: offsets[number + 1]]
+        cells = (points[:, 0] // 2) * M + points[:, 1] // 2
+        ends += [cells[:-1], cells[1:]]
+    ways = np.bincount(np.concatenate(ends), minlength=N * M)
+
+    main = trails.main
+    return MazeMetrics(solution_length=len(main),
+                       turns=count_turns(main),
+                       branches=len(branch_depths),
+                       dead_ends=int((ways == 1).sum()),
+                       mean_branch_depth=(float(branch_depths.mean())
+                                          if len(branch_depths) else 0.0),
+                       max_branch_depth=int(branch_depths.max(initial=0)))
+
+
+def _check_targets(targets: dict[str, Target]) -> None:
+    unknown = set(targets) - set(MazeMetrics._fields)
+    if unknown:
+        raise ValueError(f"Unknown metrics {', '.join(sorted(unknown))}, "
+                         f"use {', '.join(MazeMetrics._fields)}")
+    for low, high in targets.values():
+        if low is not None and high is not None and low > high:
+            raise ValueError("Targets must not be empty ranges")
+
+
+def meets_targets(metrics: Mapping[str, float],
+                  targets: dict[str, Target]) -> bool:
+    """
+    Check whether metrics lie in their target ranges. Targets of metrics
+    that are not given are ignored, so partial metrics can be checked
+    """
+    for name, (low, high) in targets.items():
+        if name not in metrics:
+            continue
+        value = metrics[name]
+        if (low is not None and value < low) or (
+                high is not None and value > high):
+            return False
+    return True
+
+
+def generate_with_target(N: int, M: int,
+                         targets: dict[str, Target],
+                         rng: RNG = None,
+                         algorithm: str = 'sprout',
+                         max_tries: int = 100,
+                         stats: Optional[GenerationStats] = None,
+                         solution: str = 'transform',
+                         bias: float = 0.05) -> Trails:
+    """
+    Generate N x M trails whose metrics meet the targets, trying at most
+    max_tries candidates. Raises a ValueError if none of them does.
+
+    Args:
+        N: number of cells along x
+        M: number of cells along y
+        targets: ranges of metrics, (low, high) by the name of the metric
+          in MazeMetrics, e.g. {'solution_length': (100, None)}
+        rng: source of randomness, see limnos.rng
+        algorithm: the generation algorithm, see trails_generator. Only
+          'sprout' checks the ROUTE_METRICS before growing the branches
+        max_tries: the number of candidates to generate at most
+        stats: collects GenerationStats, including the number of rejected
+          and early aborted candidates
+        solution: the solution route sampler of 'sprout', see
+          solution_route
+        bias: the bias of the 'loop_erased' sampler
+    """
+    _check_algorithm(algorithm)
+    _check_targets(targets)
+
+    stream = as_random_stream(rng)
+    for _ in range(max_tries):
+        if algorithm == 'sprout':
+            route = solution_route(N, M, stream, stats, solution, bias)
+            if not(meets_targets(route_metrics(route), targets)):
+                if stats is not None:
+                    stats.aborted_candidates += 1
+                continue
+            trails = sprout_branches(route, stream, stats)
+            if stats is not None:
+                stats.record_branches(trails.all_routes()[1:])
+        else:
+            trails = trails_generator(N, M, stream, algorithm, stats,
+                                      solution, bias)
+
+        if meets_targets(trails_metrics(trails)._asdict(), targets):
+            return trails
+        if stats is not None:
+            stats.rejected_candidates += 1
+
+    raise ValueError(f"No {N} x {M} maze met the targets in {max_tries} "
+                     "tries")
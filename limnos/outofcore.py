@@ -0,0 +1,310 @@
+"""
+Out-of-core generation of mazes too big for memory.
+
+eller_maze carves a perfect N x M maze with Eller's algorithm, one row of
+M cells (fixed x) at a time, and writes its wall grids bit-packed into a
+file as it goes. Only the current row is held in memory, plus a band of
+packed rows waiting to be written, so mazes of 100k x 100k cells take
+some 2.5 GB of disk and little RAM. The file is read back through a
+DiskMaze, which maps it into memory and unpacks the walls of any window
+of cells on demand.
+
+The file layout, all numbers little endian, is
+
+    header      magic b'LIMNOSWG', N (u8), M (u8), 8 bytes reserved
+    horizontal  N rows of np.packbits of the M + 1 horizontal walls
+    vertical    N + 1 rows of np.packbits of the M vertical walls
+
+with the walls indexed as the wall grids of a GridMaze. The outer walls
+are all present, as in grid_maze_from_trails.
+"""
+import os
+import struct
+from typing import Literal, Optional, Union
+
+import numpy as np
+
+from .generation import _walls_from_mask
+from .rng import RNG, as_random_stream
+from .solve import solve
+from .types import GridMaze, Walls
+
+MAGIC = b'LIMNOSWG'
+
+_HEADER = struct.Struct('<8sQQ8x')
+
+# the number of bytes of packed rows written at a time by eller_maze
+BAND_BYTES = 2**24
+
+PathLike = Union[str, os.PathLike]
+
+
+def _row_bytes(N: int, M: int) -> tuple[int, int]:
+    """
+    The number of bytes of a packed row of horizontal and vertical walls
+    """
+    return (M + 8) // 8, (M + 7) // 8
+
+
+def _forest_joins(labels: np.ndarray,
+                  candidates: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Join neighbouring cells of a row without closing loops. The cells k
+    and k + 1 may be joined where candidates[k] is set, and cells with the
+    same label are connected already.
+
+    The candidate joins are cut down to a spanning forest of the sets with
+    Boruvka's algorithm: in every round every set takes its leftmost join
+    to another set, which never closes a loop, and the sets so joined are
+    merged by pointer jumping. That takes O(log M) rounds of NumPy passes.
+
+    Returns the accepted joins and the merged set of every label
+    """
+    n_labels = int(labels.max()) + 1
+    sets = np.arange(n_labels)
+    accepted = np.zeros(len(candidates), dtype=bool)
+
+    joins = np.nonzero(candidates & (labels[:-1] != labels[1:]))[0]
+    left, right = labels[joins], labels[joins + 1]
+    while True:
+        set_a, set_b = sets[left], sets[right]
+        live = set_a != set_b
+        if not(live.any()):
+            return accepted, sets
+        joins, left, right = joins[live], left[live], right[live]
+        set_a, set_b = set_a[live], set_b[live]
+
+        # the joins come sorted, so the first join of a set is its leftmost
+        leftmost = np.full(n_labels, len(candidates))
+        firsts, inds = np.unique(set_a, return_index=True)
+        leftmost[firsts] = joins[inds]
+        firsts, inds = np.unique(set_b, return_index=True)
+        leftmost[firsts] = np.minimum(leftmost[firsts], joins[inds])
+
+        by_a = leftmost[set_a] == joins
+        by_b = leftmost[set_b] == joins
+        accepted[joins[by_a | by_b]] = True
+
+        # point every set across its join, and break the mutual choices
+        parents = np.arange(n_labels)
+        parents[set_a[by_a]] = set_b[by_a]
+        parents[set_b[by_b]] = set_a[by_b]
+        mutual = ((parents[parents] == np.arange(n_labels)) &
+                  (parents > np.arange(n_labels)))
+        parents[mutual] = np.nonzero(mutual)[0]
+        while True:
+            grandparents = parents[parents]
+            if np.array_equal(grandparents, parents):
+                break
+            parents = grandparents
+        sets = parents[sets]
+
+
+class DiskMaze():
+    """
+    A maze whose wall grids live bit-packed in a file, see eller_maze
+
+    Args:
+        path: the file
+        writable: whether to map the file for writing
+    """
+
+    def __init__(self, path: PathLike, writable: bool = False):
+
+        with open(path, 'rb') as file:
+            header = file.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"{path} is not a wall grid file")
+        magic, N, M = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a wall grid file")
+
+        self.path = path
+        self.shape = (N, M)
+        h_bytes, v_bytes = _row_bytes(N, M)
+        mode: Literal['r', 'r+'] = 'r+' if writable else 'r'
+        self._horizontal: Optional[np.memmap] = np.memmap(
+            path, dtype=np.uint8, mode=mode, offset=_HEADER.size,
+            shape=(N, h_bytes))
+        self._vertical: Optional[np.memmap] = np.memmap(
+            path, dtype=np.uint8, mode=mode,
+            offset=_HEADER.size + N * h_bytes, shape=(N + 1, v_bytes))
+
+    @classmethod
+    def create(cls, path: PathLike, N: int, M: int) -> 'DiskMaze':
+        """
+        Make a file for the wall grids of an N x M maze, without any walls
+        yet, and open it for writing
+        """
+        if N < 1 or M < 1:
+            raise ValueError("Mazes must have at least one cell")
+        h_bytes, v_bytes = _row_bytes(N, M)
+        with open(path, 'wb') as file:
+            file.write(_HEADER.pack(MAGIC, N, M))
+            file.truncate(_HEADER.size + N * h_bytes + (N + 1) * v_bytes)
+
+        return cls(path, writable=True)
+
+    def _packed(self) -> tuple[np.memmap, np.memmap]:
+        """
+        The mapped horizontal and vertical wall grids, bit-packed by row
+        """
+        if self._horizontal is None or self._vertical is None:
+            raise ValueError(f"The maze in {self.path} is closed")
+        return self._horizontal, self._vertical
+
+    def _window(self, i0: int, j0: int, i1: Optional[int],
+                j1: Optional[int]) -> tuple[int, int, int, int]:
+        N, M = self.shape
+        i1 = N if i1 is None else i1
+        j1 = M if j1 is None else j1
+        if not(0 <= i0 < i1 <= N and 0 <= j0 < j1 <= M):
+            raise ValueError(f"Window [{i0}, {i1}) x [{j0}, {j1}) not in "
+                             "the maze")
+        return i0, j0, i1, j1
+
+    @staticmethod
+    def _unpack(packed: np.ndarray, rows: slice,
+                start: int, stop: int) -> np.ndarray:
+        """
+        Unpack the bits start to stop of some rows, touching only the
+        bytes that hold them
+        """
+        first = start // 8
+        block = np.asarray(packed[rows, first: (stop + 7) // 8])
+        bits = np.unpackbits(block, axis=1)
+        return bits[:, start - 8 * first: stop - 8 * first].astype(bool)
+
+    def wall_grids(self, i0: int = 0, j0: int = 0,
+                   i1: Optional[int] = None,
+                   j1: Optional[int] = None) -> tuple[np.ndarray,
+                                                      np.ndarray]:
+        """
+        Get the wall grids of the window of cells [i0, i1) x [j0, j1),
+        by default the whole maze: the horizontal walls [i0:i1, j0:j1 + 1]
+        and the vertical walls [i0:i1 + 1, j0:j1] of the GridMaze grids
+        """
+        i0, j0, i1, j1 = self._window(i0, j0, i1, j1)
+        horizontal, vertical = self._packed()
+
+        return (self._unpack(horizontal, slice(i0, i1), j0, j1 + 1),
+                self._unpack(vertical, slice(i0, i1 + 1), j0, j1))
+
+    def walls(self, i0: int = 0, j0: int = 0,
+              i1: Optional[int] = None, j1: Optional[int] = None) -> Walls:
+        """
+        Get the walls of the window of cells [i0, i1) x [j0, j1), see
+        wall_grids, in the order of walls_from_trails
+        """
+        horizontal, vertical = self.wall_grids(i0, j0, i1, j1)
+
+        return (_walls_from_mask(horizontal, 2 * i0, 2 * j0, (2, 0)) +
+                _walls_from_mask(vertical, 2 * i0, 2 * j0, (0, 2)))
+
+    def grid_maze(self) -> GridMaze:
+        """
+        Load the whole maze, with its solution route, into a GridMaze
+        """
+        horizontal, vertical = self.wall_grids()
+        maze = GridMaze.from_wall_grids([], horizontal, vertical)
+        route = solve(maze)
+        if route is None:
+            raise ValueError("The maze has no way from (1, 1) to the NE "
+                             "corner")
+
+        return GridMaze.from_wall_grids(route, horizontal, vertical)
+
+    def flush(self) -> None:
+        for packed in self._packed():
+            packed.flush()
+
+    def close(self) -> None:
+        """
+        Write the changes to the file and unmap it. Closing twice does
+        nothing, reading after closing raises a ValueError
+        """
+        if self._horizontal is not None:
+            self.flush()
+            self._horizontal = self._vertical = None
+
+    def __enter__(self) -> 'DiskMaze':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def eller_maze(path: PathLike, N: int, M: int, rng: RNG = None,
+               join_probability: float = 0.5,
+               down_probability: float = 0.3) -> DiskMaze:
+    """
+    Carve a perfect N x M maze with Eller's algorithm straight into a wall
+    grid file, see the module docstring. Every cell can be reached from
+    every other in exactly one way, in particular the NE cell from (1, 1).
+
+    Row by row, neighbouring cells of different sets are joined at random,
+    without closing loops, and every set then passes down into the next
+    row through at least one random cell. The last row joins all sets.
+
+    Args:
+        path: the file to write
+        N: number of cells along x, the number of rows
+        M: number of cells along y, the length of the rows
+        rng: source of randomness, see limnos.rng
+        join_probability: the odds of joining neighbours in a row, higher
+          odds give longer corridors along y
+        down_probability: the odds of every cell to pass down into the next
+          row, besides the one cell every set must pass down
+
+    Returns:
+        The maze, opened for reading
+    """
+    for probability in (join_probability, down_probability):
+        if not(0 <= probability <= 1):
+            raise ValueError("Probabilities must be between 0 and 1")
+
+    generator = as_random_stream(rng).numpy_generator()
+    h_bytes, v_bytes = _row_bytes(N, M)
+    band = max(1, BAND_BYTES // (h_bytes + v_bytes))
+
+    with DiskMaze.create(path, N, M) as maze:
+        packed_horizontal, packed_vertical = maze._packed()
+        packed_vertical[0] = np.packbits(np.ones(M, dtype=bool))
+        packed_vertical[N] = packed_vertical[0]
+
+        horizontal = np.ones(M + 1, dtype=bool)
+        h_band = np.empty((band, h_bytes), dtype=np.uint8)
+        v_band = np.empty((band, v_bytes), dtype=np.uint8)
+        labels = np.arange(M)
+        for i in range(N):
+            if i < N - 1:
+                candidates = generator.random(M - 1) < join_probability
+            else:
+                candidates = np.ones(M - 1, dtype=bool)
+            joined, sets = _forest_joins(labels, candidates)
+            horizontal[1:M] = ~joined
+            h_band[i % band] = np.packbits(horizontal)
+
+            cell_sets = sets[labels]
+            down = generator.random(M) < down_probability
+            # a random cell of every set passes down
+            order = np.lexsort((generator.random(M), cell_sets))
+            firsts = np.unique(cell_sets[order], return_index=True)[1]
+            down[order[firsts]] = True
+            v_band[i % band] = np.packbits(~down)
+
+            fresh = len(sets) + np.arange(M)
+            labels = np.unique(np.where(down, cell_sets, fresh),
+                               return_inverse=True)[1]
+
+            if (i + 1) % band == 0 or i == N - 1:
+                start = i - i % band
+                packed_horizontal[start: i + 1] = h_band[:i % band + 1]
+                # the vertical walls south of the row i + 1 are row i + 1,
+                # and those of the last row stay outer walls
+                stop = min(i + 1, N - 1)
+                packed_vertical[start + 1: stop + 1] = (
+                    v_band[:stop - start])
+                maze.flush()
+
+    return DiskMaze(path)
@@ -0,0 +1,97 @@
+"""
+Helpers to spread work over a pool of processes
+"""
+from __future__ import annotations
+
+import os
+from typing import (TYPE_CHECKING, Any, Callable, Iterable, Iterator,
+                    Optional, TypeVar)
+
+from .lazy import lazy_module
+
+if TYPE_CHECKING:
+    import concurrent.futures as futures
+else:
+    # multiprocessing takes long to import, and only a pool needs it
+    futures = lazy_module('concurrent.futures')
+
+
+R = TypeVar('R')
+
+
+def default_workers() -> int:
+    """
+    The default number of worker processes: one per CPU
+    """
+    return os.cpu_count() or 1
+
+
+def imap_bounded(function: Callable[..., R],
+                 tasks: Iterable[tuple[Any, ...]],
+                 workers: Optional[int] = None,
+                 ordered: bool = False,
+                 window: Optional[int] = None) -> Iterator[R]:
+    """
+    Apply a function to the arguments of each task on a pool of processes
+    and yield the results as they come in.
+
+    The tasks are drawn lazily and at most `window` of them (by default two
+    per worker) are submitted but not yet yielded at any time. This bounds
+    the memory held by both the producer of the tasks and the finished
+    results when the consumer is slow.
+
+    Args:
+        function: a picklable (module level) function
+        tasks: an iterable of argument tuples for the function
+        workers: number of processes. Defaults to the number of CPUs. If 1,
+          the tasks are run one by one in the calling process
+        ordered: if True, yield the results in the order of the tasks
+          instead of in the order they finish
+        window: maximal number of tasks in flight
+    """
+    if workers is None:
+        workers = default_workers()
+
+    if workers == 1:
+        for task in tasks:
+            yield function(*task)
+        return
+
+    if window is None:
+        window = 2 * workers
+
+    task_iter = enumerate(tasks)
+    executor = futures.ProcessPoolExecutor(max_workers=workers)
+    pending: dict[futures.Future, int] = {}
+    finished: dict[int, R] = {}
+    next_to_yield = 0
+    exhausted = False
+
+    try:
+        while True:
+            while not(exhausted) and len(pending) + len(finished) < window:
+                try:
+                    ind, task = next(task_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(function, *task)] = ind
+
+            if not(pending) and not(finished):
+                return
+
+            if pending:
+                done, _ = futures.wait(pending,
+                                       return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    finished[pending.pop(future)] = future.result()
+
+            if ordered:
+                while next_to_yield in finished:
+                    yield finished.pop(next_to_yield)
+                    next_to_yield += 1
+            else:
+                for ind in sorted(finished):
+                    yield finished.pop(ind)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,131 @@
+"""
+Generation of a single large maze on many processes.
+
+The N x M grid of cells is cut into a grid of rectangular regions, and
+every region is carved into a perfect maze of its own on a pool of
+processes. The regions are then stitched together along a random spanning
+tree of the regions: every pair of neighbouring regions in the tree gets
+one passage at a random place of their shared border, and every other
+border stays closed. As the regions are trees, and the tree of regions
+joins them without loops, the whole maze is perfect, and the solution
+route from (1, 1) to the NE corner is the unique way through it.
+"""
+import math
+from typing import Optional
+
+import numpy as np
+
+from .algorithms import PASSAGES, wall_grids_from_passages, wilson_passages
+from .generation import (_check_algorithm,
+                         grid_maze_from_trails,
+                         trails_generator)
+from .parallel import default_workers, imap_bounded
+from .solve import solve
+from .types import GridMaze
+
+Bounds = tuple[int, int, int, int]
+
+
+def region_bounds(N: int, M: int,
+                  regions: tuple[int, int]) -> list[Bounds]:
+    """
+    Cut the cells of an N x M maze into a grid of R x S nearly equal
+    regions. Returns the cells [i0, i1) x [j0, j1) of every region as
+    (i0, j0, i1, j1), region r * S + s being the r'th along x and the s'th
+    along y
+    """
+    R, S = regions
+    if not(1 <= R <= N and 1 <= S <= M):
+        raise ValueError(f"Can not cut {N} x {M} cells into {R} x {S} "
+                         "regions")
+    xs = np.linspace(0, N, R + 1).astype(int).tolist()
+    ys = np.linspace(0, M, S + 1).astype(int).tolist()
+
+    return [(xs[r], ys[s], xs[r + 1], ys[s + 1])
+            for r in range(R) for s in range(S)]
+
+
+def default_regions(N: int, M: int, workers: int) -> tuple[int, int]:
+    """
+    A grid of at least `workers` regions that are about square
+    """
+    R = min(N, max(1, round(math.sqrt(workers * N / M))))
+    S = min(M, math.ceil(workers / R))
+    return R, S
+
+
+def _region_grids(N: int, M: int, seed: np.random.SeedSequence,
+                  algorithm: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Worker function of generate_large_maze: the wall grids of a perfect
+    N x M maze
+    """
+    rng = np.random.default_rng(seed)
+    if algorithm in PASSAGES:
+        return wall_grids_from_passages(N, M, PASSAGES[algorithm](N, M, rng))
+    grid_maze = grid_maze_from_trails(trails_generator(N, M, rng,
+                                                       algorithm))
+    return grid_maze.horizontal, grid_maze.vertical
+
+
+def generate_large_maze(N: int, M: int,
+                        workers: Optional[int] = None,
+                        seed: Optional[int] = None,
+                        algorithm: str = 'wilson',
+                        regions: Optional[tuple[int, int]] = None
+                        ) -> GridMaze:
+    """
+    Generate a single perfect N x M maze on a pool of processes, see the
+    module docstring
+
+    Args:
+        N: number of cells along x
+        M: number of cells along y
+        workers: number of processes, see limnos.parallel.imap_bounded
+        seed: seed for reproducible mazes. The maze only depends on the
+          seed and the regions, not on the number of workers
+        algorithm: the algorithm carving the regions, see trails_generator
+        regions: the number of regions along x and y. Defaults to about
+          square regions, one per worker
+
+    Returns:
+        The maze, with its solution route from (1, 1) to the NE corner
+    """
+    _check_algorithm(algorithm)
+    if workers is None:
+        workers = default_workers()
+    if regions is None:
+        regions = default_regions(N, M, workers)
+    bounds = region_bounds(N, M, regions)
+
+    region_seed, stitch_seed = np.random.SeedSequence(seed).spawn(2)
+    seeds = region_seed.spawn(len(bounds))
+    tasks = ((i1 - i0, j1 - j0, region, algorithm)
+             for (i0, j0, i1, j1), region in zip(bounds, seeds))
+
+    horizontal = np.ones((N, M + 1), dtype=bool)
+    vertical = np.ones((N + 1, M), dtype=bool)
+    grids = imap_bounded(_region_grids, tasks, workers=workers, ordered=True)
+    for (i0, j0, i1, j1), (region_h, region_v) in zip(bounds, grids):
+        # the outer walls of a region are the borders, closed for now
+        horizontal[i0:i1, j0 + 1:j1] = region_h[:, 1:-1]
+        vertical[i0 + 1:i1, j0:j1] = region_v[1:-1]
+
+    # open one random passage through the borders on a spanning tree of
+    # the regions, itself carved like a maze of R x S cells
+    rng = np.random.default_rng(stitch_seed)
+    R, S = regions
+    for region_a, region_b in wilson_passages(R, S, rng):
+        (i0, j0, i1, j1) = bounds[min(region_a, region_b)]
+        if abs(region_b - region_a) != S:
+            horizontal[rng.integers(i0, i1), j1] = False
+        else:
+            vertical[i1, rng.integers(j0, j1)] = False
+
+    maze = GridMaze.from_wall_grids([], horizontal, vertical)
+    route = solve(maze)
+    if route is None:
+        raise ValueError("The stitched regions have no way from (1, 1) to "
+                         "the NE corner")
+
+    return GridMaze.from_wall_grids(route, horizontal, vertical)
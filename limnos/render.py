@@ -0,0 +1,260 @@
+"""
+Rendering of mazes without matplotlib: raster images painted into NumPy
+arrays and written as PNG with the standard library only, and text made
+of Unicode box-drawing characters.
+
+In images, walls of `wall_width` pixels are spaced `cell_size` pixels
+apart, north is up and the solution route runs through the cell centres.
+"""
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional, Union
+
+import numpy as np
+
+from .parallel import imap_bounded
+from .types import GridMaze, Maze
+
+Color = tuple[int, int, int]
+
+BACKGROUND_COLOR: Color = (255, 255, 255)
+WALL_COLOR: Color = (0, 0, 0)
+ROUTE_COLOR: Color = (0xb0, 0xaa, 0xa3)
+
+# box-drawing characters indexed by up + 2*down + 4*left + 8*right
+BOX_CHARS = " ╵╷│╴┘┐┤╶└┌├─┴┬┼"
+ROUTE_CHAR = "•"
+
+
+def _as_grid_maze(maze: Union[Maze, GridMaze]) -> GridMaze:
+    if isinstance(maze, GridMaze):
+        return maze
+    return GridMaze.from_maze(maze)
+
+
+def _wall_pixels(grid: np.ndarray, cell_size: int,
+                 wall_width: int) -> np.ndarray:
+    """
+    Paint the walls of a horizontal wall grid, (N, M + 1), into a pixel
+    mask of shape (N*cell_size + wall_width, M*cell_size + wall_width)
+    indexed [x, y]. Vertical walls are painted by transposing in and out.
+    """
+    N, M_plus_one = grid.shape
+    length = N * cell_size + wall_width
+
+    # the wall [i, j] covers x pixels i*cell_size up to and including the
+    # wall_width pixels of the joint with the next corner
+    along = np.zeros((length, M_plus_one), dtype=bool)
+    along[:N * cell_size] = np.repeat(grid, cell_size, axis=0)
+    in_joint = (np.arange(length) % cell_size < wall_width)
+    in_joint[:cell_size] = False
+    along[in_joint] |= along[np.nonzero(in_joint)[0] - cell_size]
+
+    # and y pixels j*cell_size to j*cell_size + wall_width
+    rows = (cell_size * np.arange(M_plus_one)[:, None] +
+            np.arange(wall_width)).ravel()
+    mask = np.zeros((length, (M_plus_one - 1) * cell_size + wall_width),
+                    dtype=bool)
+    mask[:, rows] = np.repeat(along, wall_width, axis=1)
+
+    return mask
+
+
+def _route_pixels(grid_maze: GridMaze, cell_size: int, wall_width: int,
+                  route_width: int) -> np.ndarray:
+    """
+    Paint the solution route into a pixel mask indexed [x, y]
+    """
+    N, M = grid_maze.shape
+
+    # mark the route on the half-cell lattice (x - 1, y - 1), where the
+    # cells sit at even and the passages between cells at odd indices
+    half = np.zeros((2 * N - 1, 2 * M - 1), dtype=bool)
+    route = grid_maze.route - 1
+    half[route[:, 0], route[:, 1]] = True
+    mids = (route[:-1] + route[1:]) // 2
+    half[mids[:, 0], mids[:, 1]] = True
+
+    # map every pixel to the half-cell index it shows, or to -1
+    offset = wall_width + (cell_size - wall_width - route_width) // 2
+
+    def pixel_to_half(n_cells: int) -> np.ndarray:
+        pixels = np.arange(n_cells * cell_size + wall_width) - offset
+        cell, rest = np.divmod(pixels, cell_size)
+        inds = np.where(rest < route_width, 2 * cell, 2 * cell + 1)
+        inds[(pixels < 0) | (inds > 2 * n_cells - 2)] = -1
+        return inds
+
+    xs = pixel_to_half(N)
+    ys = pixel_to_half(M)
+    mask = half[xs[:, None], ys[None, :]]
+    mask[xs < 0] = False
+    mask[:, ys < 0] = False
+
+    return mask
+
+
+def render_image(maze: Union[Maze, GridMaze],
+                 cell_size: int = 8,
+                 wall_width: int = 2,
+                 route_width: Optional[int] = None,
+                 show_route: bool = True) -> np.ndarray:
+    """
+    Render a maze into an RGB image, a (height, width, 3) uint8 array
+
+    Args:
+        maze: the maze, a GridMaze or a (route, walls) tuple
+        cell_size: distance in pixels between neighbouring walls
+        wall_width: thickness of the walls in pixels
+        route_width: thickness of the solution route in pixels. Defaults
+          to a third of the free space in a cell
+        show_route: whether to paint the solution route
+    """
+    if not(0 < wall_width < cell_size):
+        raise ValueError("Walls must be thinner than the cells")
+    if route_width is None:
+        route_width = max((cell_size - wall_width) // 3, 1)
+
+    grid_maze = _as_grid_maze(maze)
+
+    walls = (_wall_pixels(grid_maze.horizontal, cell_size, wall_width) |
+             _wall_pixels(grid_maze.vertical.T, cell_size, wall_width).T)
+
+    image = np.empty(walls.shape + (3,), dtype=np.uint8)
+    image[...] = BACKGROUND_COLOR
+    if show_route and len(grid_maze.route) > 0:
+        image[_route_pixels(grid_maze, cell_size, wall_width,
+                            route_width)] = ROUTE_COLOR
+    image[walls] = WALL_COLOR
+
+    # from [x, y] to rows and columns with north up
+    return image.transpose(1, 0, 2)[::-1].copy()
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return (struct.pack('>I', len(data)) + tag + data +
+            struct.pack('>I', zlib.crc32(tag + data)))
+
+
+def encode_png(image: np.ndarray, compression: int = 6) -> bytes:
+    """
+    Encode a (height, width) grayscale or (height, width, 3) RGB uint8
+    image as PNG
+    """
+    if image.dtype != np.uint8 or image.ndim not in (2, 3):
+        raise ValueError("Image must be a 2D or 3D uint8 array")
+    if image.ndim == 3 and image.shape[2] != 3:
+        raise ValueError("Color images must be RGB")
+
+    height, width = image.shape[:2]
+    color_type = 0 if image.ndim == 2 else 2
+
+    # every scanline starts with its filter type, 0 (None)
+    rows = image.reshape(height, -1)
+    scanlines = np.zeros((height, rows.shape[1] + 1), dtype=np.uint8)
+    scanlines[:, 1:] = rows
+
+    header = struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)
+
+    return (b'\x89PNG\r\n\x1a\n' +
+            _png_chunk(b'IHDR', header) +
+            _png_chunk(b'IDAT', zlib.compress(scanlines.tobytes(),
+                                              compression)) +
+            _png_chunk(b'IEND', b''))
+
+
+def write_png(target: Union[str, os.PathLike, BinaryIO],
+              image: np.ndarray) -> None:
+    """
+    Write an image (see encode_png) to a path or binary file object
+    """
+    data = encode_png(image)
+    if isinstance(target, (str, os.PathLike)):
+        Path(target).write_bytes(data)
+    else:
+        target.write(data)
+
+
+def render_text(maze: Union[Maze, GridMaze], show_route: bool = True) -> str:
+    """
+    Render a maze as lines of box-drawing characters, north up. Every cell
+    is three characters wide and cells on the solution route are marked
+    """
+    grid_maze = _as_grid_maze(maze)
+    N, M = grid_maze.shape
+    horizontal = grid_maze.horizontal
+    vertical = grid_maze.vertical
+
+    # the walls meeting at each corner, corners indexed [x, y]
+    up = np.zeros((N + 1, M + 1), dtype=int)
+    down = np.zeros((N + 1, M + 1), dtype=int)
+    left = np.zeros((N + 1, M + 1), dtype=int)
+    right = np.zeros((N + 1, M + 1), dtype=int)
+    up[:, :-1] = vertical
+    down[:, 1:] = vertical
+    right[:-1, :] = horizontal
+    left[1:, :] = horizontal
+    corners = np.array(list(BOX_CHARS))[up + 2*down + 4*left + 8*right]
+
+    # characters indexed [x, y] with the corners at [4*i, 2*j]
+    chars = np.full((4 * N + 1, 2 * M + 1), " ")
+    chars[::4, ::2] = corners
+    for k in (1, 2, 3):
+        chars[k::4, ::2] = np.where(horizontal, "─", " ")
+    chars[::4, 1::2] = np.where(vertical, "│", " ")
+
+    if show_route and len(grid_maze.route) > 0:
+        cells = (grid_maze.route - 1) // 2
+        chars[4 * cells[:, 0] + 2, 2 * cells[:, 1] + 1] = ROUTE_CHAR
+
+    return "\n".join("".join(row) for row in chars.T[::-1])
+
+
+def _render_to_file(path: str, maze: GridMaze, fmt: str,
+                    options: dict) -> str:
+    """
+    Worker function of render_corpus
+    """
+    if fmt == 'png':
+        write_png(path, render_image(maze, **options))
+    else:
+        Path(path).write_text(render_text(maze, **options) + "\n",
+                              encoding="utf-8")
+    return path
+
+
+def render_corpus(mazes: Iterable[Union[Maze, GridMaze]],
+                  directory: Union[str, os.PathLike],
+                  fmt: str = 'png',
+                  workers: Optional[int] = None,
+                  prefix: str = 'maze_',
+                  **options) -> list[str]:
+    """
+    Render many mazes to files, maze_000000.png and so on, in a directory,
+    on a pool of processes. The mazes are drawn lazily from the iterable
+    and sent to the workers as GridMazes.
+
+    Args:
+        mazes: the mazes to render
+        directory: where to put the files, created if missing
+        fmt: 'png' for images or 'txt' for box-drawing text
+        workers: number of processes, see limnos.parallel.imap_bounded
+        prefix: start of the file names
+        options: passed on to render_image or render_text
+
+    Returns:
+        The paths of the written files, in the order of the mazes
+    """
+    if fmt not in ('png', 'txt'):
+        raise ValueError(f"Unknown format {fmt}, use 'png' or 'txt'")
+
+    Path(directory).mkdir(parents=True, exist_ok=True)
+
+    tasks = ((os.path.join(directory, f"{prefix}{ind:06d}.{fmt}"),
+              _as_grid_maze(maze), fmt, options)
+             for ind, maze in enumerate(mazes))
+
+    return list(imap_bounded(_render_to_file, tasks,
+                             workers=workers, ordered=True))
@@ -0,0 +1,120 @@
+"""
+Random number sources for the generation functions.
+
+All random decisions in limnos are drawn from a RandomStream, which
+draws uniform numbers from a NumPy Generator or a random.Random in
+blocks and hands them out one at a time. Functions that take an `rng`
+argument accept a Generator, a random.Random, a RandomStream or None
+(fresh, unseeded randomness). A random.Random, and None, keep the pure
+Python generation functions from loading NumPy at all.
+"""
+from __future__ import annotations
+
+import random
+from typing import TYPE_CHECKING, Optional, Sequence, TypeVar, Union
+
+from .lazy import lazy_module
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    np = lazy_module('numpy')
+
+
+T = TypeVar('T')
+
+# the size of the first block a stream draws
+FIRST_BLOCK_SIZE = 64
+
+
+class RandomStream():
+    """
+    Buffered source of random numbers backed by a NumPy Generator or a
+    random.Random. The numbers drawn only depend on the state of the
+    generator, so a seeded generator gives reproducible results.
+
+    The blocks start small and double up to block_size, so that a stream
+    which only hands out a few numbers draws few numbers from its
+    generator.
+    """
+
+    def __init__(self, generator: Union[np.random.Generator, random.Random],
+                 block_size: int = 4096):
+
+        self.generator = generator
+        self.block_size = block_size
+        self._block: list[float] = []
+        self._pos = 0
+        self._next_size = min(FIRST_BLOCK_SIZE, block_size)
+        self._numpy: Optional[np.random.Generator] = None
+
+    def random(self) -> float:
+        """
+        Get a uniform random float in [0, 1)
+        """
+        if self._pos == len(self._block):
+            size = self._next_size
+            if isinstance(self.generator, random.Random):
+                draw = self.generator.random
+                self._block = [draw() for _ in range(size)]
+            else:
+                self._block = self.generator.random(size).tolist()
+            self._pos = 0
+            self._next_size = min(2 * size, self.block_size)
+        value = self._block[self._pos]
+        self._pos += 1
+        return value
+
+    def randint(self, a: int, b: int) -> int:
+        """
+        Get a random integer N such that a <= N <= b, like random.randint
+        """
+        return a + int(self.random() * (b - a + 1))
+
+    def choice(self, seq: Sequence[T]) -> T:
+        """
+        Get a random element from a non-empty sequence
+        """
+        return seq[int(self.random() * len(seq))]
+
+    def numpy_generator(self) -> np.random.Generator:
+        """
+        Get the NumPy Generator behind the stream. A stream backed by a
+        random.Random gets a Generator seeded from it on first request,
+        which loads NumPy
+        """
+        if self._numpy is None:
+            if isinstance(self.generator, random.Random):
+                self._numpy = np.random.default_rng(
+                    self.generator.getrandbits(128))
+            else:
+                self._numpy = self.generator
+        return self._numpy
+
+    def permutation(self, n: int) -> np.ndarray:
+        """
+        Get a random permutation of range(n). It is drawn from the
+        NumPy Generator in one go, bypassing the buffer
+        """
+        return self.numpy_generator().permutation(n)
+
+
+RNG = Union['np.random.Generator', random.Random, RandomStream, None]
+
+
+def as_random_stream(rng: RNG) -> RandomStream:
+    """
+    Get a RandomStream from any of the accepted kinds of rng arguments.
+    A RandomStream is passed through, so that nested calls share buffers.
+
+    Any other rng gets a new stream, and the numbers left in its buffer
+    are lost when the call returns. To call generation functions many
+    times with the same generator, wrap it in a RandomStream once and
+    pass that instead
+    """
+    if isinstance(rng, RandomStream):
+        return rng
+    if rng is None:
+        rng = random.Random()
+
+    return RandomStream(rng)
@@ -0,0 +1,323 @@
+"""
+Sharing mazes between processes without copying them.
+
+SharedMazes puts a batch of mazes into one block of shared memory, from
+which any process can take them as NumPy views. Only a small
+SharedMazesDescriptor, the name of the block and the number of mazes,
+has to be sent to the other processes, which attach to the block with
+it. Nothing is pickled or copied on the way.
+
+The block holds a table of the mazes followed by their arrays, every
+array starting on a multiple of 8 bytes:
+
+    table     one row of int64 per maze: N, M, route count R, point
+              count P, byte offset of the arrays of the maze
+    per maze  horizontal and vertical walls (np.packbits of the GridMaze
+              grids), offsets of the routes (R + 1 x int64), parent
+              routes (R x int32, -1 for the main route), points of all
+              routes ((P, 2) int32)
+
+The routes of a maze come parents first, route k taking up the points
+offsets[k] to offsets[k + 1], and the solution route is route 0. Mazes
+shared without their trails only have route 0.
+
+The process that creates the block owns it and unlinks it when done,
+after the other processes have closed it.
+"""
+import sys
+import threading
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterable, NamedTuple, Union
+
+import numpy as np
+
+from .generation import grid_maze_from_trails
+from .types import GridMaze, Trails
+
+# the columns of the table of mazes
+_COLUMNS = 5
+
+
+class SharedMazesDescriptor(NamedTuple):
+    """
+    All another process needs to attach to SharedMazes
+
+    Attributes:
+        name: the name of the block of shared memory
+        n_mazes: the number of mazes in the block
+    """
+    name: str
+    n_mazes: int
+
+
+class SharedTrails(NamedTuple):
+    """
+    The routes of a shared maze, see the module docstring
+
+    Attributes:
+        points: (P, 2) int32 points of all routes, back to back
+        offsets: (R + 1,) int64 offsets of the routes into the points
+        parents: (R,) int32 parent route of every route, -1 for the main
+    """
+    points: np.ndarray
+    offsets: np.ndarray
+    parents: np.ndarray
+
+    def route(self, k: int) -> np.ndarray:
+        """
+        The points of route k
+        """
+        return self.points[self.offsets[k]: self.offsets[k + 1]]
+
+
+def _align(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+
+def _maze_nbytes(N: int, M: int, n_routes: int, n_points: int) -> int:
+    return (_align((N * (M + 1) + 7) // 8 + ((N + 1) * M + 7) // 8) +
+            8 * (n_routes + 1) + _align(4 * n_routes) + 8 * n_points)
+
+
+def _buffer(block: SharedMemory) -> memoryview:
+    if block.buf is None:
+        raise ValueError("The shared mazes are closed")
+    return block.buf
+
+
+def _table_view(buffer: memoryview, count: int) -> np.ndarray:
+    return np.frombuffer(buffer, dtype=np.int64,
+                         count=count * _COLUMNS).reshape(count, _COLUMNS)
+
+
+def _maze_views(buffer: memoryview,
+                row: list[int]) -> tuple[GridMaze, SharedTrails]:
+    """
+    The views of the arrays of a maze, given its row of the table
+    """
+    N, M, n_routes, n_points, pos = row
+    n_horizontal = (N * (M + 1) + 7) // 8
+    n_vertical = ((N + 1) * M + 7) // 8
+
+    horizontal = np.frombuffer(buffer, dtype=np.uint8, count=n_horizontal,
+                               offset=pos)
+    vertical = np.frombuffer(buffer, dtype=np.uint8, count=n_vertical,
+                             offset=pos + n_horizontal)
+    pos += _align(n_horizontal + n_vertical)
+    offsets = np.frombuffer(buffer, dtype=np.int64, count=n_routes + 1,
+                            offset=pos)
+    pos += 8 * (n_routes + 1)
+    parents = np.frombuffer(buffer, dtype=np.int32, count=n_routes,
+                            offset=pos)
+    pos += _align(4 * n_routes)
+    points = np.frombuffer(buffer, dtype=np.int32, count=2 * n_points,
+                           offset=pos).reshape(-1, 2)
+
+    trails = SharedTrails(points, offsets, parents)
+    return GridMaze((N, M), horizontal, vertical, trails.route(0)), trails
+
+
+def _trails_arrays(trails: Trails) -> SharedTrails:
+    """
+    The routes of trails as arrays, parents first
+    """
+    store = trails._store
+    if trails._route == 0:
+        # the whole store, whose routes come parents first already
+        return SharedTrails(
+            np.frombuffer(store.coords, dtype=np.intc).reshape(-1, 2).astype(
+                np.int32),
+            np.frombuffer(store.offsets, dtype=np.int64).copy(),
+            np.frombuffer(store.parents, dtype=np.intc).astype(np.int32))
+
+    numbers = store.preorder(trails._route)
+    positions = {number: position for position, number in enumerate(numbers)}
+
+    coords = np.frombuffer(store.coords, dtype=np.intc).reshape(-1, 2)
+    store_offsets = store.offsets
+    points = [coords[store_offsets[number]: store_offsets[number + 1]]
+              for number in numbers]
+    lengths = [len(route_points) for route_points in points]
+
+    return SharedTrails(
+        np.concatenate(points).astype(np.int32),
+        np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+        np.array([-1] + [positions[store.parents[number]]
+                         for number in numbers[1:]], dtype=np.int32))
+
+
+def _maze_arrays(maze: Union[GridMaze, Trails]) -> tuple[GridMaze,
+                                                           SharedTrails]:
+    if isinstance(maze, Trails):
+        return grid_maze_from_trails(maze), _trails_arrays(maze)
+
+    route = maze.route.astype(np.int32)
+    return maze, SharedTrails(route,
+                              np.array([0, len(route)], dtype=np.int64),
+                              np.array([-1], dtype=np.int32))
+
+
+_ATTACH_LOCK = threading.Lock()
+
+
+def _attach_block(name: str) -> SharedMemory:
+    """
+    Attach to a block of shared memory without handing it to the resource
+    tracker of this process, which would unlink it when this process ends
+    """
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name, track=False)
+
+    # before Python 3.13 attaching always registers the block, and
+    # unregistering it afterwards upsets a tracker shared with the creator
+    with _ATTACH_LOCK:
+        register = resource_tracker.register
+        setattr(resource_tracker, 'register', lambda name, rtype: None)
+        try:
+            return SharedMemory(name)
+        finally:
+            setattr(resource_tracker, 'register', register)
+
+
+class SharedMazes():
+    """
+    A batch of mazes in a block of shared memory, see the module
+    docstring. Make one with create, and attach to it from other processes
+    with attach and its descriptor.
+
+    The mazes and arrays taken from it are views into the block, which can
+    only be closed once they are all gone: copy what is needed past the
+    block, and drop the views before it is closed. Leaving a with block
+    closes it, and the creator unlinks it even if that fails.
+    """
+
+    def __init__(self, block: SharedMemory, count: int, owner: bool):
+
+        self._block = block
+        self._owner = owner
+        # a copy, which does not hold on to the block
+        self._table = _table_view(_buffer(block), count).copy()
+
+    @classmethod
+    def create(cls, mazes: Iterable[Union[GridMaze, Trails]]
+               ) -> 'SharedMazes':
+        """
+        Copy mazes into a new block of shared memory. Trails are shared
+        with all their routes and the walls of grid_maze_from_trails,
+        GridMazes with their solution route only
+        """
+        arrays = [_maze_arrays(maze) for maze in mazes]
+
+        rows = []
+        pos = 8 * _COLUMNS * len(arrays)
+        for grid_maze, trails in arrays:
+            N, M = grid_maze.shape
+            n_routes, n_points = len(trails.parents), len(trails.points)
+            rows.append([N, M, n_routes, n_points, pos])
+            pos += _maze_nbytes(N, M, n_routes, n_points)
+
+        # a block can not be empty
+        block = SharedMemory(create=True, size=max(pos, 1))
+        _table_view(_buffer(block), len(rows))[:] = rows
+        for row, (grid_maze, trails) in zip(rows, arrays):
+            view, trails_view = _maze_views(_buffer(block), row)
+            view.packed_horizontal[:] = grid_maze.packed_horizontal
+            view.packed_vertical[:] = grid_maze.packed_vertical
+            for array, values in zip(trails_view, trails):
+                array[:] = values
+
+        return cls(block, len(rows), owner=True)
+
+    @classmethod
+    def attach(cls, descriptor: SharedMazesDescriptor) -> 'SharedMazes':
+        """
+        Attach to mazes shared by another process
+        """
+        return cls(_attach_block(descriptor.name), descriptor.n_mazes,
+                   owner=False)
+
+    @property
+    def descriptor(self) -> SharedMazesDescriptor:
+        return SharedMazesDescriptor(self._block.name, len(self))
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The size of the block of shared memory
+        """
+        return self._block.size
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def _row(self, k: int) -> list[int]:
+        if not(-len(self) <= k < len(self)):
+            raise IndexError("Maze index out of range")
+        return self._table[k].tolist()
+
+    def __getitem__(self, k: int) -> GridMaze:
+        """
+        The k'th maze, its wall grids and solution route being views into
+        the block
+        """
+        return _maze_views(_buffer(self._block), self._row(k))[0]
+
+    def trails_arrays(self, k: int) -> SharedTrails:
+        """
+        The routes of the k'th maze, as views into the block
+        """
+        return _maze_views(_buffer(self._block), self._row(k))[1]
+
+    def trails(self, k: int) -> Trails:
+        """
+        The trails of the k'th maze, copied out of the block. For mazes
+        shared without trails, this is just the solution route
+        """
+        arrays = self.trails_arrays(k)
+        points = arrays.points.tolist()
+        offsets = arrays.offsets.tolist()
+
+        subtrails: list[Trails] = []
+        for route, parent in enumerate(arrays.parents.tolist()):
+            main = [(x, y) for x, y in points[offsets[route]:
+                                              offsets[route + 1]]]
+            if parent < 0:
+                subtrails.append(Trails(main=main, branches=[]))
+            else:
+                subtrails.append(subtrails[parent].sprout(main))
+
+        return subtrails[0]
+
+    def close(self) -> None:
+        """
+        Close the block in this process. Raises a BufferError while views
+        into it are still in use; close again once they are dropped
+        """
+        try:
+            self._block.close()
+        except BufferError:
+            raise BufferError("Shared mazes can not be closed while mazes "
+                              "or arrays taken from them are in use, drop "
+                              "or copy them first") from None
+
+    def unlink(self) -> None:
+        """
+        Free the block: no process can attach to it any more, and its
+        memory goes once all processes closed it. Only the creator may do
+        so
+        """
+        if not(self._owner):
+            raise ValueError("Only the creator of shared mazes unlinks them")
+        self._block.unlink()
+
+    def __enter__(self) -> 'SharedMazes':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        # the creator frees the block even if views keep it from closing
+        try:
+            self.close()
+        finally:
+            if self._owner:
+                self.unlink()
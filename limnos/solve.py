@@ -0,0 +1,341 @@
+"""
+Solving and analysing mazes as graphs of cells.
+
+Cells are numbered x-major, the cell at the point (x, y) being number
+((x - 1)//2) * M + (y - 1)//2 of an N x M maze, and the passages between
+cells are held in CSR form: the neighbours of cell c are
+indices[indptr[c]: indptr[c + 1]].
+
+Distances are found with NumPy traversals. Mazes without loops (trees)
+are traversed along an Euler tour whose arcs are numbered with a ruling
+set, which takes a number of vectorised steps that grows with log(N*M)
+only, however long the corridors are. Other mazes fall back to a
+frontier-based breadth-first search, which takes one vectorised pass
+per distance.
+"""
+from typing import NamedTuple, Optional, Union
+
+import numpy as np
+
+from .types import GridMaze, Maze, Point, Route, Walls
+
+
+# mean distance between the rulers sampled by _list_positions
+RULER_SPACING = 32
+
+# the ways out of a cell, west, south, north and east, in the order of the
+# CSR rows of a CellGraph
+DIRECTIONS = ((-2, 0), (0, -2), (0, 2), (2, 0))
+
+
+class CellGraph(NamedTuple):
+    """
+    The passages of an N x M maze as a CSR adjacency of cells
+    """
+    indptr: np.ndarray
+    indices: np.ndarray
+    shape: tuple[int, int]
+
+    @property
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+
+def _cell_number(graph: CellGraph, point: Point) -> int:
+    N, M = graph.shape
+    i, j = (point[0] - 1) // 2, (point[1] - 1) // 2
+    if not(0 <= i < N and 0 <= j < M):
+        raise ValueError(f"Point {point} not in the maze")
+    return i * M + j
+
+
+def _cell_points(graph: CellGraph, cells: np.ndarray) -> Route:
+    M = graph.shape[1]
+    xs = (2 * (cells // M) + 1).tolist()
+    ys = (2 * (cells % M) + 1).tolist()
+    return list(zip(xs, ys))
+
+
+def cell_adjacency(maze: Union[GridMaze, Maze, Walls],
+                   shape: Optional[tuple[int, int]] = None) -> CellGraph:
+    """
+    Get the cell graph of a maze: a GridMaze, a (route, walls) tuple or
+    a list of walls. For a list of walls the (N, M) shape of the maze must
+    be given, otherwise it defaults to the shape of the maze
+    """
+    if isinstance(maze, list):
+        if shape is None:
+            raise ValueError("The shape is needed for a list of walls")
+        maze = GridMaze.from_maze(([], maze), shape=shape)
+    elif not(isinstance(maze, GridMaze)):
+        maze = GridMaze.from_maze(maze, shape=shape)
+
+    N, M = maze.shape
+
+    # the passages of every cell in the directions of DIRECTIONS, which
+    # lead to increasing cell numbers, so that the CSR rows come sorted
+    ways = np.zeros((N, M, 4), dtype=bool)
+    ways[1:, :, 0] = ~maze.vertical[1:N]
+    ways[:, 1:, 1] = ~maze.horizontal[:, 1:M]
+    ways[:, :-1, 2] = ~maze.horizontal[:, 1:M]
+    ways[:-1, :, 3] = ~maze.vertical[1:N]
+    open_ways = ways.reshape(N * M, 4)
+
+    cells = np.arange(N * M)
+    steps = np.array([-M, -1, 1, M])
+    indices = (cells[:, None] + steps)[open_ways]
+
+    indptr = np.zeros(N * M + 1, dtype=np.int64)
+    np.cumsum(open_ways.sum(axis=1), out=indptr[1:])
+
+    return CellGraph(indptr, indices, (N, M))
+
+
+def _as_graph(maze: Union[CellGraph, GridMaze, Maze]) -> CellGraph:
+    if isinstance(maze, CellGraph):
+        return maze
+    return cell_adjacency(maze)
+
+
+class _Traversal(NamedTuple):
+    distances: np.ndarray
+    parents: np.ndarray
+    # for trees: the positions of entering and leaving each cell on the
+    # Euler tour, which tell ancestors apart
+    entry: Optional[np.ndarray]
+    leave: Optional[np.ndarray]
+
+
+def _list_positions(following: np.ndarray,
+                    first: int) -> Optional[np.ndarray]:
+    """
+    Number the elements of the linked list that starts at first, where
+    following[i] comes after i and the last element follows itself.
+    Returns None if some elements are not on the list.
+
+    Walkers start from a sparse random sample of elements, the rulers, and
+    all step ahead at once until they reach the next ruler. This takes
+    about RULER_SPACING * log(n) vectorised steps over ever fewer walkers
+    and O(n) work in total. The short list of rulers is then chained up in
+    plain Python.
+    """
+    n = len(following)
+    is_ruler = np.random.default_rng(0).random(n) < 1 / RULER_SPACING
+    is_ruler[first] = True
+    rulers = np.nonzero(is_ruler)[0]
+
+    # the ruler behind every element and the distance to that ruler
+    owners = np.full(n, -1, dtype=np.int64)
+    offsets = np.zeros(n, dtype=np.int64)
+    owners[rulers] = np.arange(len(rulers))
+
+    next_rulers = np.full(len(rulers), -1, dtype=np.int64)
+    gaps = np.zeros(len(rulers), dtype=np.int64)
+
+    walkers = np.arange(len(rulers))
+    current = rulers
+    step = 0
+    while len(walkers) > 0:
+        step += 1
+        ahead = following[current]
+
+        at_end = ahead == current
+        gaps[walkers[at_end]] = step - 1
+        walkers, ahead = walkers[~at_end], ahead[~at_end]
+
+        at_ruler = is_ruler[ahead]
+        next_rulers[walkers[at_ruler]] = owners[ahead[at_ruler]]
+        gaps[walkers[at_ruler]] = step
+        walkers, current = walkers[~at_ruler], ahead[~at_ruler]
+
+        owners[current] = walkers
+        offsets[current] = step
+
+    ruler_positions = [-1] * len(rulers)
+    ruler = int(owners[first])
+    position = 0
+    next_rulers_list = next_rulers.tolist()
+    gaps_list = gaps.tolist()
+    while ruler != -1 and position < n:
+        ruler_positions[ruler] = position
+        position += gaps_list[ruler]
+        ruler = next_rulers_list[ruler]
+
+    if position + 1 != n:
+        return None
+
+    return np.array(ruler_positions)[owners] + offsets
+
+
+def _tree_traversal(graph: CellGraph, source: int) -> Optional[_Traversal]:
+    """
+    Traverse the graph from the source cell along an Euler tour, provided
+    that the graph is a tree. Returns None if it is not
+    """
+    n_cells = len(graph.indptr) - 1
+    n_arcs = len(graph.indices)
+    if n_arcs != 2 * (n_cells - 1):
+        return None
+
+    distances = np.full(n_cells, -1, dtype=np.int64)
+    parents = np.full(n_cells, -1, dtype=np.int64)
+    entry = np.full(n_cells, -1, dtype=np.int64)
+    leave = np.full(n_cells, n_arcs, dtype=np.int64)
+    distances[source] = 0
+    if n_arcs == 0:
+        return _Traversal(distances, parents, entry, leave)
+
+    tails = np.repeat(np.arange(n_cells), graph.degrees)
+    heads = graph.indices
+
+    # the arc reversing each arc, found through a table of the arc leaving
+    # every cell in every direction
+    M = graph.shape[1]
+    steps = heads - tails
+    if M == 1:
+        directions = np.where(steps < 0, 0, 3)
+    else:
+        directions = np.searchsorted(np.array([-M, -1, 1, M]), steps)
+    arcs_out = np.full((n_cells, 4), -1, dtype=np.int64)
+    arcs_out[tails, directions] = np.arange(n_arcs)
+    twins = arcs_out[heads, 3 - directions]
+
+    # the tour continues from u -> v with the arc after v -> u among the
+    # arcs of v, cyclically
+    following = twins + 1
+    wrap = following == graph.indptr[heads + 1]
+    following[wrap] = graph.indptr[heads[wrap]]
+
+    first = graph.indptr[source]
+    if first == graph.indptr[source + 1]:
+        # an isolated source in a graph with edges: not connected
+        return None
+    last = np.nonzero(following == first)[0]
+    following[last] = last
+
+    positions = _list_positions(following, first)
+    if positions is None:
+        # the tour from the source missed some arcs: not connected
+        return None
+
+    down = positions < positions[twins]
+
+    tour = np.empty(n_arcs, dtype=np.int64)
+    tour[positions] = np.arange(n_arcs)
+    depths = np.cumsum(np.where(down[tour], 1, -1))
+
+    # in a tree every cell but the source is entered by exactly one arc
+    # down. A tour round a loop enters some cell twice, and then misses
+    # the cells that are cut off
+    down_arcs = np.nonzero(down)[0]
+    children = heads[down_arcs]
+    entered = np.bincount(children, minlength=n_cells)
+    if entered[source] != 0:
+        return None
+    entered[source] = 1
+    if not(np.all(entered == 1)):
+        return None
+
+    entry[children] = positions[down_arcs]
+    leave[children] = positions[twins[down_arcs]]
+    distances[children] = depths[entry[children]]
+    parents[children] = tails[down_arcs]
+
+    return _Traversal(distances, parents, entry, leave)
+
+
+def _bfs_traversal(graph: CellGraph, source: int) -> _Traversal:
+    """
+    Breadth-first search from the source cell, one frontier at a time
+    """
+    n_cells = len(graph.indptr) - 1
+    distances = np.full(n_cells, -1, dtype=np.int64)
+    parents = np.full(n_cells, -1, dtype=np.int64)
+    distances[source] = 0
+
+    frontier = np.array([source])
+    distance = 0
+    while len(frontier) > 0:
+        distance += 1
+        starts = graph.indptr[frontier]
+        counts = graph.indptr[frontier + 1] - starts
+        # gather the neighbours of the whole frontier at once
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) -
+                                                      counts, counts)
+        neighbours = graph.indices[np.repeat(starts, counts) + offsets]
+        via = np.repeat(frontier, counts)
+
+        new = distances[neighbours] == -1
+        neighbours, via = neighbours[new], via[new]
+        distances[neighbours] = distance
+        parents[neighbours] = via
+        frontier = np.unique(neighbours)
+
+    return _Traversal(distances, parents, None, None)
+
+
+def _traverse(graph: CellGraph, source: int) -> _Traversal:
+    traversal = _tree_traversal(graph, source)
+    if traversal is None:
+        traversal = _bfs_traversal(graph, source)
+    return traversal
+
+
+def distance_field(maze: Union[CellGraph, GridMaze, Maze],
+                   start: Point = (1, 1)) -> np.ndarray:
+    """
+    Get the number of steps from the start to every cell as an N x M
+    grid indexed by cell, with -1 for the cells that cannot be reached
+    """
+    graph = _as_graph(maze)
+    traversal = _traverse(graph, _cell_number(graph, start))
+
+    return traversal.distances.reshape(graph.shape)
+
+
+def solve(maze: Union[CellGraph, GridMaze, Maze],
+          start: Point = (1, 1),
+          end: Optional[Point] = None) -> Optional[Route]:
+    """
+    Find the shortest route through a maze, by default from the SW to the
+    NE corner. Returns None if the end cannot be reached
+    """
+    graph = _as_graph(maze)
+    if end is None:
+        end = (2 * graph.shape[0] - 1, 2 * graph.shape[1] - 1)
+    source = _cell_number(graph, start)
+    target = _cell_number(graph, end)
+
+    traversal = _traverse(graph, source)
+    if traversal.distances[target] == -1:
+        return None
+
+    if traversal.entry is not None and traversal.leave is not None:
+        # on a tree, the route consists of the ancestors of the target
+        entry, leave = traversal.entry, traversal.leave
+        on_route = (entry <= entry[target]) & (leave >= leave[target])
+        cells = np.nonzero(on_route)[0]
+        cells = cells[np.argsort(traversal.distances[cells])]
+    else:
+        cell_list = [target]
+        while cell_list[-1] != source:
+            cell_list.append(int(traversal.parents[cell_list[-1]]))
+        cells = np.array(cell_list[::-1])
+
+    return _cell_points(graph, cells)
+
+
+def dead_ends(maze: Union[CellGraph, GridMaze, Maze]) -> np.ndarray:
+    """
+    Get the dead ends, the cells with a single way in or out, as an
+    N x M boolean grid indexed by cell
+    """
+    graph = _as_graph(maze)
+    return (graph.degrees == 1).reshape(graph.shape)
+
+
+def count_dead_ends(maze: Union[CellGraph, GridMaze, Maze]) -> int:
+    """
+    Count the dead ends of a maze
+    """
+    return int(dead_ends(maze).sum())
@@ -0,0 +1,134 @@
+"""
+Opt-in statistics of maze generation.
+
+The generation functions take an optional `stats` argument. Pass them a
+GenerationStats to have them count what they do and time their phases;
+without one, they skip all bookkeeping.
+
+A phase timed while another one runs is named after both, as in
+'solution_route/transforms', and its time is part of the time of the
+outer phase. The top-level phases, those without a '/', do not overlap,
+so their times add up to the time spent in timed phases.
+"""
+import time
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Iterator, Optional, Union
+
+from .types import Routes
+
+
+class GenerationStats():
+    """
+    Statistics collected by the generation functions that are passed this
+    object. The counts add up over all the calls it is passed to.
+
+    Attributes:
+        transforms: random route transformations asked for
+        rejected_tries: tries at a transformation that were not legal
+        capped_transforms: transformations given up after the maximal
+          number of tries
+        branch_lengths: number of branches by their number of points
+        sprout_draws: trail cells drawn to sprout a branch from
+        stale_sprout_draws: drawn trail cells without free neighbours
+        walls_inserted: random walls inserted
+        wall_retries: drawn walls that would have closed a loop
+        rejected_candidates: mazes that missed the targets of
+          limnos.metrics.generate_with_target
+        aborted_candidates: mazes given up on before they were done,
+          as their solution route missed the targets
+        phase_seconds: wall-clock time spent in every phase, nested
+          phases named 'outer/inner', see the module docstring
+    """
+
+    def __init__(self):
+
+        self.transforms = 0
+        self.rejected_tries = 0
+        self.capped_transforms = 0
+        self.branch_lengths: dict[int, int] = {}
+        self.sprout_draws = 0
+        self.stale_sprout_draws = 0
+        self.walls_inserted = 0
+        self.wall_retries = 0
+        self.rejected_candidates = 0
+        self.aborted_candidates = 0
+        self.phase_seconds: dict[str, float] = {}
+        self._phases: list[str] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Time the code run in this context as (part of) a phase, nested in
+        the phases running already
+        """
+        self._phases.append(name)
+        path = "/".join(self._phases)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[path] = (self.phase_seconds.get(path, 0) +
+                                        time.perf_counter() - start)
+            self._phases.pop()
+
+    def record_transform(self, tries: int, transformed: bool) -> None:
+        self.transforms += 1
+        self.rejected_tries += tries - transformed
+        self.capped_transforms += not(transformed)
+
+    def record_branches(self, routes: Routes) -> None:
+        for route in routes:
+            length = len(route)
+            self.branch_lengths[length] = (
+                self.branch_lengths.get(length, 0) + 1)
+
+    @property
+    def branches(self) -> int:
+        return sum(self.branch_lengths.values())
+
+    @property
+    def total_seconds(self) -> float:
+        """
+        The time spent in timed phases, the sum of the top-level ones
+        """
+        return sum(seconds for name, seconds in self.phase_seconds.items()
+                   if "/" not in name)
+
+    def as_dict(self) -> dict[str, Union[int, float, dict]]:
+        """
+        Get the statistics as a dict of plain (JSON serializable) values
+        """
+        n_points = sum(length * count
+                       for length, count in self.branch_lengths.items())
+        return {'transforms': self.transforms,
+                'rejected_tries': self.rejected_tries,
+                'capped_transforms': self.capped_transforms,
+                'branches': self.branches,
+                'mean_branch_length': n_points / max(self.branches, 1),
+                'max_branch_length': max(self.branch_lengths, default=0),
+                'branch_lengths': {str(length): count for length, count
+                                   in sorted(self.branch_lengths.items())},
+                'sprout_draws': self.sprout_draws,
+                'stale_sprout_draws': self.stale_sprout_draws,
+                'walls_inserted': self.walls_inserted,
+                'wall_retries': self.wall_retries,
+                'rejected_candidates': self.rejected_candidates,
+                'aborted_candidates': self.aborted_candidates,
+                'phase_seconds': dict(self.phase_seconds),
+                'total_seconds': self.total_seconds}
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{key}={value}"
+                           for key, value in self.as_dict().items()
+                           if key != 'branch_lengths')
+        return f"GenerationStats({fields})"
+
+
+def timed(stats: Optional[GenerationStats],
+          phase: str) -> ContextManager[None]:
+    """
+    Time a phase, if stats are collected
+    """
+    if stats is None:
+        return nullcontext()
+    return stats.phase(phase)
@@ -0,0 +1,264 @@
+"""
+Geometry that only depends on the size of a maze, computed once per size.
+
+A SizeTemplate holds the tables of an N x M maze that the generation
+functions would otherwise rebuild for every maze: the points and
+neighbours of the cells, all the potential and the outer walls, the
+L-shaped starting route and the corners of the walls. Every table is
+built on first use and held as a tuple, so it is shared and never
+changed; callers that need to change one copy it.
+
+The templates are kept in a TemplateCache, which keeps the most recently
+used templates up to a number of templates and an (approximate) number
+of bytes, so that batches of mazes of the same size only build the
+tables once.
+"""
+import sys
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from .types import Point, Wall
+
+Corners = tuple[tuple[int, ...], tuple[int, ...]]
+
+# the defaults of the TEMPLATES cache
+MAX_TEMPLATES = 16
+MAX_BYTES = 256 * 2**20
+
+
+def cell_points(N: int, M: int) -> list[Point]:
+    """
+    Get the points of all cells, by cell number
+    """
+    return [(2 * i + 1, 2 * j + 1) for i in range(N) for j in range(M)]
+
+
+def cell_neighbours(N: int, M: int) -> list[list[int]]:
+    """
+    Get the numbers of the neighbouring cells of every cell
+    """
+    neighbours: list[list[int]] = [[] for _ in range(N * M)]
+    for i in range(N):
+        for j in range(M):
+            cell = i * M + j
+            if i > 0:
+                neighbours[cell].append(cell - M)
+            if j > 0:
+                neighbours[cell].append(cell - 1)
+            if j < M - 1:
+                neighbours[cell].append(cell + 1)
+            if i < N - 1:
+                neighbours[cell].append(cell + M)
+    return neighbours
+
+
+def _approximate_size(table: Any) -> int:
+    """
+    Estimate the bytes held by a table of nested tuples, assuming that
+    all the items of a tuple look like its first one
+    """
+    size = sys.getsizeof(table)
+    if isinstance(table, tuple) and len(table) > 0:
+        size += len(table) * _approximate_size(table[0])
+    return size
+
+
+class SizeTemplate():
+    """
+    The size-only tables of an N x M maze, built lazily
+
+    Args:
+        N: number of cells along x
+        M: number of cells along y
+        on_grow: called whenever a table was built, see TemplateCache
+    """
+
+    def __init__(self, N: int, M: int,
+                 on_grow: Optional[Callable[[], None]] = None):
+
+        if N < 1 or M < 1:
+            raise ValueError("Mazes must have at least one cell")
+        self.shape = (N, M)
+        self.nbytes = 0
+        self._tables: dict[str, tuple] = {}
+        self._on_grow = on_grow
+
+    def _table(self, name: str, build: Callable[[], tuple]) -> tuple:
+        table = self._tables.get(name)
+        if table is None:
+            table = self._tables[name] = build()
+            self.nbytes += _approximate_size(table)
+            if self._on_grow is not None:
+                self._on_grow()
+        return table
+
+    @property
+    def cell_points(self) -> tuple[Point, ...]:
+        """
+        The points of all cells, by cell number
+        """
+        return self._table(
+            'cell_points', lambda: tuple(cell_points(*self.shape)))
+
+    @property
+    def cell_neighbours(self) -> tuple[tuple[int, ...], ...]:
+        """
+        The numbers of the neighbouring cells of every cell
+        """
+        return self._table(
+            'cell_neighbours',
+            lambda: tuple(map(tuple, cell_neighbours(*self.shape))))
+
+    def _build_potential_walls(self) -> tuple[Wall, ...]:
+        x1, y1 = 2 * self.shape[0], 2 * self.shape[1]
+        horiz_walls = [((x, y), (x + 2, y))
+                       for x in range(0, x1, 2)
+                       for y in range(0, y1 + 2, 2)]
+        vert_walls = [((x, y), (x, y + 2))
+                      for x in range(0, x1 + 2, 2)
+                      for y in range(0, y1, 2)]
+        return tuple(horiz_walls + vert_walls)
+
+    @property
+    def potential_walls(self) -> tuple[Wall, ...]:
+        """
+        All the walls of the maze, the horizontal ones first, x-major
+        """
+        return self._table('potential_walls', self._build_potential_walls)
+
+    def _build_outer_walls(self) -> tuple[Wall, ...]:
+        N, M = self.shape
+        x1, y1 = 2 * N, 2 * M
+        bottom = [((2 * n, 0), (2 * n + 2, 0)) for n in range(N)]
+        left = [((0, 2 * n), (0, 2 * n + 2)) for n in range(M)]
+        right = [((x1, 2 * n), (x1, 2 * n + 2)) for n in range(M)]
+        top = [((2 * n, y1), (2 * n + 2, y1)) for n in range(N)]
+
+        # leave out a wall at the start and one at the finish
+        return tuple(bottom[1:] + left[1:] + right[:-1] + top[:-1])
+
+    @property
+    def outer_walls(self) -> tuple[Wall, ...]:
+        """
+        The walls around the maze, but for the entrance south and west of
+        the SW cell and the exit north and east of the NE cell
+        """
+        return self._table('outer_walls', self._build_outer_walls)
+
+    @property
+    def initial_route(self) -> tuple[Point, ...]:
+        """
+        The route from the SW to the NE cell along the west and north edges
+        """
+        N, M = self.shape
+        return self._table(
+            'initial_route',
+            lambda: tuple([(1, 2*m + 1) for m in range(M)] +
+                          [(2*(n + 1) + 1, 2*(M - 1) + 1)
+                           for n in range(N - 1)]))
+
+    def _build_wall_corners(self) -> Corners:
+        N, M = self.shape
+        # the corner (2i, 2j) is number i*(M + 1) + j
+        starts = ([i * (M + 1) + j for i in range(N) for j in range(M + 1)] +
+                  [i * (M + 1) + j for i in range(N + 1) for j in range(M)])
+        ends = ([(i + 1) * (M + 1) + j
+                 for i in range(N) for j in range(M + 1)] +
+                [i * (M + 1) + j + 1
+                 for i in range(N + 1) for j in range(M)])
+        return tuple(starts), tuple(ends)
+
+    @property
+    def wall_corners(self) -> Corners:
+        """
+        The numbers of the corners at either end of every wall, numbered
+        like the walls of a WallInserter, and the corner (2i, 2j) being
+        number i*(M + 1) + j
+        """
+        return self._table('wall_corners', self._build_wall_corners)
+
+    @property
+    def boundary_corners(self) -> tuple[int, ...]:
+        """
+        The numbers of the corners on the boundary of the maze
+        """
+        N, M = self.shape
+        return self._table(
+            'boundary_corners',
+            lambda: tuple([j for j in range(M + 1)] +
+                          [N * (M + 1) + j for j in range(M + 1)] +
+                          [i * (M + 1) for i in range(1, N)] +
+                          [i * (M + 1) + M for i in range(1, N)]))
+
+    def __repr__(self) -> str:
+        return (f"SizeTemplate({self.shape[0]}, {self.shape[1]}, "
+                f"tables={sorted(self._tables)}, nbytes={self.nbytes})")
+
+
+class TemplateCache():
+    """
+    Least recently used cache of SizeTemplates by (N, M). Whenever a
+    template is taken or grows, the least recently used templates are
+    dropped until at most max_templates templates of at most max_bytes
+    bytes in total are left. A template that is too big on its own is
+    still handed out, but not kept, and does not push the others out.
+    """
+
+    def __init__(self, max_templates: int = MAX_TEMPLATES,
+                 max_bytes: int = MAX_BYTES):
+
+        if max_templates < 0 or max_bytes < 0:
+            raise ValueError("The limits of the cache must not be negative")
+        self.max_templates = max_templates
+        self.max_bytes = max_bytes
+        self._templates: OrderedDict[tuple[int, int],
+                                     SizeTemplate] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def __contains__(self, shape: tuple[int, int]) -> bool:
+        return shape in self._templates
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The approximate number of bytes held by the cached templates
+        """
+        return sum(template.nbytes for template in self._templates.values())
+
+    def _evict(self) -> None:
+        # a template too big on its own would flush all the others first
+        for shape, template in list(self._templates.items()):
+            if template.nbytes > self.max_bytes:
+                del self._templates[shape]
+        while (len(self._templates) > self.max_templates or
+               (self._templates and self.nbytes > self.max_bytes)):
+            self._templates.popitem(last=False)
+
+    def get(self, N: int, M: int) -> SizeTemplate:
+        """
+        Get the template of an N x M maze
+        """
+        template = self._templates.get((N, M))
+        if template is None:
+            template = SizeTemplate(N, M, on_grow=self._evict)
+            self._templates[(N, M)] = template
+        else:
+            self._templates.move_to_end((N, M))
+        self._evict()
+        return template
+
+    def clear(self) -> None:
+        self._templates.clear()
+
+
+# the cache used by the generation functions
+TEMPLATES = TemplateCache()
+
+
+def size_template(N: int, M: int) -> SizeTemplate:
+    """
+    Get the template of an N x M maze from the TEMPLATES cache
+    """
+    return TEMPLATES.get(N, M)
@@ -0,0 +1,132 @@
+"""
+Test the linear-time generation algorithms
+"""
+import numpy as np
+import pytest
+
+from limnos.algorithms import (PASSAGES, DisjointSets, loop_erased_route,
+                               trails_from_passages,
+                               wall_grids_from_passages)
+from limnos.generation import (ALGORITHMS, generate_mazes,
+                               grid_maze_from_trails, trails_generator)
+from limnos.solve import cell_adjacency, solve
+
+
+@pytest.mark.parametrize("algorithm", sorted(ALGORITHMS))
+@pytest.mark.parametrize("N, M", [(1, 1), (1, 5), (4, 1), (7, 9)])
+def test_algorithms_make_perfect_mazes(algorithm, N, M):
+    for seed in range(3):
+        trails = trails_generator(N, M, rng=np.random.default_rng(seed),
+                                  algorithm=algorithm)
+        assert trails.main[0] == (1, 1)
+        assert trails.main[-1] == (2 * N - 1, 2 * M - 1)
+
+        points = {point for route in trails.all_routes() for point in route}
+        assert points == {(2 * n + 1, 2 * m + 1)
+                          for n in range(N) for m in range(M)}
+
+        maze = grid_maze_from_trails(trails)
+        assert len(cell_adjacency(maze).indices) == 2 * (N * M - 1)
+        assert solve(maze) == trails.main
+
+
+@pytest.mark.parametrize("algorithm", sorted(ALGORITHMS))
+def test_algorithms_are_reproducible(algorithm):
+    first, second = (trails_generator(6, 5, rng=np.random.default_rng(4),
+                                      algorithm=algorithm)
+                     for _ in range(2))
+    assert first.all_routes() == second.all_routes()
+
+
+def test_branches_start_on_their_trail():
+    trails = trails_generator(12, 10, rng=np.random.default_rng(0),
+                              algorithm='kruskal')
+    stack = [trails]
+    while stack:
+        subtrail = stack.pop()
+        for branch in subtrail.branches:
+            assert branch.main[0] in subtrail.main
+            assert len(branch.main) > 1
+        stack.extend(subtrail.branches)
+
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError):
+        trails_generator(3, 3, algorithm='prim')
+    with pytest.raises(ValueError):
+        next(generate_mazes(3, 3, 1, algorithm='prim'))
+
+
+def test_generate_mazes_with_algorithm():
+    mazes = list(generate_mazes(5, 4, 3, workers=1, seed=2, as_grid=True,
+                                algorithm='wilson'))
+    assert len(mazes) == 3
+    for maze in mazes:
+        assert solve(maze) == maze.to_maze()[0]
+
+
+def test_trails_from_passages_needs_a_spanning_tree():
+    # a 2 x 2 maze: cells 0, 1 along y and 2, 3 above them along x
+    with pytest.raises(ValueError):
+        trails_from_passages(2, 2, [(0, 1), (2, 3)])
+    with pytest.raises(ValueError):
+        trails_from_passages(2, 2, [(0, 1), (1, 3), (3, 2), (2, 0)])
+
+    trails = trails_from_passages(2, 2, [(0, 1), (1, 3), (0, 2)])
+    assert trails.main == [(1, 1), (1, 3), (3, 3)]
+    assert trails.all_routes()[1] == [(1, 1), (3, 1)]
+
+
+@pytest.mark.parametrize("algorithm", sorted(PASSAGES))
+@pytest.mark.parametrize("N, M", [(1, 1), (1, 5), (4, 1), (7, 9)])
+def test_wall_grids_from_passages(algorithm, N, M):
+    passages = PASSAGES[algorithm](N, M, np.random.default_rng(4))
+    horizontal, vertical = wall_grids_from_passages(N, M, passages)
+
+    expected = grid_maze_from_trails(trails_from_passages(N, M, passages))
+    assert np.array_equal(horizontal, expected.horizontal)
+    assert np.array_equal(vertical, expected.vertical)
+
+
+def test_disjoint_sets():
+    sets = DisjointSets(5)
+    assert sets.union(0, 1)
+    assert sets.union(3, 4)
+    assert not(sets.union(1, 0))
+    assert sets.find(0) == sets.find(1)
+    assert sets.find(2) != sets.find(3)
+    assert sets.union(1, 4)
+    assert len({sets.find(node) for node in range(5)}) == 2
+
+
+@pytest.mark.parametrize("bias", [0, 0.05, 0.5, 1])
+@pytest.mark.parametrize("N, M", [(1, 1), (1, 6), (5, 1), (9, 7)])
+def test_loop_erased_route_is_self_avoiding(N, M, bias):
+    for seed in range(3):
+        route = loop_erased_route(N, M, rng=np.random.default_rng(seed),
+                                  bias=bias)
+        assert route[0] == (1, 1)
+        assert route[-1] == (2 * N - 1, 2 * M - 1)
+        assert len(set(route)) == len(route)
+        assert all(abs(x1 - x0) + abs(y1 - y0) == 2
+                   for (x0, y0), (x1, y1) in zip(route[:-1], route[1:]))
+        if bias == 1:
+            assert len(route) == N + M - 1
+
+
+def test_loop_erased_route_bias_range():
+    with pytest.raises(ValueError):
+        loop_erased_route(3, 3, bias=1.5)
+
+
+def test_trails_generator_with_loop_erased_solution():
+    trails = trails_generator(8, 6, rng=np.random.default_rng(0),
+                              solution='loop_erased', bias=0.2)
+    maze = grid_maze_from_trails(trails)
+    assert len(cell_adjacency(maze).indices) == 2 * (8 * 6 - 1)
+    assert solve(maze) == trails.main
+
+    with pytest.raises(ValueError):
+        trails_generator(4, 4, solution='spiral')
+    with pytest.raises(ValueError):
+        trails_generator(4, 4, algorithm='kruskal', solution='loop_erased')
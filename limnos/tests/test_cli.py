@@ -0,0 +1,86 @@
+"""
+Test the limnos command
+"""
+import json
+
+import pytest
+
+from limnos.cli import main
+from limnos.generation import generate_mazes
+from limnos.io import CorpusReader
+from limnos.render import encode_png, render_image
+from limnos.solve import solve
+
+
+def test_ndjson(tmp_path):
+    path = tmp_path / "mazes.ndjson"
+    assert main(['--size', '4x6', '--count', '5', '--seed', '3',
+                 '--jobs', '1', '--output', str(path)]) == 0
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    expected = list(generate_mazes(4, 6, 5, workers=1, seed=3,
+                                   ordered=True, as_grid=True))
+    assert [record['index'] for record in records] == list(range(5))
+    for record, maze in zip(records, expected):
+        assert record['size'] == [4, 6]
+        route = [tuple(point) for point in record['route']]
+        walls = [(tuple(wall[0]), tuple(wall[1]))
+                 for wall in record['walls']]
+        assert (route, walls) == maze.to_maze()
+        assert solve((route, walls)) == route
+
+
+def test_ndjson_to_stdout(capsys):
+    assert main(['--size', '3x3', '--count', '2', '--jobs', '1']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[1])['index'] == 1
+
+
+def test_binary(tmp_path):
+    path = tmp_path / "mazes.lmz"
+    assert main(['--size', '5x5', '--count', '4', '--seed', '1',
+                 '--jobs', '2', '--format', 'binary',
+                 '--output', str(path)]) == 0
+
+    with CorpusReader(path) as reader:
+        assert list(reader) == list(generate_mazes(5, 5, 4, workers=1,
+                                                   seed=1, ordered=True,
+                                                   as_grid=True))
+
+
+def test_png(tmp_path):
+    assert main(['--size', '3x4', '--count', '3', '--jobs', '1',
+                 '--format', 'png', '--output', str(tmp_path)]) == 0
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        'maze_000000.png', 'maze_000001.png', 'maze_000002.png']
+
+
+@pytest.mark.parametrize('size', ['10', '3x', 'axb', '0x4'])
+def test_bad_size(size):
+    with pytest.raises(SystemExit):
+        main(['--size', size])
+
+
+def test_png_matches_generate_mazes(tmp_path):
+    assert main(['--size', '3x4', '--count', '5', '--seed', '2',
+                 '--jobs', '2', '--chunksize', '2', '--format', 'png',
+                 '--output', str(tmp_path)]) == 0
+
+    expected = generate_mazes(3, 4, 5, workers=1, seed=2, ordered=True,
+                              as_grid=True)
+    for ind, maze in enumerate(expected):
+        image = (tmp_path / f"maze_{ind:06d}.png").read_bytes()
+        assert image == encode_png(render_image(maze))
+
+
+@pytest.mark.parametrize('jobs', ['0', '-2', 'two'])
+def test_bad_jobs(jobs):
+    with pytest.raises(SystemExit):
+        main(['--jobs', jobs])
+
+
+@pytest.mark.parametrize('chunksize', ['0', '-1', 'many'])
+def test_bad_chunksize(chunksize):
+    with pytest.raises(SystemExit):
+        main(['--chunksize', chunksize])
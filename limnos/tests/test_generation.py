@@ -1,10 +1,21 @@
 """
 Test the generation functions
 """
+import numpy as np
 import pytest
 
-from limnos.generation import _wall_intersects_route
-from limnos.generation import trails_generator
+from limnos.generation import _all_potential_walls, _wall_intersects_route
+from limnos.generation import _IndexPool
+from limnos.generation import (add_outer_walls_to_maze,
+                               add_random_wall_to_maze,
+                               fill_maze_with_walls,
+                               generate_mazes,
+                               grid_maze_from_trails)
+from limnos.generation import trails_generator, walls_from_trails
+from limnos.generation import WallInserter
+from limnos.rng import as_random_stream
+from limnos.solve import cell_adjacency, distance_field, solve
+from limnos.types import GridMaze
 
 
 ROUTE = [(1, 1), (1, 3), (3, 3), (5, 3), (5, 5)]
@@ -19,6 +30,44 @@ def test_intersection_check(wall, intersects):
     assert _wall_intersects_route(ROUTE, wall) == intersects
 
 
+def test_intersection_check_does_not_wrap_around():
+    # the ends of a U-shaped route are neighbours but not connected
+    route = [(1, 1), (1, 3), (3, 3), (3, 1)]
+    assert not _wall_intersects_route(route, ((2, 0), (2, 2)))
+    assert not _wall_intersects_route(route, ((2, 2), (2, 0)))
+
+
+@pytest.mark.parametrize("N, M", [(2, 2), (2, 5), (4, 3), (6, 9)])
+@pytest.mark.parametrize("numpy_loaded", [True, False])
+def test_walls_from_trails_matches_route_scan(N, M, numpy_loaded,
+                                              monkeypatch):
+    # either the NumPy or the pure Python way
+    monkeypatch.setattr('limnos.generation.is_loaded',
+                        lambda name: numpy_loaded)
+    trails = trails_generator(N, M)
+    routes = trails.all_routes()
+
+    expected = [wall for wall in _all_potential_walls(trails)
+                if not any(_wall_intersects_route(route, wall) or
+                           _wall_intersects_route(route, wall[::-1])
+                           for route in routes)]
+
+    assert walls_from_trails(trails) == expected
+
+
+@pytest.mark.parametrize("N, M", [(1, 1), (1, 5), (4, 1)])
+def test_walls_from_trails_of_single_row_mazes(N, M):
+    trails = trails_generator(N, M)
+    routes = trails.all_routes()
+
+    expected = [wall for wall in _all_potential_walls(trails)
+                if not any(_wall_intersects_route(route, wall) or
+                           _wall_intersects_route(route, wall[::-1])
+                           for route in routes)]
+
+    assert walls_from_trails(trails) == expected
+
+
 def test_all_route_points_contain_ints():
     """
     Check that all points on generated routes contain standard ints
@@ -33,3 +82,134 @@ def test_all_route_points_contain_ints():
         for point in route:
             assert isinstance(point[0], int)
             assert isinstance(point[1], int)
+
+    for wall in walls_from_trails(trails):
+        for point in wall:
+            assert isinstance(point[0], int)
+            assert isinstance(point[1], int)
+
+
+def test_generate_mazes_in_process_and_in_pool_agree():
+    in_process = list(generate_mazes(4, 3, 5, workers=1, seed=12,
+                                     chunksize=2))
+    in_pool = list(generate_mazes(4, 3, 5, workers=2, seed=12,
+                                  chunksize=2, ordered=True))
+
+    assert len(in_process) == 5
+    assert in_process == in_pool
+
+    for route, walls in in_pool:
+        assert route[0] == (1, 1)
+        assert route[-1] == (7, 5)
+        assert all(isinstance(point[0], int) for point in route)
+        assert all(isinstance(wall[0][0], int) for wall in walls)
+
+
+def test_generate_mazes_unordered_yields_all_mazes():
+    ordered = list(generate_mazes(3, 3, 7, workers=2, seed=3, chunksize=3,
+                                  ordered=True))
+    unordered = list(generate_mazes(3, 3, 7, workers=2, seed=3, chunksize=3))
+
+    assert sorted(map(repr, ordered)) == sorted(map(repr, unordered))
+
+
+def test_trails_generator_is_reproducible_per_seed():
+    trails_1 = trails_generator(7, 5, rng=np.random.default_rng(42))
+    trails_2 = trails_generator(7, 5, rng=np.random.default_rng(42))
+
+    assert trails_1.all_routes() == trails_2.all_routes()
+
+
+def test_grid_maze_from_trails_matches_walls_from_trails():
+    trails = trails_generator(6, 4, rng=np.random.default_rng(1))
+    grid_maze = grid_maze_from_trails(trails)
+
+    assert grid_maze.to_maze() == (trails.main, walls_from_trails(trails))
+
+
+def test_wall_adders_accept_grid_mazes():
+    trails = trails_generator(5, 5, rng=np.random.default_rng(2))
+    maze = (trails.main, [])
+    grid_maze = GridMaze.from_maze(maze)
+
+    assert (add_outer_walls_to_maze(grid_maze) ==
+            GridMaze.from_maze(add_outer_walls_to_maze(maze)))
+
+    walled_maze = add_random_wall_to_maze(grid_maze)
+    assert len(walled_maze.walls()) == 1
+    assert grid_maze.walls() == []
+
+
+def test_generate_mazes_as_grid():
+    mazes = list(generate_mazes(4, 3, 3, workers=1, seed=7))
+    grid_mazes = list(generate_mazes(4, 3, 3, workers=1, seed=7,
+                                     as_grid=True))
+
+    assert [grid_maze.to_maze() for grid_maze in grid_mazes] == mazes
+
+
+def _outer_walled_maze(N, M, seed):
+    trails = trails_generator(N, M, rng=np.random.default_rng(seed))
+    return add_outer_walls_to_maze((trails.main, []))
+
+
+@pytest.mark.parametrize("N, M", [(1, 1), (1, 5), (4, 1), (6, 9)])
+def test_fill_maze_with_walls_makes_a_perfect_maze(N, M):
+    for seed in range(3):
+        maze = _outer_walled_maze(N, M, seed)
+        full = fill_maze_with_walls(maze, rng=np.random.default_rng(seed))
+        graph = cell_adjacency(full)
+
+        # a tree of cells: connected and with one passage less than cells
+        assert len(graph.indices) == 2 * (N * M - 1)
+        assert (distance_field(graph) >= 0).all()
+        assert solve(graph) == maze[0]
+
+        grid_full = fill_maze_with_walls(GridMaze.from_maze(maze),
+                                         rng=np.random.default_rng(seed))
+        assert grid_full == GridMaze.from_maze(full)
+
+
+def test_wall_inserter_detects_loops_exactly():
+    # a 3 x 3 maze with its outer walls and a straight route along x
+    route = [(1, 1), (3, 1), (5, 1)] + [(5, 3), (5, 5)]
+    inserter = WallInserter.from_maze((route, []))
+    inserter.insert(((2, 2), (2, 4)))
+    inserter.insert(((2, 4), (4, 4)))
+    # the outer walls are missing but the boundary is one node, so a wall
+    # from (4, 4) to the boundary, or to (2, 2), closes a loop
+    assert inserter.is_legal(((4, 4), (4, 2)))
+    assert not(inserter.is_legal(((4, 4), (6, 4))))
+    inserter.insert(((4, 4), (4, 2)))
+    assert not(inserter.is_legal(((4, 2), (2, 2))))
+    # the route passes between (2, 2) and (2, 0)
+    assert not(inserter.is_legal(((2, 0), (2, 2))))
+    with pytest.raises(ValueError):
+        inserter.insert(((4, 2), (2, 2)))
+    with pytest.raises(ValueError):
+        inserter.is_legal(((8, 2), (8, 4)))
+
+    # a perfect 3 x 3 maze has 8 passages, so 4 of its 12 inner walls.
+    # Three are in, which leaves one to fill in
+    assert len(inserter.fill(np.random.default_rng(0))) == 1
+    assert inserter.insert_random() is None
+
+
+def test_add_random_wall_to_full_maze_raises():
+    maze = fill_maze_with_walls(_outer_walled_maze(3, 4, 0))
+    with pytest.raises(ValueError):
+        add_random_wall_to_maze(maze)
+
+
+def test_index_pool():
+    pool = _IndexPool(6, [0, 2, 4])
+    assert len(pool) == 3 and 2 in pool and 3 not in pool
+    pool.remove(0)
+    pool.add(5)
+    pool.add(5)
+    assert sorted(m for m in range(6) if m in pool) == [2, 4, 5]
+    stream = as_random_stream(np.random.default_rng(0))
+    assert {pool.draw(stream) for _ in range(100)} == {2, 4, 5}
+    for member in (2, 4, 5):
+        pool.remove(member)
+    assert len(pool) == 0
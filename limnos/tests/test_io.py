@@ -0,0 +1,129 @@
+"""
+Test the corpus file format
+"""
+import io
+
+import numpy as np
+import pytest
+
+from limnos.generation import grid_maze_from_trails, trails_generator
+from limnos.io import CorpusReader, CorpusWriter, encode_record
+from limnos.types import GridMaze
+
+
+@pytest.fixture(scope="module")
+def generated():
+    mazes = []
+    for seed in range(6):
+        trails = trails_generator(5 + seed, 4, np.random.default_rng(seed))
+        mazes.append((grid_maze_from_trails(trails), trails))
+    return mazes
+
+
+def test_round_trip(tmp_path, generated):
+    path = tmp_path / "corpus.lmz"
+    with CorpusWriter(path) as writer:
+        for n, (maze, trails) in enumerate(generated):
+            writer.write(maze, trails if n % 2 == 0 else None)
+
+    with CorpusReader(path) as reader:
+        assert len(reader) == len(generated)
+        for n, (maze, trails) in enumerate(generated):
+            assert reader[n] == maze
+            if n % 2 == 0:
+                assert reader.trails(n).all_routes() == trails.all_routes()
+            else:
+                assert reader.trails(n).all_routes() == [trails.main]
+        assert list(reader)[-1] == generated[-1][0]
+        assert reader[-1] == generated[-1][0]
+        with pytest.raises(IndexError):
+            reader[len(generated)]
+
+
+def test_append(tmp_path, generated):
+    path = tmp_path / "corpus.lmz"
+    with CorpusWriter(path) as writer:
+        writer.write(*generated[0])
+    with CorpusWriter(path, append=True) as writer:
+        for maze, trails in generated[1:]:
+            writer.write(maze, trails)
+
+    with CorpusReader(path) as reader:
+        assert [maze for maze in reader] == [maze for maze, _ in generated]
+
+
+def test_unclosed_writer_is_recovered(tmp_path, generated):
+    path = tmp_path / "corpus.lmz"
+    writer = CorpusWriter(path)
+    for maze, trails in generated[:3]:
+        writer.write(maze, trails)
+    writer._file.flush()
+
+    with CorpusReader(path) as reader:
+        assert len(reader) == 3
+        assert reader[2] == generated[2][0]
+
+    writer.close()
+
+
+def test_unclosed_appending_writer_is_recovered(tmp_path, generated):
+    path = tmp_path / "corpus.lmz"
+    with CorpusWriter(path) as writer:
+        writer.write(*generated[0])
+    writer = CorpusWriter(path, append=True)
+    for maze, trails in generated[1:3]:
+        writer.write(maze, trails)
+    writer._file.flush()
+
+    with CorpusReader(path) as reader:
+        assert [maze for maze in reader] == [maze for maze, _
+                                             in generated[:3]]
+
+    writer.close()
+
+
+def test_record_of_trivial_maze():
+    maze = GridMaze.from_maze(([(1, 1)], []))
+    record = encode_record(maze)
+    assert len(record) == 24 + 12 + 1 + 1
+
+
+def test_routes_must_be_consecutive(tmp_path):
+    maze = GridMaze.from_maze(([(1, 1), (3, 3)], []))
+    with pytest.raises(ValueError):
+        encode_record(maze)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a_corpus"
+    path.write_bytes(b"x" * 100)
+    with pytest.raises(ValueError):
+        CorpusReader(path)
+
+
+class _Pipe(io.RawIOBase):
+    """
+    A write-only stream that cannot seek, like a pipe
+    """
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+
+def test_write_to_unseekable_stream(tmp_path, generated):
+    pipe = _Pipe()
+    with CorpusWriter(pipe) as writer:
+        for maze, _ in generated:
+            writer.write(maze)
+    assert not(pipe.closed)
+
+    path = tmp_path / "piped.lmz"
+    path.write_bytes(bytes(pipe.data))
+    with CorpusReader(path) as reader:
+        assert list(reader) == [maze for maze, _ in generated]
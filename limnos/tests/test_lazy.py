@@ -0,0 +1,53 @@
+"""
+Test the lazy loading of the heavy dependencies
+"""
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+import limnos
+from limnos.lazy import is_loaded, lazy_module
+
+SCRIPT = """
+import random, sys
+from limnos.generation import (add_outer_walls_to_maze, trails_generator,
+                               walls_from_trails)
+from limnos.validation import (all_points_consecutive, all_points_inside,
+                               all_points_unique)
+import limnos.visualisation
+
+for algorithm in ('sprout', 'backtracker', 'wilson'):
+    trails = trails_generator(6, 5, random.Random(1), algorithm)
+    add_outer_walls_to_maze((trails.main, walls_from_trails(trails)))
+    route = trails.main
+    assert all_points_unique(route) and all_points_consecutive(route)
+    assert all_points_inside(route)
+print(sorted(name for name in ('numpy', 'matplotlib', 'concurrent.futures')
+             if name in sys.modules))
+"""
+
+
+def test_lazy_module_of_loaded_module():
+    assert lazy_module('numpy') is np
+    assert is_loaded('numpy')
+
+
+def test_lazy_module_imports_on_first_use():
+    assert not is_loaded('tabnanny')
+    tabnanny = lazy_module('tabnanny')
+    assert 'lazy module' in repr(tabnanny)
+    assert not is_loaded('tabnanny')
+
+    check = tabnanny.check
+    assert is_loaded('tabnanny')
+    assert check is sys.modules['tabnanny'].check
+
+
+def test_pure_python_generation_loads_no_heavy_dependencies():
+    root = os.path.dirname(os.path.dirname(limnos.__file__))
+    env = dict(os.environ, PYTHONPATH=root)
+    process = subprocess.run([sys.executable, '-c', SCRIPT], env=env,
+                             stdout=subprocess.PIPE, text=True, check=True)
+    assert process.stdout.strip() == '[]'
@@ -0,0 +1,90 @@
+"""
+Test the difficulty metrics and the generation of mazes on target
+"""
+import numpy as np
+import pytest
+
+from limnos.generation import (ALGORITHMS, grid_maze_from_trails,
+                               trails_generator)
+from limnos.metrics import (MazeMetrics, count_turns, generate_with_target,
+                            meets_targets, trails_metrics)
+from limnos.solve import count_dead_ends, solve
+from limnos.stats import GenerationStats
+from limnos.types import Trails
+
+
+def test_metrics_of_small_trails():
+    trails = Trails(main=[(1, 1), (1, 3), (3, 3)], branches=[])
+    trails.sprout([(1, 1), (3, 1)])
+
+    assert trails_metrics(trails) == MazeMetrics(
+        solution_length=3, turns=1, branches=1, dead_ends=2,
+        mean_branch_depth=1.0, max_branch_depth=1)
+
+    single = trails_metrics(Trails(main=[(1, 1)], branches=[]))
+    assert single == MazeMetrics(1, 0, 0, 0, 0.0, 0)
+
+
+def test_count_turns():
+    assert count_turns([(1, 1)]) == 0
+    assert count_turns([(1, 1), (1, 3), (1, 5)]) == 0
+    assert count_turns([(1, 1), (1, 3), (3, 3), (3, 5), (3, 7)]) == 2
+
+
+@pytest.mark.parametrize("algorithm", sorted(ALGORITHMS))
+def test_metrics_agree_with_the_maze(algorithm):
+    trails = trails_generator(9, 11, np.random.default_rng(6),
+                              algorithm=algorithm)
+    grid_maze = grid_maze_from_trails(trails)
+    metrics = trails_metrics(trails)
+
+    assert metrics.solution_length == len(solve(grid_maze))
+    assert metrics.dead_ends == count_dead_ends(grid_maze)
+    assert metrics.branches == len(trails.all_routes()) - 1
+    assert 1 <= metrics.mean_branch_depth <= metrics.max_branch_depth
+
+
+def test_meets_targets():
+    targets = {'solution_length': (10, None), 'turns': (None, 5)}
+    assert meets_targets({'solution_length': 10, 'turns': 5}, targets)
+    assert not(meets_targets({'solution_length': 9}, targets))
+    assert meets_targets({'dead_ends': 100}, targets)
+
+
+@pytest.mark.parametrize("algorithm", ['sprout', 'kruskal'])
+def test_generate_with_target(algorithm):
+    targets = {'solution_length': (41, None), 'max_branch_depth': (2, 4)}
+    stats = GenerationStats()
+    trails = generate_with_target(10, 10, targets, np.random.default_rng(1),
+                                  algorithm=algorithm, stats=stats)
+    assert meets_targets(trails_metrics(trails)._asdict(), targets)
+
+    again = generate_with_target(10, 10, targets, np.random.default_rng(1),
+                                 algorithm=algorithm)
+    assert again.all_routes() == trails.all_routes()
+
+
+def test_hopeless_candidates_are_aborted_early():
+    stats = GenerationStats()
+    with pytest.raises(ValueError):
+        generate_with_target(6, 6, {'solution_length': (37, None)},
+                             np.random.default_rng(0), max_tries=5,
+                             stats=stats)
+    # a route in a 6 x 6 maze has at most 36 points, so no solution
+    # reaches 37 and no branches are grown
+    assert stats.aborted_candidates == 5
+    assert stats.branches == 0
+
+    stats = GenerationStats()
+    with pytest.raises(ValueError):
+        generate_with_target(6, 6, {'branches': (100, None)},
+                             np.random.default_rng(0), max_tries=3,
+                             stats=stats)
+    assert stats.rejected_candidates == 3
+
+
+def test_bad_targets():
+    with pytest.raises(ValueError):
+        generate_with_target(5, 5, {'difficulty': (1, 2)})
+    with pytest.raises(ValueError):
+        generate_with_target(5, 5, {'turns': (5, 2)})
@@ -0,0 +1,85 @@
+"""
+Test the out-of-core generation of mazes
+"""
+import numpy as np
+import pytest
+
+import limnos.outofcore
+from limnos.outofcore import DiskMaze, eller_maze
+from limnos.validation import is_perfect_maze
+
+
+@pytest.mark.parametrize('N, M', [(1, 1), (1, 6), (6, 1), (2, 2), (9, 13),
+                                  (40, 31)])
+def test_eller_maze_is_perfect(tmp_path, N, M):
+    for seed in range(3):
+        maze = eller_maze(tmp_path / "maze.lwg", N, M,
+                          np.random.default_rng(seed))
+        grid_maze = maze.grid_maze()
+        assert grid_maze.shape == (N, M)
+        assert is_perfect_maze(grid_maze)
+        assert grid_maze.route[0].tolist() == [1, 1]
+        assert grid_maze.route[-1].tolist() == [2 * N - 1, 2 * M - 1]
+
+        horizontal, vertical = maze.wall_grids()
+        assert horizontal[:, [0, -1]].all() and vertical[[0, -1]].all()
+        maze.close()
+
+
+def test_bands_do_not_change_the_maze(tmp_path, monkeypatch):
+    whole = eller_maze(tmp_path / "whole.lwg", 30, 20,
+                       np.random.default_rng(5))
+    monkeypatch.setattr(limnos.outofcore, 'BAND_BYTES', 15)
+    banded = eller_maze(tmp_path / "banded.lwg", 30, 20,
+                        np.random.default_rng(5))
+
+    assert banded.grid_maze() == whole.grid_maze()
+    assert ((tmp_path / "banded.lwg").read_bytes() ==
+            (tmp_path / "whole.lwg").read_bytes())
+
+
+def test_windows(tmp_path):
+    maze = eller_maze(tmp_path / "maze.lwg", 21, 19,
+                      np.random.default_rng(2))
+    grid_maze = maze.grid_maze()
+    horizontal, vertical = grid_maze.horizontal, grid_maze.vertical
+
+    assert maze.walls() == grid_maze.walls()
+
+    i0, j0, i1, j1 = 3, 9, 11, 18
+    window_h, window_v = maze.wall_grids(i0, j0, i1, j1)
+    assert np.array_equal(window_h, horizontal[i0:i1, j0:j1 + 1])
+    assert np.array_equal(window_v, vertical[i0:i1 + 1, j0:j1])
+
+    inside = [wall for wall in grid_maze.walls()
+              if all(2 * i0 <= x <= 2 * i1 and 2 * j0 <= y <= 2 * j1
+                     for x, y in wall)]
+    assert sorted(maze.walls(i0, j0, i1, j1)) == sorted(inside)
+
+    with pytest.raises(ValueError):
+        maze.wall_grids(0, 0, 22, 5)
+    with pytest.raises(ValueError):
+        maze.walls(4, 4, 4, 8)
+
+
+def test_rejects_bad_input(tmp_path):
+    path = tmp_path / "other.lwg"
+    path.write_bytes(b"not a wall grid file, but long enough")
+    with pytest.raises(ValueError):
+        DiskMaze(path)
+    with pytest.raises(ValueError):
+        eller_maze(tmp_path / "maze.lwg", 3, 3, join_probability=1.5)
+    with pytest.raises(ValueError):
+        eller_maze(tmp_path / "maze.lwg", 0, 3)
+
+
+def test_closed_maze_can_not_be_read(tmp_path):
+    path = tmp_path / "maze.lwg"
+    with DiskMaze.create(path, 3, 4) as maze:
+        pass
+    maze.close()
+
+    for read in (maze.wall_grids, maze.walls, maze.grid_maze, maze.flush):
+        with pytest.raises(ValueError, match="closed"):
+            read()
+    assert DiskMaze(path).wall_grids()[0].shape == (3, 5)
@@ -0,0 +1,53 @@
+"""
+Test the generation of a single maze in regions
+"""
+import pytest
+
+from limnos.generation import ALGORITHMS
+from limnos.regions import default_regions, generate_large_maze, region_bounds
+from limnos.validation import is_perfect_maze
+
+
+def test_region_bounds():
+    assert region_bounds(5, 4, (2, 1)) == [(0, 0, 2, 4), (2, 0, 5, 4)]
+
+    bounds = region_bounds(10, 7, (3, 2))
+    assert len(bounds) == 6
+    assert sum((i1 - i0) * (j1 - j0) for i0, j0, i1, j1 in bounds) == 70
+    with pytest.raises(ValueError):
+        region_bounds(2, 7, (3, 2))
+
+
+def test_default_regions():
+    assert default_regions(100, 100, 4) == (2, 2)
+    assert default_regions(100, 100, 1) == (1, 1)
+    R, S = default_regions(400, 100, 8)
+    assert R * S >= 8 and R > S
+    assert default_regions(1, 3, 8) == (1, 3)
+
+
+@pytest.mark.parametrize("algorithm", sorted(ALGORITHMS))
+@pytest.mark.parametrize("N, M, regions", [(1, 1, (1, 1)), (6, 1, (3, 1)),
+                                           (1, 7, (1, 3)), (10, 12, (3, 4)),
+                                           (9, 9, (9, 9))])
+def test_stitched_maze_is_perfect(algorithm, N, M, regions):
+    maze = generate_large_maze(N, M, workers=1, seed=2, algorithm=algorithm,
+                               regions=regions)
+    assert maze.shape == (N, M)
+    assert is_perfect_maze(maze)
+    assert maze.route[0].tolist() == [1, 1]
+    assert maze.route[-1].tolist() == [2 * N - 1, 2 * M - 1]
+
+
+def test_maze_does_not_depend_on_workers():
+    single = generate_large_maze(20, 30, workers=1, seed=8, regions=(2, 3))
+    pooled = generate_large_maze(20, 30, workers=2, seed=8, regions=(2, 3))
+    assert single == pooled
+    assert single != generate_large_maze(20, 30, workers=1, seed=9,
+                                         regions=(2, 3))
+
+
+def test_unconnected_stitch_raises(monkeypatch):
+    monkeypatch.setattr('limnos.regions.solve', lambda maze: None)
+    with pytest.raises(ValueError, match="no way"):
+        generate_large_maze(6, 6, workers=1, seed=0, regions=(2, 2))
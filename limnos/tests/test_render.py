@@ -0,0 +1,107 @@
+"""
+Test the matplotlib-free rendering
+"""
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+from limnos.generation import (add_outer_walls_to_maze,
+                               grid_maze_from_trails,
+                               trails_generator)
+from limnos.render import (ROUTE_COLOR,
+                           WALL_COLOR,
+                           encode_png,
+                           render_corpus,
+                           render_image,
+                           render_text)
+
+
+# a 2 x 2 maze with a wall between the two western cells
+ROUTE = [(1, 1), (3, 1), (3, 3)]
+WALLS = [((0, 2), (2, 2)), ((2, 2), (2, 4))]
+
+
+def _decode_png(data: bytes) -> np.ndarray:
+    assert data.startswith(b'\x89PNG\r\n\x1a\n')
+    pos = 8
+    chunks = {}
+    while pos < len(data):
+        length, = struct.unpack('>I', data[pos: pos + 4])
+        tag = data[pos + 4: pos + 8]
+        body = data[pos + 8: pos + 8 + length]
+        crc, = struct.unpack('>I', data[pos + 8 + length: pos + 12 + length])
+        assert crc == zlib.crc32(tag + body)
+        chunks[tag] = body
+        pos += 12 + length
+
+    width, height, depth, color_type = struct.unpack('>IIBB',
+                                                     chunks[b'IHDR'][:10])
+    channels = {0: 1, 2: 3}[color_type]
+    raw = np.frombuffer(zlib.decompress(chunks[b'IDAT']), dtype=np.uint8)
+    scanlines = raw.reshape(height, width * channels + 1)
+    assert not scanlines[:, 0].any()
+
+    return scanlines[:, 1:].reshape(height, width, channels)
+
+
+def test_render_image_paints_walls_and_route():
+    image = render_image((ROUTE, WALLS), cell_size=4, wall_width=1,
+                         route_width=1)
+
+    assert image.shape == (9, 9, 3)
+    walls = (image == WALL_COLOR).all(axis=2)
+    route = (image == ROUTE_COLOR).all(axis=2)
+
+    # the wall from (0, 2) to (2, 2), then north up to (2, 4)
+    assert walls[4, 0: 5].all()
+    assert walls[0: 5, 4].all()
+    assert walls.sum() == 9
+    # the route runs along the south row and then north in the east
+    assert route[6, 2: 7].all()
+    assert route[2: 7, 6].all()
+    assert route.sum() == 9
+
+
+def test_png_round_trip():
+    image = render_image((ROUTE, WALLS))
+    assert np.array_equal(_decode_png(encode_png(image)), image)
+
+    gray = image[:, :, 0]
+    assert np.array_equal(_decode_png(encode_png(gray))[:, :, 0], gray)
+
+    with pytest.raises(ValueError):
+        encode_png(image.astype(np.int16))
+
+
+def test_render_text():
+    maze = add_outer_walls_to_maze((ROUTE, WALLS))
+    # with openings at the south west and north east corners
+    expected = ("┌───┐    \n"
+                "│   │ •  \n"
+                "└───┘   ╷\n"
+                "  •   • │\n"
+                "    ╶───┘")
+
+    assert render_text(maze) == expected
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("fmt", ["png", "txt"])
+def test_render_corpus(tmp_path, workers, fmt):
+    mazes = [grid_maze_from_trails(trails_generator(4, 3,
+                                                    np.random.default_rng(n)))
+             for n in range(5)]
+
+    paths = render_corpus(iter(mazes), tmp_path / "out", fmt=fmt,
+                          workers=workers)
+
+    assert [path.rsplit("/", 1)[-1] for path in paths] == [
+        f"maze_{n:06d}.{fmt}" for n in range(5)]
+    with open(paths[3], "rb") as file:
+        contents = file.read()
+    if fmt == "png":
+        assert np.array_equal(_decode_png(contents), render_image(mazes[3]))
+    else:
+        assert contents.decode("utf-8") == render_text(mazes[3]) + "\n"
@@ -0,0 +1,63 @@
+"""
+Test the random number sources
+"""
+import random
+
+import numpy as np
+
+from limnos.rng import RandomStream, as_random_stream
+
+
+def test_randint_covers_inclusive_range():
+    stream = RandomStream(np.random.default_rng(0), block_size=7)
+    values = {stream.randint(-1, 2) for _ in range(200)}
+    assert values == {-1, 0, 1, 2}
+
+
+def test_streams_from_equal_seeds_agree():
+    stream_1 = as_random_stream(np.random.default_rng(5))
+    stream_2 = as_random_stream(np.random.default_rng(5))
+
+    draws_1 = [stream_1.choice("abcdef") for _ in range(5000)]
+    draws_2 = [stream_2.choice("abcdef") for _ in range(5000)]
+    assert draws_1 == draws_2
+
+
+def test_as_random_stream_passes_streams_through():
+    stream = RandomStream(np.random.default_rng())
+    assert as_random_stream(stream) is stream
+    assert isinstance(as_random_stream(None), RandomStream)
+
+
+def test_permutation():
+    stream = RandomStream(np.random.default_rng(2))
+    assert sorted(stream.permutation(10).tolist()) == list(range(10))
+
+
+def test_streams_from_python_random():
+    stream_1 = as_random_stream(random.Random(3))
+    stream_2 = RandomStream(random.Random(3), block_size=5)
+
+    assert ([stream_1.randint(0, 9) for _ in range(100)] ==
+            [stream_2.randint(0, 9) for _ in range(100)])
+    # the NumPy Generator is seeded from the stream, and kept
+    generator = stream_1.numpy_generator()
+    assert isinstance(generator, np.random.Generator)
+    assert stream_1.numpy_generator() is generator
+    assert sorted(stream_1.permutation(20).tolist()) == list(range(20))
+    assert (as_random_stream(random.Random(4)).permutation(20).tolist() ==
+            as_random_stream(random.Random(4)).permutation(20).tolist())
+
+
+def test_short_streams_draw_little():
+    generator = np.random.default_rng(6)
+    stream = as_random_stream(generator)
+    draws = [stream.random() for _ in range(3)]
+    # the stream took its first, small block only
+    assert draws == np.random.default_rng(6).random(3).tolist()
+    assert generator.random() == np.random.default_rng(6).random(65)[-1]
+
+    # growing blocks hand out the numbers of the generator in order
+    stream = RandomStream(np.random.default_rng(7), block_size=1000)
+    assert ([stream.random() for _ in range(5000)] ==
+            np.random.default_rng(7).random(5000).tolist())
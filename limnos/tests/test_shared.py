@@ -0,0 +1,128 @@
+"""
+Test sharing mazes between processes
+"""
+import multiprocessing
+import os
+import pickle
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import limnos
+from limnos.generation import grid_maze_from_trails, trails_generator
+from limnos.shared import SharedMazes, SharedMazesDescriptor
+from limnos.solve import solve
+
+
+def _mazes():
+    trails = [trails_generator(N, M, np.random.default_rng(N + M),
+                               algorithm)
+              for N, M, algorithm in [(1, 1, 'sprout'), (5, 8, 'sprout'),
+                                      (7, 3, 'wilson')]]
+    return trails + [grid_maze_from_trails(trails[1])]
+
+
+def _solve_shared(descriptor):
+    with SharedMazes.attach(descriptor) as shared:
+        routes = [solve(shared[k]) for k in range(len(shared))]
+    return routes
+
+
+def test_shared_mazes_match_their_sources():
+    mazes = _mazes()
+    with SharedMazes.create(mazes) as shared:
+        assert len(shared) == 4
+        for k, trails in enumerate(mazes[:3]):
+            assert shared[k] == grid_maze_from_trails(trails)
+            assert shared.trails(k).all_routes() == trails.all_routes()
+            assert (shared.trails_arrays(k).route(0).tolist() ==
+                    [list(point) for point in trails.main])
+        # a GridMaze comes with its solution route only
+        assert shared[3] == mazes[3]
+        assert shared.trails(3).all_routes() == [mazes[1].main]
+        assert shared[-1] == shared[3]
+        with pytest.raises(IndexError):
+            shared[4]
+
+
+def test_shared_subtrails():
+    trails = trails_generator(6, 6, np.random.default_rng(1))
+    subtrail = max(trails.branches, key=lambda branch: len(branch.branches))
+    with SharedMazes.create([subtrail]) as shared:
+        assert shared.trails(0).all_routes() == subtrail.all_routes()
+
+
+def test_attached_mazes_are_views_of_the_block():
+    with SharedMazes.create(_mazes()) as shared:
+        attached = SharedMazes.attach(shared.descriptor)
+        maze = attached[1]
+        shared[1].packed_vertical[0] ^= 1
+        assert maze == shared[1]
+
+        with pytest.raises(BufferError):
+            attached.close()
+        del maze
+        attached.close()
+        with pytest.raises(ValueError):
+            attached.unlink()
+
+
+def test_descriptor_pickles_small():
+    with SharedMazes.create(_mazes() * 500) as shared:
+        assert len(shared) == 2000
+        descriptor = pickle.loads(pickle.dumps(shared.descriptor))
+        assert descriptor == shared.descriptor
+        assert isinstance(descriptor, SharedMazesDescriptor)
+        assert len(pickle.dumps(descriptor)) < 200
+
+
+@pytest.mark.parametrize('method', ['fork', 'spawn'])
+def test_mazes_are_solved_in_another_process(method):
+    if method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f"no {method} start method")
+    with SharedMazes.create(_mazes()) as shared:
+        expected = [solve(shared[k]) for k in range(len(shared))]
+        context = multiprocessing.get_context(method)
+        with context.Pool(1) as pool:
+            routes = pool.apply(_solve_shared, (shared.descriptor,))
+    assert routes == expected
+
+
+def test_attaching_process_leaves_the_block_alone():
+    root = os.path.dirname(os.path.dirname(limnos.__file__))
+    with SharedMazes.create(_mazes()) as shared:
+        script = ("from limnos.shared import SharedMazes, "
+                  "SharedMazesDescriptor\n"
+                  f"descriptor = {shared.descriptor!r}\n"
+                  "shared = SharedMazes.attach(descriptor)\n"
+                  "print(len(shared))\n"
+                  "shared.close()\n")
+        process = subprocess.run([sys.executable, '-c', script],
+                                 env=dict(os.environ, PYTHONPATH=root),
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE, text=True,
+                                 check=True)
+        assert process.stdout.strip() == '4'
+        assert process.stderr == ''
+        # the block is still there once the other process ended
+        SharedMazes.attach(shared.descriptor).close()
+
+
+def test_views_kept_past_the_with_block():
+    with pytest.raises(BufferError, match="drop or copy"):
+        with SharedMazes.create(_mazes()) as shared:
+            maze = shared[1]
+            attached = SharedMazes.attach(shared.descriptor)
+            with pytest.raises(BufferError, match="drop or copy"):
+                with attached:
+                    attached_maze = attached[1]
+    # the creator unlinked the block all the same
+    with pytest.raises(FileNotFoundError):
+        SharedMazes.attach(shared.descriptor)
+
+    assert maze == attached_maze
+    del maze, attached_maze
+    shared.close()
+    attached.close()
@@ -0,0 +1,115 @@
+"""
+Test the maze solver
+"""
+import numpy as np
+import pytest
+
+from limnos.generation import grid_maze_from_trails, trails_generator
+from limnos.solve import (_bfs_traversal, _tree_traversal, cell_adjacency,
+                          count_dead_ends, dead_ends, distance_field, solve)
+from limnos.types import GridMaze
+
+
+def _neighbours(graph, cell):
+    return sorted(graph.indices[graph.indptr[cell]: graph.indptr[cell + 1]])
+
+
+def test_cell_adjacency_of_a_small_maze():
+    # a 2 x 2 maze with a single inner wall between (1, 1) and (1, 3)
+    maze = ([], [((0, 2), (2, 2))])
+    graph = cell_adjacency(maze[1], shape=(2, 2))
+
+    assert graph.shape == (2, 2)
+    assert _neighbours(graph, 0) == [2]
+    assert _neighbours(graph, 1) == [3]
+    assert _neighbours(graph, 2) == [0, 3]
+    assert _neighbours(graph, 3) == [1, 2]
+    assert graph.degrees.tolist() == [1, 1, 2, 2]
+
+
+def test_cell_adjacency_of_a_wall_list_needs_a_shape():
+    with pytest.raises(ValueError):
+        cell_adjacency([((0, 2), (2, 2))])
+
+
+@pytest.mark.parametrize("N, M", [(1, 1), (1, 6), (5, 1), (7, 9)])
+def test_solve_finds_the_generated_route(N, M):
+    for seed in range(4):
+        trails = trails_generator(N, M, np.random.default_rng(seed))
+        maze = grid_maze_from_trails(trails)
+
+        assert solve(maze) == trails.main
+        assert solve((trails.main, maze.walls())) == trails.main
+        distances = distance_field(maze)
+        assert distances[N - 1, M - 1] == len(trails.main) - 1
+        assert (distances >= 0).all()
+
+
+def test_tree_traversal_agrees_with_bfs():
+    for seed in range(6):
+        trails = trails_generator(6, 4 + seed, np.random.default_rng(seed))
+        graph = cell_adjacency(grid_maze_from_trails(trails))
+        for source in (0, 5, len(graph.indptr) - 2):
+            tree = _tree_traversal(graph, source)
+            assert tree is not None
+            bfs = _bfs_traversal(graph, source)
+            assert np.array_equal(tree.distances, bfs.distances)
+
+
+def test_solve_maze_with_loops():
+    # no inner walls at all: every cell is reachable on a shortest path
+    maze = GridMaze.from_wall_grids([], np.zeros((4, 4), dtype=bool),
+                                    np.zeros((5, 3), dtype=bool))
+    graph = cell_adjacency(maze)
+    assert _tree_traversal(graph, 0) is None
+
+    route = solve(graph)
+    assert route is not None
+    assert len(route) == 4 + 3 - 1
+    assert route[0] == (1, 1) and route[-1] == (7, 5)
+    assert distance_field(graph, start=(7, 5))[0, 0] == 5
+
+
+def test_solve_disconnected_maze():
+    # a wall right across a 2 x 3 maze
+    horizontal = np.zeros((2, 4), dtype=bool)
+    vertical = np.zeros((3, 3), dtype=bool)
+    horizontal[:, 2] = True
+    maze = GridMaze.from_wall_grids([], horizontal, vertical)
+
+    assert solve(maze) is None
+    distances = distance_field(maze)
+    assert (distances[:, :2] >= 0).all()
+    assert (distances[:, 2] == -1).all()
+
+
+def test_loop_with_cut_off_cells():
+    # one arc too few for a tree, as two cells are cut off, but the cells
+    # around the source close a loop
+    horizontal = np.array([[1, 0, 0, 0, 1], [0, 0, 0, 0, 0],
+                           [0, 1, 1, 1, 1]], dtype=bool)
+    vertical = np.array([[1, 1, 1, 0], [0, 0, 0, 1], [0, 1, 0, 1],
+                         [0, 1, 1, 0]], dtype=bool)
+    maze = GridMaze.from_wall_grids([], horizontal, vertical)
+    graph = cell_adjacency(maze)
+    assert len(graph.indices) == 2 * (len(graph.indptr) - 2)
+    assert _tree_traversal(graph, 0) is None
+
+    assert distance_field(maze).tolist() == [[0, 1, 2, 3], [1, 2, 3, 4],
+                                             [2, -1, 4, -1]]
+    route = solve(maze, end=(3, 3))
+    assert route is not None
+    assert len(route) == 3
+    assert route[0] == (1, 1) and route[-1] == (3, 3)
+    assert all(abs(x1 - x0) + abs(y1 - y0) == 2
+               for (x0, y0), (x1, y1) in zip(route, route[1:]))
+
+
+def test_dead_ends():
+    trails = trails_generator(8, 8, np.random.default_rng(3))
+    maze = grid_maze_from_trails(trails)
+    graph = cell_adjacency(maze)
+
+    assert dead_ends(maze).shape == (8, 8)
+    assert count_dead_ends(maze) == int((graph.degrees == 1).sum())
+    assert count_dead_ends(graph) == count_dead_ends(maze)
@@ -0,0 +1,88 @@
+"""
+Test the generation statistics
+"""
+import json
+import time
+
+import numpy as np
+
+from limnos.generation import (add_outer_walls_to_maze,
+                               add_random_wall_to_maze,
+                               fill_maze_with_walls, trails_generator)
+from limnos.stats import GenerationStats
+from limnos.transforms import (TransformableRoute,
+                               randomly_transform_N_times)
+
+
+def test_stats_do_not_change_the_trails():
+    stats = GenerationStats()
+    with_stats = trails_generator(8, 7, rng=np.random.default_rng(1),
+                                  stats=stats)
+    without_stats = trails_generator(8, 7, rng=np.random.default_rng(1))
+
+    assert with_stats.all_routes() == without_stats.all_routes()
+    assert stats.transforms == 8 * 7
+    assert stats.branches == len(with_stats.all_routes()) - 1
+    assert (sum(length * count
+                for length, count in stats.branch_lengths.items()) ==
+            sum(len(route) for route in with_stats.all_routes()[1:]))
+    assert stats.sprout_draws == stats.branches + stats.stale_sprout_draws
+    assert set(stats.phase_seconds) == {'solution_route',
+                                        'solution_route/transforms',
+                                        'branches'}
+
+
+def test_top_level_phases_add_up_to_the_total():
+    stats = GenerationStats()
+    start = time.perf_counter()
+    trails_generator(10, 10, rng=np.random.default_rng(3), stats=stats)
+    elapsed = time.perf_counter() - start
+
+    seconds = stats.phase_seconds
+    assert stats.total_seconds == (seconds['solution_route'] +
+                                   seconds['branches'])
+    assert stats.total_seconds <= elapsed
+    assert (seconds['solution_route/transforms'] <=
+            seconds['solution_route'])
+
+
+def test_transform_stats_count_capped_transforms():
+    stats = GenerationStats()
+    # a route of a single point can not be transformed at all
+    TransformableRoute([(1, 1)]).transform_randomly(tries=7, stats=stats)
+    assert stats.transforms == 1
+    assert stats.rejected_tries == 7
+    assert stats.capped_transforms == 1
+
+    randomly_transform_N_times([(1, 1), (1, 3), (3, 3)], 20,
+                               rng=np.random.default_rng(0), stats=stats)
+    assert stats.transforms == 21
+    assert stats.rejected_tries >= 7
+
+
+def test_wall_stats():
+    trails = trails_generator(6, 6, rng=np.random.default_rng(2),
+                              algorithm='kruskal')
+    maze = add_outer_walls_to_maze((trails.main, []))
+
+    stats = GenerationStats()
+    add_random_wall_to_maze(maze, stats=stats)
+    assert stats.walls_inserted == 1
+
+    stats = GenerationStats()
+    full = fill_maze_with_walls(maze, rng=np.random.default_rng(0),
+                                stats=stats)
+    assert stats.walls_inserted == len(full[1]) - len(maze[1])
+    assert set(stats.phase_seconds) == {'wall_pool', 'walls'}
+
+
+def test_stats_as_dict_is_json():
+    stats = GenerationStats()
+    trails_generator(5, 5, rng=np.random.default_rng(0),
+                     algorithm='wilson', stats=stats)
+
+    data = json.loads(json.dumps(stats.as_dict()))
+    assert data['branches'] == stats.branches
+    assert set(data['phase_seconds']) == {'passages', 'trails'}
+    assert data['total_seconds'] == stats.total_seconds
+    assert 'GenerationStats(' in repr(stats)
@@ -0,0 +1,81 @@
+"""
+Test the per-size templates and their cache
+"""
+import numpy as np
+import pytest
+
+from limnos.templates import (SizeTemplate,
+                              TemplateCache,
+                              cell_neighbours,
+                              size_template)
+
+
+def test_tables():
+    template = SizeTemplate(2, 3)
+
+    assert template.cell_points == ((1, 1), (1, 3), (1, 5),
+                                    (3, 1), (3, 3), (3, 5))
+    assert template.cell_neighbours == tuple(map(tuple,
+                                                 cell_neighbours(2, 3)))
+    assert template.initial_route == ((1, 1), (1, 3), (1, 5), (3, 5))
+    assert len(template.potential_walls) == 2 * 4 + 3 * 3
+    assert template.potential_walls[0] == ((0, 0), (2, 0))
+    assert template.potential_walls[-1] == ((4, 4), (4, 6))
+    assert set(template.outer_walls) < set(template.potential_walls)
+    assert len(template.outer_walls) == 2 * (2 + 3) - 4
+    assert ((0, 0), (2, 0)) not in template.outer_walls
+    assert ((4, 4), (4, 6)) not in template.outer_walls
+
+
+def test_wall_corners():
+    N, M = 3, 4
+    starts, ends = SizeTemplate(N, M).wall_corners
+
+    corners = np.arange((N + 1) * (M + 1)).reshape(N + 1, M + 1)
+    assert list(starts) == np.concatenate(
+        [corners[:-1, :].ravel(), corners[:, :-1].ravel()]).tolist()
+    assert list(ends) == np.concatenate(
+        [corners[1:, :].ravel(), corners[:, 1:].ravel()]).tolist()
+
+    boundary = np.concatenate([corners[0], corners[-1],
+                               corners[:, 0], corners[:, -1]])
+    assert (sorted(SizeTemplate(N, M).boundary_corners) ==
+            sorted(set(boundary.tolist())))
+
+
+def test_tables_are_built_once():
+    template = SizeTemplate(4, 4)
+    assert template.nbytes == 0
+    assert template.cell_points is template.cell_points
+    assert template.nbytes > 0
+
+
+def test_cache_keeps_recently_used():
+    cache = TemplateCache(max_templates=2)
+    first = cache.get(2, 2)
+    cache.get(3, 3)
+    assert cache.get(2, 2) is first
+    cache.get(4, 4)
+
+    assert len(cache) == 2
+    assert (2, 2) in cache
+    assert (3, 3) not in cache
+
+
+def test_cache_memory_cap():
+    cache = TemplateCache(max_bytes=100_000)
+    small = cache.get(2, 2)
+    small.cell_neighbours
+    big = cache.get(100, 100)
+    big.cell_neighbours
+
+    # the big template is handed out but not kept
+    assert (100, 100) not in cache
+    assert cache.get(2, 2) is small
+    assert cache.nbytes <= 100_000
+
+
+def test_size_template_is_cached():
+    assert size_template(5, 6) is size_template(5, 6)
+    with pytest.raises(ValueError):
+        size_template(0, 6)
@@ -7,7 +7,12 @@ from limnos.types import Route
 from limnos.transforms import (bender,
                                flipper,
                                flattener,
-                               Chirality)
+                               randomly_transform_N_times,
+                               Chirality,
+                               TransformableRoute)
+from limnos.validation import (all_points_consecutive,
+                               all_points_inside,
+                               all_points_unique)
 
 two_point_routes = [[(1, 1), (3, 1)],
                     [(1, 1), (1, 3)],
@@ -36,3 +41,46 @@ def test_flipper_twice_is_identity(route):
 def test_bend_and_flatten_is_identity(route, chirality):
     bend_route = bender(route, 0, chirality)
     assert flattener(bend_route, 0) == route
+
+
+def test_transformable_route_rejects_invalid_moves():
+    route = [(1, 1), (1, 3), (3, 3), (3, 1), (5, 1), (5, 3), (5, 5)]
+    transformable = TransformableRoute(route)
+
+    # bending (1, 3) -> (3, 3) to the right hits (1, 1) and (3, 1)
+    assert not transformable.bend(1, Chirality.RIGHT)
+    # bending (1, 1) -> (1, 3) to the left leaves the region
+    assert not transformable.bend(0, Chirality.LEFT)
+    # flipping (1, 3) would move it onto (3, 1)
+    assert not transformable.flip(0)
+    assert not transformable.flatten(1)
+    assert not transformable.flatten(4)
+    assert transformable.points == route
+
+
+def test_transformable_route_applies_valid_moves():
+    route = [(1, 1), (1, 3), (3, 3), (3, 1), (5, 1), (5, 3), (5, 5)]
+    transformable = TransformableRoute(route)
+
+    assert transformable.flatten(0)
+    assert transformable.points == [(1, 1), (3, 1), (5, 1), (5, 3), (5, 5)]
+    assert transformable.bend(0, Chirality.LEFT)
+    assert transformable.points == route
+    assert transformable.flatten(2)
+    assert not transformable.flip(1)
+    assert transformable.flip(2)
+    assert transformable.points == [(1, 1), (1, 3), (3, 3), (3, 5), (5, 5)]
+
+
+@pytest.mark.parametrize("N, M", [(1, 1), (1, 4), (5, 1), (6, 6)])
+def test_random_transforms_keep_route_valid(N, M):
+    route: Route = ([(1, 2*m + 1) for m in range(M)] +
+                    [(2*(n + 1) + 1, 2*(M - 1) + 1) for n in range(N - 1)])
+
+    new_route = randomly_transform_N_times(route, N * M)
+
+    assert new_route[0] == route[0]
+    assert new_route[-1] == route[-1]
+    assert all_points_consecutive(new_route)
+    assert all_points_unique(new_route)
+    assert all_points_inside(new_route)
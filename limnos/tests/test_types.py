@@ -0,0 +1,146 @@
+"""
+Test the fundamental types
+"""
+import pickle
+
+import pytest
+
+from limnos.types import GridMaze, Trails
+
+
+MAIN = [(1, 1), (3, 1), (5, 1), (5, 3), (5, 5), (5, 7)]
+BRANCH = [(5, 3), (3, 3), (3, 5), (1, 5)]
+SUB_BRANCH = [(3, 5), (3, 7)]
+
+
+@pytest.fixture
+def trails():
+    trails = Trails(main=MAIN.copy(), branches=[])
+    branch = Trails(main=BRANCH.copy(), branches=[])
+    trails.add_branch(branch)
+    branch.add_branch(Trails(main=SUB_BRANCH.copy(), branches=[]))
+    return trails
+
+
+def test_point_in_trails(trails):
+    for route in (MAIN, BRANCH, SUB_BRANCH):
+        for point in route:
+            assert trails.point_in_trails(point)
+    assert not trails.point_in_trails((1, 3))
+
+
+def test_locate_returns_first_owner_and_index(trails):
+    # the sprout point belongs to the parent
+    assert trails.locate((5, 3)) == (trails, 3)
+    assert trails.locate((1, 5)) == (trails.branches[0], 3)
+    assert trails.locate((3, 7)) == (trails[[0, 0]], 1)
+    # lookups from a subtrail see the full trails
+    assert trails.branches[0].locate((5, 5)) == (trails, 4)
+
+
+def test_locate_unknown_point_raises(trails):
+    with pytest.raises(ValueError):
+        trails.locate((1, 7))
+
+
+def test_index_adopts_prebuilt_branches():
+    branch = Trails(main=BRANCH.copy(),
+                    branches=[Trails(main=SUB_BRANCH.copy(), branches=[])])
+    trails = Trails(main=MAIN.copy(), branches=[branch])
+
+    assert trails.get_subtrail_by_point((3, 7)) is branch.branches[0]
+    assert branch.point_in_trails((5, 7))
+
+
+def test_occupancy_follows_new_branches(trails):
+    occupancy = trails.occupancy
+    assert occupancy.shape == (3, 4)
+    assert occupancy.sum() == 10
+    assert not occupancy[0, 1]
+    assert not occupancy[0, 3]
+
+    trails[[0, 0]].add_branch(Trails(main=[(3, 7), (1, 7)], branches=[]))
+    assert trails.occupancy[0, 3]
+    assert trails.point_in_trails((1, 7))
+
+
+def test_deep_trails_do_not_recurse():
+    trails = Trails(main=[(1, 1), (3, 1)], branches=[])
+    subtrail = trails
+    for n in range(2, 3000):
+        subtrail = subtrail.sprout([(2 * n - 1, 1), (2 * n + 1, 1)])
+
+    assert len(trails.all_routes()) == 2999
+    assert trails[[0] * 2998] is subtrail
+    assert trails.locate((5999, 1)) == (subtrail, 1)
+    assert repr(trails).startswith("Trail([(1, 1), (3, 1)], [Trail(")
+
+
+def test_sprout_and_point(trails):
+    branch = trails.sprout([(1, 1), (1, 3)])
+    assert trails.branches[-1] is branch
+    assert branch.point(-1) == (1, 3)
+    assert trails.point(2) == (5, 1)
+    assert trails.locate((1, 3)) == (branch, 1)
+    with pytest.raises(IndexError):
+        branch.point(2)
+
+
+def test_pickled_trails_keep_lookups(trails):
+    copy = pickle.loads(pickle.dumps(trails))
+
+    assert copy.all_routes() == trails.all_routes()
+    assert copy.locate((5, 3)) == (copy, 3)
+    assert copy.locate((3, 7)) == (copy[[0, 0]], 1)
+    assert repr(copy) == repr(trails)
+
+
+WALLS = [((0, 2), (0, 4)), ((2, 2), (4, 2)), ((4, 6), (4, 4)),
+         ((6, 0), (6, 2)), ((2, 8), (4, 8))]
+
+
+def test_grid_maze_round_trip():
+    grid_maze = GridMaze.from_maze((MAIN, WALLS))
+
+    assert grid_maze.shape == (3, 4)
+    route, walls = grid_maze.to_maze()
+    assert route == MAIN
+    assert sorted(map(sorted, walls)) == sorted(map(sorted, WALLS))
+    assert GridMaze.from_maze((route, walls)) == grid_maze
+
+
+def test_grid_maze_has_wall():
+    grid_maze = GridMaze.from_maze((MAIN, WALLS))
+
+    for wall in WALLS:
+        assert grid_maze.has_wall(wall)
+        assert grid_maze.has_wall((wall[1], wall[0]))
+    assert not grid_maze.has_wall(((2, 2), (2, 4)))
+    # outside of the grid
+    assert not grid_maze.has_wall(((6, 8), (8, 8)))
+
+    with pytest.raises(ValueError):
+        grid_maze.has_wall(((2, 2), (4, 4)))
+
+
+def test_grid_maze_with_walls_copies():
+    grid_maze = GridMaze.from_maze((MAIN, WALLS))
+    new_maze = grid_maze.with_walls([((2, 2), (2, 4))])
+
+    assert new_maze.has_wall(((2, 2), (2, 4)))
+    assert not grid_maze.has_wall(((2, 2), (2, 4)))
+    assert new_maze.corner_has_wall((2, 4))
+    assert not grid_maze.corner_has_wall((2, 4))
+
+    with pytest.raises(ValueError):
+        grid_maze.with_walls([((8, 0), (8, 2))])
+
+
+def test_main_and_branches_are_copies(trails):
+    main = trails.main
+    assert main == MAIN
+    main.append((7, 7))
+    assert trails.main == MAIN
+
+    trails.branches.append(Trails(main=[(1, 1)], branches=[]))
+    assert len(trails.branches) == 1
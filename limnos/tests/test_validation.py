@@ -0,0 +1,125 @@
+"""
+Test the batch rules against the rules for a single route
+"""
+import numpy as np
+import pytest
+
+from limnos.generation import (fill_maze_with_walls,
+                               generate_mazes,
+                               grid_maze_from_trails,
+                               trails_generator,
+                               walls_from_trails)
+from limnos.types import GridMaze
+from limnos.validation import (all_points_consecutive,
+                               all_points_inside,
+                               all_points_unique,
+                               batch_all_points_consecutive,
+                               batch_all_points_inside,
+                               batch_all_points_unique,
+                               batch_routes_valid,
+                               is_perfect_maze)
+
+RULES = [(all_points_unique, batch_all_points_unique),
+         (all_points_consecutive, batch_all_points_consecutive),
+         (all_points_inside, batch_all_points_inside)]
+
+
+@pytest.fixture(scope="module")
+def routes():
+    rng = np.random.default_rng(7)
+    routes = [maze.to_maze()[0]
+              for maze in generate_mazes(4, 5, 6, workers=1, seed=1,
+                                         as_grid=True)]
+    # and broken ones: repeats, jumps and detours outside
+    routes.append(routes[0][:3] + routes[0][1:])
+    routes.append(routes[1][:2] + routes[1][3:])
+    routes.append([(1, 1), (1, 3), (-1, 3), (-1, 5), (1, 5), (3, 5)])
+    routes.append([(1, 1)])
+    routes += [[tuple(point) for point in
+                2 * rng.integers(0, 4, size=(rng.integers(1, 9), 2)) + 1]
+               for _ in range(30)]
+    return routes
+
+
+def _padded(routes):
+    lengths = np.array([len(route) for route in routes])
+    padded = np.zeros((len(routes), lengths.max(), 2), dtype=np.int64)
+    for k, route in enumerate(routes):
+        padded[k, :len(route)] = route
+    return padded, lengths
+
+
+def _ragged(routes):
+    points = np.array([point for route in routes for point in route])
+    offsets = np.cumsum([0] + [len(route) for route in routes])
+    return points, offsets
+
+
+@pytest.mark.parametrize('rule, batch_rule', RULES)
+def test_batch_rules_agree(routes, rule, batch_rule):
+    expected = [rule(route) for route in routes]
+    assert not(all(expected))
+
+    padded, lengths = _padded(routes)
+    assert batch_rule(padded, lengths=lengths).tolist() == expected
+
+    points, offsets = _ragged(routes)
+    assert batch_rule(points, offsets=offsets).tolist() == expected
+
+
+def test_batch_routes_valid(routes):
+    points, offsets = _ragged(routes)
+    expected = [all_points_unique(route) and
+                all_points_consecutive(route) and
+                all_points_inside(route) for route in routes]
+    assert batch_routes_valid(points, offsets=offsets).tolist() == expected
+    assert all(expected[:6])
+
+
+def test_batch_edge_cases():
+    # routes of equal length need no lengths
+    same = np.array([[[1, 1], [1, 3]], [[1, 1], [1, 1]]])
+    assert batch_routes_valid(same).tolist() == [True, False]
+
+    empty = np.zeros((2, 3, 2), dtype=np.int64)
+    assert batch_routes_valid(empty, lengths=[0, 0]).tolist() == [True] * 2
+    assert len(batch_routes_valid(np.zeros((0, 2)), offsets=[0])) == 0
+
+    far = np.array([[[1, 1], [2**40, 2**40]], [[3, 1], [3, 1]]])
+    assert batch_all_points_unique(far).tolist() == [True, False]
+
+    with pytest.raises(ValueError):
+        batch_routes_valid(same, lengths=[3, 1])
+    with pytest.raises(ValueError):
+        batch_routes_valid(same.reshape(-1, 2), offsets=[0, 3])
+    with pytest.raises(ValueError):
+        batch_routes_valid(same.reshape(-1, 2), lengths=[2, 2])
+
+
+def test_perfect_maze():
+    trails = trails_generator(6, 7, np.random.default_rng(3))
+    grid_maze = grid_maze_from_trails(trails)
+    assert is_perfect_maze(grid_maze)
+    assert is_perfect_maze(walls_from_trails(trails), shape=(6, 7))
+
+    # walls filled in from scratch give a perfect maze as well
+    filled = fill_maze_with_walls((trails.main, []),
+                                  np.random.default_rng(0))
+    assert is_perfect_maze(filled, shape=(6, 7))
+
+    # a wall across the solution cuts the maze in two
+    (x0, y0), (x1, y1) = trails.main[:2]
+    mx, my = (x0 + x1) // 2, (y0 + y1) // 2
+    if x0 == x1:
+        wall = ((mx - 1, my), (mx + 1, my))
+    else:
+        wall = ((mx, my - 1), (mx, my + 1))
+    assert not(is_perfect_maze(grid_maze.with_walls([wall])))
+
+    # and a missing inner wall makes a loop
+    horizontal = grid_maze.horizontal
+    i, j = np.argwhere(horizontal[:, 1:-1])[0]
+    horizontal[i, j + 1] = False
+    opened = GridMaze.from_wall_grids(trails.main, horizontal,
+                                      grid_maze.vertical)
+    assert not(is_perfect_maze(opened))
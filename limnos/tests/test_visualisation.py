@@ -0,0 +1,61 @@
+"""
+Test the plotting functions
+"""
+import numpy as np
+import pytest
+from matplotlib.figure import Figure
+
+from limnos.generation import (add_outer_walls_to_maze,
+                               grid_maze_from_trails,
+                               trails_generator,
+                               walls_from_trails)
+from limnos.visualisation import _draw_maze, _draw_trails, save_maze
+
+
+@pytest.fixture(scope="module")
+def trails():
+    return trails_generator(8, 6, rng=np.random.default_rng(3))
+
+
+def test_maze_layers_are_single_artists(trails):
+    maze = add_outer_walls_to_maze((trails.main, walls_from_trails(trails)))
+    ax = Figure().subplots()
+
+    _draw_maze(ax, maze, show_route=True)
+
+    assert len(ax.collections) == 2
+    assert len(ax.lines) == 0
+    route_segments, wall_segments = (collection.get_segments()
+                                     for collection in ax.collections)
+    assert len(route_segments) == len(trails.main) - 1
+    assert len(wall_segments) == len(maze[1])
+
+
+def test_grid_maze_and_tuple_maze_draw_the_same_walls(trails):
+    grid_maze = grid_maze_from_trails(trails)
+    ax_grid = Figure().subplots()
+    ax_tuple = Figure().subplots()
+
+    _draw_maze(ax_grid, grid_maze, show_route=False)
+    _draw_maze(ax_tuple, grid_maze.to_maze(), show_route=False)
+
+    segments_grid = np.array(ax_grid.collections[0].get_segments())
+    segments_tuple = np.array(ax_tuple.collections[0].get_segments())
+    assert np.array_equal(segments_grid, segments_tuple)
+
+
+def test_trails_layers_per_color(trails):
+    ax = Figure().subplots()
+
+    _draw_trails(ax, trails, color_coding=True)
+
+    n_colors = min(len(trails.all_routes()), 5)
+    assert len(ax.collections) == n_colors
+    assert len(ax.lines) == n_colors
+
+
+def test_save_maze_writes_file(trails, tmp_path):
+    path = tmp_path / "maze.png"
+    save_maze(path, grid_maze_from_trails(trails))
+
+    assert path.read_bytes().startswith(b"\x89PNG")
@@ -3,16 +3,15 @@ Route transformations
 """
 from enum import Enum, auto
 from functools import partial
-from random import randint
-from typing import Callable
+from typing import Callable, Optional
 
+from .rng import RNG, as_random_stream
+from .stats import GenerationStats, timed
 from .types import (Point,
                     Route,
                     add_points,
                     subtract_points)
-from .validation import (all_points_consecutive,
-                         all_points_inside,
-                         all_points_unique,
+from .validation import (dist_l1,
                          subroute_flippable,
                          subroute_flattenable)
 
@@ -33,6 +32,45 @@ class Direction(Enum):
     SOUTHWEST = auto()
 
 
+# the direction of a step between neighbouring points
+STEP_DIRECTIONS: dict[Point, Direction] = {
+    (0, 2): Direction.NORTH,
+    (0, -2): Direction.SOUTH,
+    (2, 0): Direction.EAST,
+    (-2, 0): Direction.WEST}
+
+# the direction between next-neighbour points
+DIAGONAL_DIRECTIONS: dict[Point, Direction] = {
+    (2, 2): Direction.NORTHEAST,
+    (-2, 2): Direction.NORTHWEST,
+    (2, -2): Direction.SOUTHEAST,
+    (-2, -2): Direction.SOUTHWEST}
+
+# the steps from the first point of a bend to the two points it adds, by
+# the direction of the bent step and the chirality of the bend
+BENDER_STEPS: dict[tuple[Direction, Chirality], tuple[Point, Point]] = {
+    (Direction.NORTH, Chirality.RIGHT): ((2, 0), (2, 2)),
+    (Direction.SOUTH, Chirality.RIGHT): ((-2, 0), (-2, -2)),
+    (Direction.EAST, Chirality.RIGHT): ((0, -2), (2, -2)),
+    (Direction.WEST, Chirality.RIGHT): ((0, 2), (-2, 2)),
+    (Direction.NORTH, Chirality.LEFT): ((-2, 0), (-2, 2)),
+    (Direction.SOUTH, Chirality.LEFT): ((2, 0), (2, -2)),
+    (Direction.EAST, Chirality.LEFT): ((0, 2), (2, 2)),
+    (Direction.WEST, Chirality.LEFT): ((0, -2), (-2, -2))}
+
+# the step of the middle point of a flip, by the direction from the first
+# to the last point and whether the first two points share their x
+FLIP_STEPS: dict[tuple[Direction, bool], Point] = {
+    (Direction.NORTHEAST, True): (2, -2),
+    (Direction.NORTHEAST, False): (-2, 2),
+    (Direction.SOUTHWEST, True): (-2, 2),
+    (Direction.SOUTHWEST, False): (2, -2),
+    (Direction.NORTHWEST, True): (-2, -2),
+    (Direction.NORTHWEST, False): (2, 2),
+    (Direction.SOUTHEAST, True): (2, 2),
+    (Direction.SOUTHEAST, False): (-2, -2)}
+
+
 def _direction_from_points(first: Point, second: Point) -> Direction:
     """
     Helper to get direction from points
@@ -40,15 +78,10 @@ def _direction_from_points(first: Point, second: Point) -> Direction:
     dx = second[0] - first[0]
     dy = second[1] - first[1]
 
-    mapper = {(0, 2): Direction.NORTH,
-              (0, -2): Direction.SOUTH,
-              (2, 0): Direction.EAST,
-              (-2, 0): Direction.WEST}
-
-    if (dx, dy) not in mapper.keys():
+    if (dx, dy) not in STEP_DIRECTIONS:
         raise ValueError("Invalid non-neighbour points")
 
-    return mapper[(dx, dy)]
+    return STEP_DIRECTIONS[(dx, dy)]
 
 
 def _new_bender_points(starting_point: Point,
@@ -57,19 +90,7 @@ def _new_bender_points(starting_point: Point,
     """
     Subroutine for bender transform
     """
-    # chirality == right
-    delta_ps_right = {Direction.NORTH: [(2, 0), (2, 2)],
-                      Direction.SOUTH: [(-2, 0), (-2, -2)],
-                      Direction.EAST: [(0, -2), (2, -2)],
-                      Direction.WEST: [(0, 2), (-2, 2)]}
-    # chirality == left
-    delta_ps_left = {Direction.NORTH: [(-2, 0), (-2, 2)],
-                     Direction.SOUTH: [(2, 0), (2, -2)],
-                     Direction.EAST: [(0, 2), (2, 2)],
-                     Direction.WEST: [(0, -2), (-2, -2)]}
-
-    delta_ps = {Chirality.RIGHT: delta_ps_right,
-                Chirality.LEFT: delta_ps_left}[chirality][direction]
+    delta_ps = BENDER_STEPS[(direction, chirality)]
 
     new_points = (add_points(starting_point, delta_ps[0]),
                   add_points(starting_point, delta_ps[1]))
@@ -82,14 +103,7 @@ def _direction_from_next_neighbor_points(p1: Point,
     """
     Get the direction between two next-neighbour points
     """
-    dp = subtract_points(p2, p1)
-
-    mapper = {(2, 2): Direction.NORTHEAST,
-              (-2, 2): Direction.NORTHWEST,
-              (2, -2): Direction.SOUTHEAST,
-              (-2, -2): Direction.SOUTHWEST}
-
-    return mapper[dp]
+    return DIAGONAL_DIRECTIONS[subtract_points(p2, p1)]
 
 
 def bender(route: Route, start: int, chirality: Chirality) -> Route:
@@ -139,16 +153,7 @@ def flipper(route: Route, start: int) -> Route:
 
     direction = _direction_from_next_neighbor_points(start_point, end_point)
 
-    flip_map = {(Direction.NORTHEAST, True): (2, -2),
-                (Direction.NORTHEAST, False): (-2, 2),
-                (Direction.SOUTHWEST, True): (-2, 2),
-                (Direction.SOUTHWEST, False): (2, -2),
-                (Direction.NORTHWEST, True): (-2, -2),
-                (Direction.NORTHWEST, False): (2, 2),
-                (Direction.SOUTHEAST, True): (2, 2),
-                (Direction.SOUTHEAST, False): (-2, -2)}
-
-    delta_coords = flip_map[(direction, same_x)]
+    delta_coords = FLIP_STEPS[(direction, same_x)]
 
     new_route = route.copy()
 
@@ -175,49 +180,153 @@ def flattener(route: Route, start: int):
     return new_route
 
 
-def randomly_transform_once(route: Route) -> Route:
+class TransformableRoute():
     """
-    Apply one random transformation
+    A valid (consecutive, unique and inside) route that is transformed in
+    place. The points of the route are kept in a set, so that each
+    transform is validated by checking only the points it moves; a
+    transform that would invalidate the route is rejected and leaves the
+    route untouched.
     """
-    transforms: dict[int, Callable]
-    transforms = {1: partial(bender, chirality=Chirality.RIGHT),
-                  2: partial(bender, chirality=Chirality.LEFT),
-                  3: flipper,
-                  4: flipper,
-                  5: flattener,
-                  6: flattener}
 
-    found_valid_transform = False
-    tries = 0
-
-    while not(found_valid_transform) and tries < 50:
-        tries += 1
-        transform_to_try = transforms[randint(1, 6)]
-        point_to_try = randint(0, len(route) - 1)
-
-        # TODO: get rid of this awkward try-except-continue hack
-        try:
-            new_route = transform_to_try(route, point_to_try)
-        except (ValueError, IndexError):
-            continue
-
-        cons = all_points_consecutive(new_route)
-        uniq = all_points_unique(new_route)
-        ins = all_points_inside(new_route)
-
-        if cons and uniq and ins:
-            found_valid_transform = True
+    def __init__(self, route: Route):
+
+        self.points: Route = list(route)
+        self._occupied: set[Point] = set(route)
+        self._start = route[0]
+        self._end = route[-1]
+        self._threshold = self._end[0] + self._end[1]
+
+        # the transforms drawn by transform_randomly, each with odds 1/6
+        self._transforms: tuple[Callable[[int], bool], ...] = (
+            partial(self.bend, chirality=Chirality.RIGHT),
+            partial(self.bend, chirality=Chirality.LEFT),
+            self.flip,
+            self.flip,
+            self.flatten,
+            self.flatten)
+
+    def _free_and_inside(self, point: Point) -> bool:
+        """
+        Check the rules of the validation module for a single new point
+        """
+        if point in self._occupied:
+            return False
+        dist = dist_l1(point, self._start) + dist_l1(point, self._end)
+        return dist <= self._threshold
+
+    def bend(self, start: int, chirality: Chirality) -> bool:
+        """
+        Apply the bender transform at start, if legal.
+        Returns whether the route was transformed.
+        """
+        if not(0 <= start < len(self.points) - 1):
+            return False
+
+        p1 = self.points[start]
+        p2 = self.points[start + 1]
+
+        direction = _direction_from_points(p1, p2)
+        new_points = _new_bender_points(p1, direction, chirality)
+
+        if not(all(self._free_and_inside(point) for point in new_points)):
+            return False
+
+        self.points[start + 1: start + 1] = new_points
+        self._occupied.update(new_points)
+
+        return True
+
+    def flip(self, start: int) -> bool:
+        """
+        Apply the flipper transform at start, if legal.
+        Returns whether the route was transformed.
+        """
+        if not(0 <= start < len(self.points) - 2):
+            return False
+
+        subroute = self.points[start: start + 3]
+
+        if not(subroute_flippable(subroute)):
+            return False
+
+        new_point = flipper(subroute, 0)[1]
+
+        if not(self._free_and_inside(new_point)):
+            return False
+
+        self._occupied.remove(subroute[1])
+        self._occupied.add(new_point)
+        self.points[start + 1] = new_point
+
+        return True
+
+    def flatten(self, start: int) -> bool:
+        """
+        Apply the flattener transform at start, if legal.
+        Returns whether the route was transformed.
+        """
+        if not(0 <= start < len(self.points) - 3):
+            return False
+
+        subroute = self.points[start: start + 4]
+
+        if not(subroute_flattenable(subroute)):
+            return False
+
+        self._occupied.difference_update(subroute[1:3])
+        del self.points[start + 1: start + 3]
+
+        return True
+
+    def transform_randomly(self, tries: int = 50, rng: RNG = None,
+                           stats: Optional[GenerationStats] = None) -> bool:
+        """
+        Apply one random transformation, giving up after the given number
+        of rejected tries. Returns whether the route was transformed.
+        """
+        stream = as_random_stream(rng)
+        transforms = self._transforms
+
+        for attempt in range(tries):
+            transform_to_try = transforms[stream.randint(1, 6) - 1]
+            point_to_try = stream.randint(0, len(self.points) - 1)
+
+            if transform_to_try(point_to_try):
+                if stats is not None:
+                    stats.record_transform(attempt + 1, True)
+                return True
+
+        if stats is not None:
+            stats.record_transform(tries, False)
+        return False
+
+
+def randomly_transform_once(route: Route, rng: RNG = None,
+                            stats: Optional[GenerationStats] = None
+                            ) -> Route:
+    """
+    Apply one random transformation. The route is returned unchanged if
+    no valid transformation was found
+    """
+    transformable = TransformableRoute(route)
+    transformable.transform_randomly(rng=rng, stats=stats)
 
-    return new_route
+    return transformable.points
 
 
-def randomly_transform_N_times(route: Route, N: int) -> Route:
+def randomly_transform_N_times(route: Route, N: int, rng: RNG = None,
+                               stats: Optional[GenerationStats] = None
+                               ) -> Route:
     """
-    Apply N random transformations to route
+    Apply N random transformations to route. Pass stats to collect
+    GenerationStats
     """
-    nr = randomly_transform_once(route)
+    stream = as_random_stream(rng)
+    transformable = TransformableRoute(route)
 
-    for _ in range(N - 1):
-        nr = randomly_transform_once(nr)
+    with timed(stats, 'transforms'):
+        for _ in range(max(N, 1)):
+            transformable.transform_randomly(rng=stream, stats=stats)
 
-    return nr
+    return transformable.points
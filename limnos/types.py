@@ -4,7 +4,19 @@ Module that holds the fundamental types and basic functions
 Note that Routes contain Points of odd coordinates only, whereas
 Walls contain Points of even coordinates only
 """
-from typing import Union
+from __future__ import annotations
+
+from array import array
+from itertools import chain
+from typing import TYPE_CHECKING, Optional, TypeVar, Union, cast
+from weakref import WeakValueDictionary
+
+from .lazy import lazy_module
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    np = lazy_module('numpy')
 
 
 Point = tuple[int, int]
@@ -15,63 +27,502 @@ Walls = list[Wall]
 Maze = tuple[Route, Walls]
 
 
+class _TrailsStore():
+    """
+    Flat storage of all the routes of one Trails tree.
+
+    The points of all routes lie back to back in one array of coordinates,
+    x0, y0, x1, y1, ..., route r taking up the points from offsets[r] up
+    to offsets[r + 1]. Route 0 is the main of the root. Every other route
+    has the route it sprouts off as parent, and the index of its first
+    point in the main of that parent as sprout (-1 if it is not there).
+    The branches of every route are chained through first_branches and
+    next_branches, in the order they were added.
+
+    Point lookups go through an owner grid over the cells of the root,
+    built on first request: every cell holds the first route holding the
+    cell and its index in that route. Points off the grid go in a dict.
+    """
+    __slots__ = ('coords', 'offsets', 'parents', 'sprouts',
+                 'first_branches', 'last_branches', 'next_branches',
+                 'shape', 'owners', 'indices', 'outside', 'views')
+
+    def __init__(self, main: Route):
+
+        self.coords = array('i')
+        self.offsets = array('q', [0])
+        self.parents = array('i')
+        self.sprouts = array('i')
+        self.first_branches = array('i')
+        self.last_branches = array('i')
+        self.next_branches = array('i')
+
+        if len(main) > 0:
+            self.shape = ((main[-1][0] + 1) // 2, (main[-1][1] + 1) // 2)
+        else:
+            self.shape = (0, 0)
+        self.owners: Optional[array] = None
+        self.indices: Optional[array] = None
+        self.outside: dict[Point, tuple[int, int]] = {}
+
+        # the Trails views in use, by route
+        self.views: WeakValueDictionary[int, 'Trails'] = \
+            WeakValueDictionary()
+
+        self.add_route(main, -1)
+
+    def __getstate__(self) -> tuple:
+        # the views are not pickled, Trails.__setstate__ puts them back
+        return tuple(getattr(self, name) for name in self.__slots__[:-1])
+
+    def __setstate__(self, state: tuple) -> None:
+        for name, value in zip(self.__slots__[:-1], state):
+            setattr(self, name, value)
+        self.views = WeakValueDictionary()
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def add_route(self, route: Route, parent: int) -> int:
+        """
+        Append a route as the last branch of the parent route (-1 for none)
+        and get its number
+        """
+        number = len(self.parents)
+
+        sprout = -1
+        if parent >= 0 and len(route) > 0:
+            owner = self.locate(route[0])
+            if owner is not None and owner[0] == parent:
+                sprout = owner[1]
+            elif route[0] in self.route(parent):
+                sprout = self.route(parent).index(route[0])
+
+        self.coords.extend(chain.from_iterable(route))
+        self.offsets.append(len(self.coords) // 2)
+        self.parents.append(parent)
+        self.sprouts.append(sprout)
+        self.first_branches.append(-1)
+        self.last_branches.append(-1)
+        self.next_branches.append(-1)
+
+        if parent >= 0:
+            if self.first_branches[parent] == -1:
+                self.first_branches[parent] = number
+            else:
+                self.next_branches[self.last_branches[parent]] = number
+            self.last_branches[parent] = number
+
+        if self.owners is not None:
+            self._register(number)
+
+        return number
+
+    def _cell(self, point: Point) -> int:
+        """
+        Get the number of the cell of a point on the owner grid, or -1
+        """
+        N, M = self.shape
+        x, y = point
+        if x % 2 == 1 and y % 2 == 1 and 0 < x < 2 * N and 0 < y < 2 * M:
+            return (x // 2) * M + y // 2
+        return -1
+
+    def _register(self, number: int) -> None:
+        owners = cast(array, self.owners)
+        indices = cast(array, self.indices)
+        N, M = self.shape
+        for index, (x, y) in enumerate(self.route(number)):
+            if x % 2 == 1 and y % 2 == 1 and 0 < x < 2 * N and 0 < y < 2 * M:
+                cell = (x // 2) * M + y // 2
+                if owners[cell] == -1:
+                    owners[cell] = number
+                    indices[cell] = index
+            else:
+                self.outside.setdefault((x, y), (number, index))
+
+    def _build_grid(self) -> None:
+        size = self.shape[0] * self.shape[1]
+        self.owners = array('i', [-1]) * size
+        self.indices = array('i', [-1]) * size
+        for number in range(len(self)):
+            self._register(number)
+
+    def locate(self, point: Point) -> Optional[tuple[int, int]]:
+        """
+        Get the first route holding a point and the index of the point in
+        that route, or None
+        """
+        if self.owners is None:
+            self._build_grid()
+        owners = cast(array, self.owners)
+        cell = self._cell(point)
+        if cell == -1:
+            return self.outside.get(point)
+        if owners[cell] == -1:
+            return None
+        return owners[cell], cast(array, self.indices)[cell]
+
+    def occupancy(self) -> np.ndarray:
+        if self.owners is None:
+            self._build_grid()
+        owners = np.frombuffer(cast(array, self.owners), dtype=np.intc)
+        return (owners >= 0).reshape(self.shape)
+
+    def route(self, number: int) -> Route:
+        coords = iter(self.coords[2 * self.offsets[number]:
+                                  2 * self.offsets[number + 1]])
+        return list(zip(coords, coords))
+
+    def point(self, number: int, index: int) -> Point:
+        start, end = self.offsets[number], self.offsets[number + 1]
+        if index < 0:
+            index += end - start
+        if not(0 <= index < end - start):
+            raise IndexError("Point index out of range")
+        return (self.coords[2 * (start + index)],
+                self.coords[2 * (start + index) + 1])
+
+    def branches(self, number: int) -> list[int]:
+        branches = []
+        branch = self.first_branches[number]
+        while branch != -1:
+            branches.append(branch)
+            branch = self.next_branches[branch]
+        return branches
+
+    def preorder(self, number: int) -> list[int]:
+        """
+        Get a route and all routes below it, in pre-order
+        """
+        order = []
+        stack = [number]
+        while stack:
+            number = stack.pop()
+            order.append(number)
+            stack.extend(reversed(self.branches(number)))
+        return order
+
+    def view(self, number: int) -> 'Trails':
+        view = self.views.get(number)
+        if view is None:
+            view = Trails.__new__(Trails)
+            view._store, view._route = self, number
+            self.views[number] = view
+        return view
+
+
 class Trails():
+    """
+    A tree of routes: a main route and branches sprouting off of it.
+
+    All routes of a tree are held in one flat store (see _TrailsStore) and
+    a Trails object is a view of one of these routes together with all of
+    its branches. Point lookups made on any subtrail cover the full trails
+    and take constant time, and the full trails pickle as a handful of
+    arrays.
+    """
+    __slots__ = ('_store', '_route', '__weakref__')
 
     def __init__(self, main: Route, branches: list['Trails']):
 
-        self.main: Route = main
-        self.branches: list['Trails'] = branches
+        self._store = _TrailsStore(main)
+        self._route = 0
+        self._store.views[0] = self
+        for branch in branches:
+            self.add_branch(branch)
+
+    def __getstate__(self) -> tuple['_TrailsStore', int]:
+        return self._store, self._route
+
+    def __setstate__(self, state: tuple['_TrailsStore', int]) -> None:
+        self._store, self._route = state
+        self._store.views.setdefault(self._route, self)
+
+    @property
+    def main(self) -> Route:
+        """
+        The main route, as a new list: changing it leaves the trails as
+        they are. Use point to look up single points
+        """
+        return self._store.route(self._route)
+
+    @property
+    def branches(self) -> list['Trails']:
+        """
+        The branches of the main route, as a new list, see sprout and
+        add_branch to add some
+        """
+        return [self._store.view(branch)
+                for branch in self._store.branches(self._route)]
+
+    def point(self, index: int) -> Point:
+        """
+        Get a point of the main route, without building the full route
+        """
+        return self._store.point(self._route, index)
+
+    def sprout(self, main: Route) -> 'Trails':
+        """
+        Attach a new branch with the given main route, which should start on
+        the main of this (sub)trail, and get it
+        """
+        return self._store.view(self._store.add_route(main, self._route))
+
+    def add_branch(self, branch: 'Trails') -> None:
+        """
+        Attach a branch to this (sub)trail. The routes of the branch and of
+        all of its branches are copied into the store of this trails, and
+        the branch (and any of its subtrails in use) becomes a view of that
+        store.
+        """
+        old_store = branch._store
+        stack = [(branch._route, self._route)]
+        while stack:
+            old_number, parent = stack.pop()
+            number = self._store.add_route(old_store.route(old_number),
+                                           parent)
+            view = old_store.views.pop(old_number, None)
+            if view is not None:
+                view._store, view._route = self._store, number
+                self._store.views[number] = view
+            stack.extend((old_branch, number) for old_branch
+                         in reversed(old_store.branches(old_number)))
 
     def point_in_trails(self, point: Point) -> bool:
         """
         Determine if a point already exists in the trails
         """
-        if point in self.main:
-            return True
-        for branch in self.branches:
-            if branch.point_in_trails(point):
-                return True
-        return False
+        return self._store.locate(point) is not None
 
-    def _all_routes(self, routes: Routes) -> Routes:
-        routes.append(self.main)
-        for branch in self.branches:
-            branch._all_routes(routes)
-        return routes
+    @property
+    def occupancy(self) -> np.ndarray:
+        """
+        Boolean N x M grid of the cells covered by the trails, indexed
+        by cell, i.e. the point (x, y) maps to [(x - 1)//2, (y - 1)//2]
+        """
+        return self._store.occupancy()
 
     def all_routes(self) -> Routes:
-        return self._all_routes([])
+        return [self._store.route(number)
+                for number in self._store.preorder(self._route)]
 
-    def _get_subtrail_by_point(self,
-                               point: Point,
-                               lst: list['Trails']) -> list['Trails']:
-        if point in self.main:
-            lst.append(self)
-        else:
-            for branch in self.branches:
-                branch._get_subtrail_by_point(point, lst)
+    def locate(self, point: Point) -> tuple['Trails', int]:
+        """
+        Get the subtrail that contains the point in its main trail along
+        with the index of the point in that main trail
+        """
+        owner = self._store.locate(point)
+        if owner is None:
+            raise ValueError("Point not in trails")
 
-        return lst
+        return self._store.view(owner[0]), owner[1]
 
     def get_subtrail_by_point(self, point: Point) -> 'Trails':
         """
         Get the subtrail that contains the point in its main trail
         """
-        if not(self.point_in_trails(point)):
-            raise ValueError("Point not in trails")
-        else:
-            trails = self._get_subtrail_by_point(point, [])[0]
-
-        return trails
+        return self.locate(point)[0]
 
     def __getitem__(self, key: list[int]) -> 'Trails':
-        if len(key) == 1:
-            return self.branches[key[0]]
+        subtrail = self
+        for ind in key:
+            subtrail = subtrail.branches[ind]
+        return subtrail
+
+    def __repr__(self) -> str:
+        store = self._store
+        # built from the leaves up, so that deep trees do not recurse
+        reprs: dict[int, str] = {}
+        for number in reversed(store.preorder(self._route)):
+            branches = ", ".join(reprs.pop(branch)
+                                 for branch in store.branches(number))
+            reprs[number] = f"Trail({store.route(number)}, [{branches}])"
+        return reprs[self._route]
+
+
+class GridMaze():
+    """
+    Compact representation of a maze on an N x M grid of cells whose
+    corners run from (0, 0) to (2N, 2M).
+
+    The walls are stored as two bit-packed boolean grids. The horizontal
+    wall ((x, y), (x + 2, y)) sits at [x//2, y//2] of an N x (M + 1) grid
+    and the vertical wall ((x, y), (x, y + 2)) sits at [x//2, y//2] of an
+    (N + 1) x M grid. The solution route is an (L, 2) int array.
+    """
+
+    def __init__(self,
+                 shape: tuple[int, int],
+                 packed_horizontal: np.ndarray,
+                 packed_vertical: np.ndarray,
+                 route: np.ndarray):
+
+        self.shape = shape
+        self.packed_horizontal = packed_horizontal
+        self.packed_vertical = packed_vertical
+        self.route = route
+
+    @classmethod
+    def from_wall_grids(cls,
+                        route: Union[Route, np.ndarray],
+                        horizontal: np.ndarray,
+                        vertical: np.ndarray) -> 'GridMaze':
+        """
+        Make a GridMaze from unpacked boolean wall grids
+        """
+        N, M_plus_one = horizontal.shape
+        if vertical.shape != (N + 1, M_plus_one - 1):
+            raise ValueError("Wall grids of incompatible shapes")
+
+        return cls((N, M_plus_one - 1),
+                   np.packbits(horizontal, axis=None),
+                   np.packbits(vertical, axis=None),
+                   np.array(route, dtype=np.int32).reshape(-1, 2))
+
+    @classmethod
+    def from_maze(cls, maze: Maze,
+                  shape: Optional[tuple[int, int]] = None) -> 'GridMaze':
+        """
+        Make a GridMaze from a Maze. Unless given, the shape of the grid is
+        inferred from the end point of the route
+        """
+        route, walls = maze
+        if shape is None:
+            shape = ((route[-1][0] + 1) // 2, (route[-1][1] + 1) // 2)
+        N, M = shape
+
+        horizontal = np.zeros((N, M + 1), dtype=bool)
+        vertical = np.zeros((N + 1, M), dtype=bool)
+        for wall in walls:
+            grid, i, j = cls._locate_wall(wall)
+            if grid == 'h':
+                horizontal[i, j] = True
+            else:
+                vertical[i, j] = True
+
+        return cls.from_wall_grids(route, horizontal, vertical)
+
+    @staticmethod
+    def _locate_wall(wall: Wall) -> tuple[str, int, int]:
+        """
+        Get the grid ('h' or 'v') and the index of a wall in that grid
+        """
+        (x0, y0), (x1, y1) = sorted(wall)
+        if y0 == y1 and x1 - x0 == 2 and x0 % 2 == y0 % 2 == 0:
+            return 'h', x0 // 2, y0 // 2
+        if x0 == x1 and y1 - y0 == 2 and x0 % 2 == y0 % 2 == 0:
+            return 'v', x0 // 2, y0 // 2
+        raise ValueError(f"Invalid wall {wall}")
+
+    @property
+    def horizontal(self) -> np.ndarray:
+        """
+        The unpacked grid of horizontal walls
+        """
+        N, M = self.shape
+        count = N * (M + 1)
+        return np.unpackbits(self.packed_horizontal,
+                             count=count).reshape(N, M + 1).astype(bool)
+
+    @property
+    def vertical(self) -> np.ndarray:
+        """
+        The unpacked grid of vertical walls
+        """
+        N, M = self.shape
+        count = (N + 1) * M
+        return np.unpackbits(self.packed_vertical,
+                             count=count).reshape(N + 1, M).astype(bool)
+
+    def _bit(self, wall: Wall) -> Optional[tuple[np.ndarray, int, int]]:
+        """
+        Get the packed array, the byte and the bit mask of a wall, or None
+        if the wall lies outside of the grid
+        """
+        grid, i, j = self._locate_wall(wall)
+        N, M = self.shape
+        if grid == 'h':
+            packed, rows, cols = self.packed_horizontal, N, M + 1
         else:
-            return self.branches[key[0]][key[1:]]
+            packed, rows, cols = self.packed_vertical, N + 1, M
+        if not(0 <= i < rows and 0 <= j < cols):
+            return None
+        ind = i * cols + j
+        return packed, ind >> 3, 0x80 >> (ind & 7)
+
+    def has_wall(self, wall: Wall) -> bool:
+        """
+        Check whether the maze has a wall
+        """
+        bit = self._bit(wall)
+        if bit is None:
+            return False
+        packed, byte, mask = bit
+        return bool(packed[byte] & mask)
+
+    def corner_has_wall(self, point: Point) -> bool:
+        """
+        Check whether any wall of the maze touches a corner point
+        """
+        x, y = point
+        return any(self.has_wall((point, other))
+                   for other in ((x + 2, y), (x - 2, y),
+                                 (x, y + 2), (x, y - 2)))
+
+    def with_walls(self, walls: Walls) -> 'GridMaze':
+        """
+        Get a copy of the maze with some walls added
+        """
+        new_maze = GridMaze(self.shape,
+                            self.packed_horizontal.copy(),
+                            self.packed_vertical.copy(),
+                            self.route)
+        for wall in walls:
+            bit = new_maze._bit(wall)
+            if bit is None:
+                raise ValueError(f"Wall {wall} outside of the maze")
+            packed, byte, mask = bit
+            packed[byte] |= mask
+
+        return new_maze
+
+    def walls(self) -> Walls:
+        """
+        All walls of the maze, horizontal walls first, each sorted by x
+        and then y (the order of walls_from_trails)
+        """
+        walls: Walls = []
+        for grid, step in ((self.horizontal, (2, 0)),
+                           (self.vertical, (0, 2))):
+            xs, ys = np.nonzero(grid)
+            walls.extend(((2 * x, 2 * y), (2 * x + step[0], 2 * y + step[1]))
+                         for x, y in zip(xs.tolist(), ys.tolist()))
+        return walls
+
+    def to_maze(self) -> Maze:
+        """
+        Convert to the (route, walls) tuple format. The walls come in the
+        order of the walls method
+        """
+        route: Route = [(x, y) for x, y in self.route.tolist()]
+        return route, self.walls()
+
+    def __eq__(self, other: object) -> bool:
+        if not(isinstance(other, GridMaze)):
+            return NotImplemented
+        return (self.shape == other.shape and
+                np.array_equal(self.packed_horizontal,
+                               other.packed_horizontal) and
+                np.array_equal(self.packed_vertical, other.packed_vertical) and
+                np.array_equal(self.route, other.route))
 
     def __repr__(self) -> str:
-        return f"Trail({self.main}, {self.branches})"
+        N, M = self.shape
+        return f"GridMaze({N}x{M}, route of {len(self.route)} points)"
+
+
+AnyMaze = TypeVar('AnyMaze', Maze, GridMaze)
 
 
 def add_points(p1: Point, p2: Point) -> Point:
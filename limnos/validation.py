@@ -2,10 +2,25 @@
 Validation of Routes. Contains functions named after rules.
 Every function returns a boolean telling whether the rule
 is applied to; True means pass/valid, False means fail/invalid
+
+The batch_ versions of the rules check many routes at once in a few
+NumPy passes and return a boolean array with a result per route. They
+take the routes either padded, as a (K, L, 2) array of points with the
+lengths of the K routes, or ragged, as a (P, 2) array of the points of
+all routes one after the other with K + 1 offsets, the points of route k
+being points[offsets[k]: offsets[k + 1]]. Empty routes pass every rule.
 """
-import numpy as np
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional, Union
+
+from .lazy import lazy_module
+from .types import GridMaze, Maze, Route, Point, Walls
 
-from .types import Route, Point
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    np = lazy_module('numpy')
 
 
 def dist_l1(p1: Point, p2: Point) -> int:
@@ -19,7 +34,7 @@ def all_points_unique(route: Route) -> bool:
     """
     Checks whether all points are unique
     """
-    return len(np.unique(route, axis=0)) == len(route)
+    return len(set(map(tuple, route))) == len(route)
 
 
 def all_points_consecutive(route: Route) -> bool:
@@ -32,7 +47,7 @@ def all_points_consecutive(route: Route) -> bool:
 
     dists = [dist_l1(*points) for points in zipper]
 
-    return bool(np.all(np.array(dists) == 2))
+    return all(dist == 2 for dist in dists)
 
 
 def all_points_inside(route: Route) -> bool:
@@ -45,7 +60,7 @@ def all_points_inside(route: Route) -> bool:
     dists = [dist_l1(p, start_p) + dist_l1(p, end_p) for p in route]
     threshold = end_p[0] + end_p[1]
 
-    return bool(np.all([dist <= threshold for dist in dists]))
+    return all(dist <= threshold for dist in dists)
 
 
 def subroute_flippable(subroute: Route) -> bool:
@@ -74,3 +89,152 @@ def subroute_flattenable(subroute: Route) -> bool:
     p2 = subroute[3]
 
     return dist_l1(p1, p2) == 2
+
+
+def _as_ragged(routes: np.ndarray,
+               lengths: Optional[np.ndarray] = None,
+               offsets: Optional[np.ndarray] = None
+               ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the points and offsets of padded or ragged routes, see the batch_
+    rules
+    """
+    routes = np.asarray(routes, dtype=np.int64)
+
+    if offsets is not None:
+        if lengths is not None:
+            raise ValueError("Give either the lengths or the offsets")
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if routes.ndim != 2 or routes.shape[1] != 2:
+            raise ValueError("Ragged routes must be a (P, 2) array")
+        if (len(offsets) == 0 or offsets[0] != 0 or
+                offsets[-1] != len(routes) or np.any(np.diff(offsets) < 0)):
+            raise ValueError("Offsets must rise from 0 to the number of "
+                             "points")
+        return routes, offsets
+
+    if routes.ndim != 3 or routes.shape[2] != 2:
+        raise ValueError("Padded routes must be a (K, L, 2) array")
+    K, L = routes.shape[:2]
+    if lengths is None:
+        lengths = np.full(K, L, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    if lengths.shape != (K,) or np.any((lengths < 0) | (lengths > L)):
+        raise ValueError("Lengths must be K numbers from 0 to L")
+
+    offsets = np.zeros(K + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return routes[np.arange(L) < lengths[:, None]], offsets
+
+
+def _passing(offsets: np.ndarray, failed_routes: np.ndarray) -> np.ndarray:
+    """
+    Turn the route numbers of failures into a result per route
+    """
+    failures = np.bincount(failed_routes, minlength=len(offsets) - 1)
+    return failures == 0
+
+
+def batch_all_points_unique(routes: np.ndarray,
+                            lengths: Optional[np.ndarray] = None,
+                            offsets: Optional[np.ndarray] = None
+                            ) -> np.ndarray:
+    """
+    Check all_points_unique for every route, see the module docstring
+    """
+    points, offsets = _as_ragged(routes, lengths, offsets)
+    route_ids = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+    if len(points) == 0:
+        return _passing(offsets, route_ids)
+
+    # number every (route, point) pair, so that after sorting repeated
+    # points end up next to each other
+    lows = points.min(axis=0)
+    spans = points.max(axis=0) - lows + 1
+    if len(offsets) * int(spans[0]) * int(spans[1]) < 2**62:
+        keys = ((route_ids * spans[0] + points[:, 0] - lows[0]) * spans[1] +
+                points[:, 1] - lows[1])
+        keys.sort()
+        repeated = keys[1:] == keys[:-1]
+        return _passing(offsets,
+                        keys[1:][repeated] // (spans[0] * spans[1]))
+
+    order = np.lexsort((points[:, 1], points[:, 0], route_ids))
+    rows = np.column_stack([route_ids[order], points[order]])
+    repeated = np.all(rows[1:] == rows[:-1], axis=1)
+    return _passing(offsets, rows[1:, 0][repeated])
+
+
+def batch_all_points_consecutive(routes: np.ndarray,
+                                 lengths: Optional[np.ndarray] = None,
+                                 offsets: Optional[np.ndarray] = None
+                                 ) -> np.ndarray:
+    """
+    Check all_points_consecutive for every route, see the module docstring
+    """
+    points, offsets = _as_ragged(routes, lengths, offsets)
+    route_ids = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+    dists = np.abs(np.diff(points, axis=0)).sum(axis=1)
+    # the steps from the last point of a route to the first of the next
+    # are no steps
+    is_step = route_ids[1:] == route_ids[:-1]
+
+    return _passing(offsets, route_ids[1:][is_step & (dists != 2)])
+
+
+def batch_all_points_inside(routes: np.ndarray,
+                            lengths: Optional[np.ndarray] = None,
+                            offsets: Optional[np.ndarray] = None
+                            ) -> np.ndarray:
+    """
+    Check all_points_inside for every route, see the module docstring
+    """
+    points, offsets = _as_ragged(routes, lengths, offsets)
+    counts = np.diff(offsets)
+    route_ids = np.repeat(np.arange(len(counts)), counts)
+
+    filled = np.nonzero(counts > 0)[0]
+    starts = np.zeros((len(counts), 2), dtype=np.int64)
+    ends = np.zeros((len(counts), 2), dtype=np.int64)
+    starts[filled] = points[offsets[filled]]
+    ends[filled] = points[offsets[filled + 1] - 1]
+
+    dists = (np.abs(points - starts[route_ids]).sum(axis=1) +
+             np.abs(points - ends[route_ids]).sum(axis=1))
+    thresholds = ends.sum(axis=1)
+
+    return _passing(offsets, route_ids[dists > thresholds[route_ids]])
+
+
+def batch_routes_valid(routes: np.ndarray,
+                       lengths: Optional[np.ndarray] = None,
+                       offsets: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Check that every route passes all of the batch_ rules
+    """
+    points, offsets = _as_ragged(routes, lengths, offsets)
+
+    return (batch_all_points_unique(points, offsets=offsets) &
+            batch_all_points_consecutive(points, offsets=offsets) &
+            batch_all_points_inside(points, offsets=offsets))
+
+
+def is_perfect_maze(maze: Union[GridMaze, Maze, Walls],
+                    shape: Optional[tuple[int, int]] = None) -> bool:
+    """
+    Check whether the inner walls of a maze make it perfect: there is
+    exactly one way between any two cells, so the passages between the
+    cells form a tree. See limnos.solve.cell_adjacency for the maze and
+    shape
+    """
+    # imported here, as limnos.solve loads NumPy
+    from .solve import cell_adjacency, distance_field
+
+    graph = cell_adjacency(maze, shape)
+    N, M = graph.shape
+
+    if len(graph.indices) != 2 * (N * M - 1):
+        return False
+    return bool(np.all(distance_field(graph) >= 0))
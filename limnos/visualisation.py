@@ -1,11 +1,30 @@
 """
 Visualization of routes
-"""
-from typing import Generator
-
-from .types import Route, Routes, Maze, Trails
 
-import matplotlib.pyplot as plt
+Every layer (walls, the solution route, the routes of one color) is drawn
+as a single LineCollection built from an (S, 2, 2) array of segments, so
+the number of artists does not grow with the size of the maze.
+NumPy and matplotlib are only loaded once something is drawn.
+"""
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, Generator, Sequence, Union, cast
+
+from .lazy import lazy_module
+from .types import GridMaze, Route, Routes, Maze, Trails
+
+if TYPE_CHECKING:
+    import matplotlib.collections as collections
+    import matplotlib.figure as figure
+    import matplotlib.pyplot as plt
+    import numpy as np
+    from matplotlib.axes import Axes
+else:
+    collections = lazy_module('matplotlib.collections')
+    figure = lazy_module('matplotlib.figure')
+    plt = lazy_module('matplotlib.pyplot')
+    np = lazy_module('numpy')
 
 ColorCode = str
 
@@ -28,28 +47,88 @@ def color_picker(colors: list[ColorCode]) -> Generator[ColorCode, None, None]:
         n = (n + 1) % len(colors)
 
 
-def plot_route(route: Route) -> None:
+def _route_segments(routes: Routes) -> np.ndarray:
+    """
+    Get the segments between consecutive points of the routes as an
+    (S, 2, 2) array
+    """
+    segments = [np.stack([points[:-1], points[1:]], axis=1)
+                for points in (np.array(route).reshape(-1, 2)
+                               for route in routes)
+                if len(points) > 1]
+    if len(segments) == 0:
+        return np.zeros((0, 2, 2))
+    return np.concatenate(segments)
 
-    fig, ax = plt.subplots()
 
-    for this_point, next_point in zip(route[:-1], route[1:]):
-        xs = (this_point[0], next_point[0])
-        ys = (this_point[1], next_point[1])
-        ax.plot(xs, ys, '-o', color=ROUTE_COLOR)
+def _wall_segments(maze: Union[Maze, GridMaze]) -> np.ndarray:
+    """
+    Get the walls of a maze as an (S, 2, 2) array of segments
+    """
+    if not(isinstance(maze, GridMaze)):
+        return np.array(maze[1]).reshape(-1, 2, 2)
+
+    segments = []
+    for grid, step in ((maze.horizontal, (2, 0)), (maze.vertical, (0, 2))):
+        starts = 2 * np.argwhere(grid)
+        segments.append(np.stack([starts, starts + step], axis=1))
+    return np.concatenate(segments)
+
+
+def _draw_segments(ax: Axes, segments: np.ndarray, **kwargs) -> None:
+    # an array of segments is fine, the stubs only admit sequences
+    ax.add_collection(
+        collections.LineCollection(cast(Sequence, segments), **kwargs))
+    ax.autoscale_view()
+
+
+def _draw_points(ax: Axes, routes: Routes, color: ColorCode) -> None:
+    points = np.array([point for route in routes for point in route])
+    if len(points) > 0:
+        ax.plot(points[:, 0], points[:, 1], 'o', color=color)
+
+
+def _draw_trails(ax: Axes, trails: Trails, color_coding: bool) -> None:
+
+    if color_coding:
+        cp = color_picker(ROUTE_COLORS)
+    else:
+        cp = color_picker([ROUTE_COLOR])
+
+    routes_by_color: dict[ColorCode, Routes] = {}
+    for route in trails.all_routes():
+        routes_by_color.setdefault(next(cp), []).append(route)
+
+    for route_color, routes in routes_by_color.items():
+        _draw_segments(ax, _route_segments(routes), colors=route_color)
+        _draw_points(ax, routes, route_color)
 
-    plt.show()
+
+def _draw_maze(ax: Axes,
+               maze: Union[Maze, GridMaze],
+               show_route: bool) -> None:
+
+    if show_route:
+        if isinstance(maze, GridMaze):
+            route: Route = [(x, y) for x, y in maze.route.tolist()]
+        else:
+            route = maze[0]
+        _draw_segments(ax, _route_segments([route]), colors=ROUTE_COLOR)
+
+    _draw_segments(ax, _wall_segments(maze), colors='k', linewidths=2)
+
+
+def plot_route(route: Route) -> None:
+
+    plot_routes([route])
 
 
 def plot_routes(routes: Routes) -> None:
 
     fig, ax = plt.subplots()
 
-    for route in routes:
-
-        for this_point, next_point in zip(route[:-1], route[1:]):
-            xs = (this_point[0], next_point[0])
-            ys = (this_point[1], next_point[1])
-            ax.plot(xs, ys, '-o', color=ROUTE_COLOR)
+    _draw_segments(ax, _route_segments(routes), colors=ROUTE_COLOR)
+    _draw_points(ax, routes, ROUTE_COLOR)
 
     plt.show()
 
@@ -59,42 +138,34 @@ def plot_trails(trails: Trails, color_coding: bool=False) -> None:
     Plot a collection of trails
     """
 
-    if color_coding:
-        cp = color_picker(ROUTE_COLORS)
-    else:
-        cp = color_picker([ROUTE_COLOR])
-
     fig, ax = plt.subplots()
 
-    for route in trails.all_routes():
-
-        route_color = next(cp)
-
-        for this_point, next_point in zip(route[:-1], route[1:]):
-            xs = (this_point[0], next_point[0])
-            ys = (this_point[1], next_point[1])
-            ax.plot(xs, ys, '-o', color=route_color)
+    _draw_trails(ax, trails, color_coding)
 
     plt.show()
 
 
-def plot_maze(maze: Maze, show_route: bool=True) -> None:
-
-    route = maze[0]
-    walls = maze[1]
+def plot_maze(maze: Union[Maze, GridMaze], show_route: bool=True) -> None:
 
     fig, ax = plt.subplots()
 
-    if show_route:
-        for this_point, next_point in zip(route[:-1], route[1:]):
-            xs = (this_point[0], next_point[0])
-            ys = (this_point[1], next_point[1])
-            ax.plot(xs, ys, color=ROUTE_COLOR)
+    _draw_maze(ax, maze, show_route)
 
-    for wall in walls:
-        xs = (wall[0][0], wall[1][0])
-        ys = (wall[0][1], wall[1][1])
+    plt.show()
 
-        ax.plot(xs, ys, 'k', linewidth=2)
 
-    plt.show()
+def save_maze(path: Union[str, os.PathLike],
+              maze: Union[Maze, GridMaze],
+              show_route: bool=True,
+              dpi: int=100) -> None:
+    """
+    Plot a maze straight to a file (any format matplotlib can write).
+    This does not go through pyplot, so no window is ever opened and no
+    figures are left behind, which makes it safe to use in batch jobs
+    """
+    fig = figure.Figure()
+    ax = fig.subplots()
+
+    _draw_maze(ax, maze, show_route)
+
+    fig.savefig(path, dpi=dpi)
@@ -2,5 +2,5 @@ from setuptools import setup, find_packages
 
 setup(
     name='limnos',
-    packages=find_packages()
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*'])
 )